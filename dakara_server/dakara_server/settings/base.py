@@ -36,7 +36,7 @@ INSTALLED_APPS = (
     "channels",
     "ordered_model",
     "rest_registration",
-    "library",
+    "library.apps.LibraryConfig",
     "playlist.apps.PlaylistConfig",
     "users.apps.UsersConfig",
     "internal.apps.InternalConfig",
@@ -163,3 +163,7 @@ HOST_URLS = {
 
 # limit of the playlist size
 PLAYLIST_SIZE_LIMIT = config("PLAYLIST_SIZE_LIMIT", cast=int, default=100)
+
+# resolution of song searches, either on the search documents of songs
+# ("document") or on their related tables ("exists")
+LIBRARY_SEARCH = config("LIBRARY_SEARCH", default="document")
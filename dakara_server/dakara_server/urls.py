@@ -107,6 +107,41 @@ urlpatterns = [
         library_views.SongRetrieveListView.as_view(),
         name="library-song-retrieve-list",
     ),
+    path(
+        "api/library/songs/prune/",
+        library_views.SongPruneView.as_view(),
+        name="library-song-prune",
+    ),
+    path(
+        "api/library/songs/sync/",
+        library_views.SongSyncView.as_view(),
+        name="library-song-sync",
+    ),
+    path(
+        "api/library/songs/import/",
+        library_views.SongImportView.as_view(),
+        name="library-song-import",
+    ),
+    path(
+        "api/library/works/import/",
+        library_views.WorkImportView.as_view(),
+        name="library-work-import",
+    ),
+    path(
+        "api/library/imports/<int:pk>/",
+        library_views.ImportJobView.as_view(),
+        name="library-import-job",
+    ),
+    path(
+        "api/library/changes/",
+        library_views.LibraryChangeListView.as_view(),
+        name="library-change-list",
+    ),
+    path(
+        "api/library/autocomplete/",
+        library_views.AutocompleteView.as_view(),
+        name="library-autocomplete",
+    ),
     path(
         "api/library/artists/",
         library_views.ArtistListView.as_view(),
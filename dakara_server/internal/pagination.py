@@ -1,14 +1,338 @@
-from rest_framework.pagination import PageNumberPagination
+import base64
+import binascii
+import datetime
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import F, OrderBy, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
 from rest_framework.response import Response
 
 
+def encode_value(value):
+    """Convert a value of a sort key that cannot be stored in JSON.
+
+    Args:
+        value (any): Value of a sort key.
+
+    Returns:
+        str: Value in ISO format for dates and times, as string otherwise.
+    """
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+
+    return str(value)
+
+
+class CursorPaginationCustom(BasePagination):
+    """Keyset pagination.
+
+    Objects of a page are the objects following or preceding a cursor, which
+    holds the values of the sort keys of the last or first object of the
+    previous or next page. The sort keys are the ordering of the query set,
+    completed by the primary key to be unique. Contrary to the page number
+    pagination, getting a page does not depend on its depth.
+
+    The cursor is given by the `cursor` parameter of the query string, it is
+    empty for the first page. The total number of objects is given only if
+    requested with `count=1`, as counting is costly for large query sets.
+
+    Values of sort keys are stored in the cursor as JSON, dates and times
+    being stored in ISO format.
+    """
+
+    cursor_query_param = "cursor"
+    count_query_param = "count"
+    invalid_cursor_message = "Invalid cursor"
+
+    def __init__(self, page_size):
+        self.page_size = page_size
+        self.objects = None
+        self.next = None
+        self.previous = None
+        self.count = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        keys = self.get_keys(queryset)
+        values, reverse = self.decode_cursor(
+            request.query_params.get(self.cursor_query_param), len(keys)
+        )
+
+        # annotate the sort keys to read their values on objects
+        queryset_page = queryset.annotate(
+            **{f"cursor_{index}": key for index, (key, _) in enumerate(keys)}
+        )
+
+        if values is not None:
+            values = self.convert_values(queryset_page, values)
+            queryset_page = queryset_page.filter(self.get_filter(keys, values, reverse))
+
+        queryset_page = queryset_page.order_by(
+            *(
+                OrderBy(F(f"cursor_{index}"), descending=descending != reverse)
+                for index, (_, descending) in enumerate(keys)
+            )
+        )
+
+        # the direction of the sort keys already accounts for a reversed query
+        # set
+        if not queryset.query.standard_ordering:
+            queryset_page = queryset_page.reverse()
+
+        # get one more object to know if there is another page
+        objects = list(queryset_page[: self.page_size + 1])
+        has_more = len(objects) > self.page_size
+        objects = objects[: self.page_size]
+
+        if reverse:
+            objects.reverse()
+
+        has_next = values is not None if reverse else has_more
+        has_previous = has_more if reverse else values is not None
+
+        if objects:
+            self.next = self.encode_cursor(objects[-1], len(keys)) if has_next else None
+            self.previous = (
+                self.encode_cursor(objects[0], len(keys), reverse=True)
+                if has_previous
+                else None
+            )
+
+        if request.query_params.get(self.count_query_param, "").lower() in (
+            "1",
+            "true",
+        ):
+            self.count = queryset.count()
+
+        self.objects = objects
+        return objects
+
+    def get_paginated_response(self, data):
+        return Response(
+            {
+                "pagination": {"next": self.next, "previous": self.previous},
+                "count": self.count,
+                "results": data,
+            }
+        )
+
+    @staticmethod
+    def get_keys(queryset):
+        """Give the sort keys of a query set.
+
+        Args:
+            queryset (django.db.models.QuerySet): Ordered query set.
+
+        Returns:
+            list of tuple: Expression of the key and if it is descending. The
+            last key is the primary key.
+        """
+        query = queryset.query
+        ordering = query.order_by
+        if not ordering and query.default_ordering:
+            ordering = query.get_meta().ordering
+
+        keys = []
+        for item in ordering:
+            if isinstance(item, str):
+                descending = item.startswith("-")
+                key = F(item.lstrip("-"))
+
+            elif isinstance(item, OrderBy):
+                descending = item.descending
+                key = item.expression
+
+            else:
+                descending = False
+                key = item
+
+            keys.append((key, descending != (not query.standard_ordering)))
+
+        keys.append((F("pk"), not query.standard_ordering))
+
+        return keys
+
+    @staticmethod
+    def get_filter(keys, values, reverse):
+        """Give the filter of objects after or before a cursor.
+
+        Args:
+            keys (list of tuple): Sort keys.
+            values (list): Values of the sort keys of the cursor.
+            reverse (bool): If True, filter objects before the cursor.
+
+        Returns:
+            django.db.models.Q: Filter.
+        """
+        filter_query = Q()
+        for index, (_, descending) in enumerate(keys):
+            lookup = "lt" if descending != reverse else "gt"
+            filter_key = Q(**{f"cursor_{index}__{lookup}": values[index]})
+            for index_previous in range(index):
+                filter_key &= Q(**{f"cursor_{index_previous}": values[index_previous]})
+
+            filter_query |= filter_key
+
+        return filter_query
+
+    @staticmethod
+    def encode_cursor(obj, keys_count, reverse=False):
+        """Create a cursor from an object.
+
+        Args:
+            obj (django.db.models.Model): Object annotated with its sort keys.
+            keys_count (int): Number of sort keys.
+            reverse (bool): If True, the cursor points to objects before.
+
+        Returns:
+            str: Cursor.
+        """
+        cursor = {
+            "v": [getattr(obj, f"cursor_{index}") for index in range(keys_count)],
+            "r": reverse,
+        }
+
+        return base64.urlsafe_b64encode(
+            json.dumps(cursor, default=encode_value).encode()
+        ).decode()
+
+    def decode_cursor(self, cursor, keys_count):
+        """Read a cursor.
+
+        Args:
+            cursor (str): Cursor, possibly empty.
+            keys_count (int): Number of sort keys.
+
+        Returns:
+            tuple: Values of the sort keys, None for the first page, and
+            direction of the cursor.
+
+        Raises:
+            rest_framework.exceptions.NotFound: If the cursor is invalid.
+        """
+        if not cursor:
+            return None, False
+
+        try:
+            cursor = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            values = cursor["v"]
+            reverse = bool(cursor["r"])
+
+        except (binascii.Error, ValueError, TypeError, KeyError) as error:
+            raise NotFound(self.invalid_cursor_message) from error
+
+        if not isinstance(values, list) or len(values) != keys_count:
+            raise NotFound(self.invalid_cursor_message)
+
+        return values, reverse
+
+    def convert_values(self, queryset, values):
+        """Convert the values of a cursor to the types of their sort keys.
+
+        Args:
+            queryset (django.db.models.QuerySet): Query set annotated with
+                its sort keys.
+            values (list): Values of the sort keys of the cursor.
+
+        Returns:
+            list: Converted values.
+
+        Raises:
+            rest_framework.exceptions.NotFound: If a value cannot be converted
+                or is out of the range of its sort key.
+        """
+        converted_values = []
+        for index, value in enumerate(values):
+            if value is None:
+                raise NotFound(self.invalid_cursor_message)
+
+            field = queryset.query.annotations[f"cursor_{index}"].output_field
+
+            try:
+                value = field.to_python(value)
+                field.run_validators(value)
+
+            except (TypeError, ValueError, ValidationError) as error:
+                raise NotFound(self.invalid_cursor_message) from error
+
+            converted_values.append(value)
+
+        return converted_values
+
+
+class SincePaginationCustom(BasePagination):
+    """Pagination by sequence number.
+
+    Objects of a page are the objects which primary key is greater than the
+    `since` parameter of the query string, in order of primary key. The
+    sequence number to give for the next page is the primary key of the last
+    object of the page, or the given one if the page is empty, so that a
+    client can poll for new objects with it.
+    """
+
+    since_query_param = "since"
+    invalid_since_message = "Invalid since"
+    page_size = 1000
+
+    def __init__(self):
+        self.since = None
+        self.more = False
+
+    def paginate_queryset(self, queryset, request, view=None):
+        since = request.query_params.get(self.since_query_param, "0")
+
+        try:
+            since = int(since)
+
+        except ValueError as error:
+            raise NotFound(self.invalid_since_message) from error
+
+        if since < 0:
+            raise NotFound(self.invalid_since_message)
+
+        # get one more object to know if there is another page
+        objects = list(
+            queryset.filter(pk__gt=since).order_by("pk")[: self.page_size + 1]
+        )
+        self.more = len(objects) > self.page_size
+        objects = objects[: self.page_size]
+        self.since = objects[-1].pk if objects else since
+
+        return objects
+
+    def get_paginated_response(self, data):
+        return Response(
+            {
+                "pagination": {"since": self.since, "more": self.more},
+                "results": data,
+            }
+        )
+
+
 class PageNumberPaginationCustom(PageNumberPagination):
     """Pagination.
 
     Gives current page number and last page number.
+
+    If the `cursor` parameter is in the query string, the keyset pagination is
+    used instead, see `CursorPaginationCustom`.
     """
 
+    def __init__(self):
+        self.cursor_pagination = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if CursorPaginationCustom.cursor_query_param in request.query_params:
+            self.cursor_pagination = CursorPaginationCustom(self.get_page_size(request))
+            return self.cursor_pagination.paginate_queryset(queryset, request, view)
+
+        return super().paginate_queryset(queryset, request, view)
+
     def get_paginated_response(self, data):
+        if self.cursor_pagination is not None:
+            return self.cursor_pagination.get_paginated_response(data)
+
         return Response(
             {
                 "pagination": {
@@ -19,3 +343,14 @@ class PageNumberPaginationCustom(PageNumberPagination):
                 "results": data,
             }
         )
+
+    def get_page_objects(self):
+        """Give the objects of the current page.
+
+        Returns:
+            list: Objects of the page.
+        """
+        if self.cursor_pagination is not None:
+            return self.cursor_pagination.objects
+
+        return self.page.object_list
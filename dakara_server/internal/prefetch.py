@@ -0,0 +1,150 @@
+from django.db.models import Prefetch
+from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+
+from internal.projection import get_unused_columns
+
+
+def get_prefetch_plan(serializer):
+    """Give the related objects needed to represent objects with a serializer.
+
+    The plan is deduced from the nested serializers and the related fields of
+    the serializer. Relations accessed elsewhere, e.g. in a method field, can
+    be declared in the `select_related` and `prefetch_related` attributes of
+    the `Meta` class of the serializer. Columns not needed to represent the
+    objects, e.g. large texts that are only written, can be declared in the
+    `defer` attribute of the `Meta` class. Serializers which need only a few
+    columns can instead have an `only` attribute, see
+    `internal.projection.get_unused_columns`, so that all other columns are
+    deferred.
+
+    Plans of nested serializers of single objects are merged in the plan of
+    the serializer, plans of nested serializers of several objects are applied
+    to the query set of the prefetch.
+
+    Args:
+        serializer (rest_framework.serializers.Serializer): Serializer
+            instance.
+
+    Returns:
+        tuple: List of lookups for `select_related`, list of lookups or
+        `Prefetch` objects for `prefetch_related` and list of lookups for
+        `defer`.
+    """
+    meta = getattr(serializer, "Meta", None)
+    select_related = list(getattr(meta, "select_related", []))
+    prefetch_related = list(getattr(meta, "prefetch_related", []))
+    defer = list(getattr(meta, "defer", []))
+    if hasattr(meta, "only"):
+        defer.extend(get_unused_columns(serializer))
+
+    for field in serializer.fields.values():
+        if field.write_only or field.source == "*":
+            continue
+
+        lookup = field.source.replace(".", "__")
+
+        if isinstance(field, serializers.ListSerializer) and isinstance(
+            field.child, serializers.ModelSerializer
+        ):
+            model = field.child.Meta.model
+            prefetch_related.append(
+                Prefetch(
+                    lookup,
+                    queryset=apply_prefetch_plan(
+                        model._default_manager.all(), field.child
+                    ),
+                )
+            )
+            continue
+
+        if isinstance(field, serializers.ModelSerializer):
+            select_related_child, prefetch_related_child, defer_child = (
+                get_prefetch_plan(field)
+            )
+            select_related.append(lookup)
+            select_related.extend(
+                f"{lookup}__{lookup_child}" for lookup_child in select_related_child
+            )
+            prefetch_related.extend(
+                prefix_prefetch(lookup, lookup_child)
+                for lookup_child in prefetch_related_child
+            )
+            defer.extend(f"{lookup}__{lookup_child}" for lookup_child in defer_child)
+            continue
+
+        if isinstance(field, serializers.ManyRelatedField):
+            prefetch_related.append(lookup)
+            continue
+
+        # primary keys of related objects are obtained without joining
+        if isinstance(field, serializers.RelatedField) and not isinstance(
+            field, serializers.PrimaryKeyRelatedField
+        ):
+            select_related.append(lookup)
+
+    return select_related, prefetch_related, defer
+
+
+def prefix_prefetch(prefix, lookup):
+    """Make a prefetch lookup relative to a related object.
+
+    Args:
+        prefix (str): Lookup of the related object.
+        lookup (str or django.db.models.Prefetch): Prefetch lookup relative to
+            the related object.
+
+    Returns:
+        str or django.db.models.Prefetch: Prefetch lookup relative to the
+        object.
+    """
+    if isinstance(lookup, Prefetch):
+        return Prefetch(
+            f"{prefix}__{lookup.prefetch_through}", queryset=lookup.queryset
+        )
+
+    return f"{prefix}__{lookup}"
+
+
+def apply_prefetch_plan(query_set, serializer):
+    """Fetch the related objects needed by a serializer with a query set.
+
+    Columns not needed by the serializer are not fetched.
+
+    Args:
+        query_set (django.db.models.QuerySet): Objects to represent.
+        serializer (rest_framework.serializers.Serializer): Serializer
+            instance.
+
+    Returns:
+        django.db.models.QuerySet: Query set fetching related objects.
+    """
+    select_related, prefetch_related, defer = get_prefetch_plan(serializer)
+
+    if select_related:
+        query_set = query_set.select_related(*select_related)
+
+    if prefetch_related:
+        query_set = query_set.prefetch_related(*prefetch_related)
+
+    if defer:
+        query_set = query_set.defer(*defer)
+
+    return query_set
+
+
+class PrefetchPlanMixin:
+    """Mixin that fetches the related objects needed by the serializer.
+
+    The plan is applied when the query set is filtered, so that views can
+    still define how to get it. It is applied for reading methods only, as
+    other methods do not represent objects from the query set.
+    """
+
+    def filter_queryset(self, queryset):
+        query_set = super().filter_queryset(queryset)
+
+        if self.request.method not in SAFE_METHODS:
+            return query_set
+
+        return apply_prefetch_plan(query_set, self.get_serializer_class()())
@@ -0,0 +1,236 @@
+import json
+from itertools import islice
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import QuerySet
+from django.db.models.manager import BaseManager
+from django.http import StreamingHttpResponse
+from rest_framework import renderers, serializers
+from rest_framework.utils.encoders import JSONEncoder
+
+STREAM_CHUNK_SIZE = 2000
+
+
+def get_columns(serializer):
+    """Give the columns needed to represent objects with a serializer.
+
+    Objects can be represented from their columns only if the serializer has
+    plain fields on columns of the model and nested serializers of single
+    related objects which can also be represented from their columns. Method
+    fields, related fields and nested serializers of several objects need
+    model instances.
+
+    Args:
+        serializer (rest_framework.serializers.ModelSerializer): Serializer
+            instance.
+
+    Returns:
+        list of tuple: Name and columns of each column, the columns of a
+        column being a list for a related object or None for a value. None if
+        the serializer needs model instances.
+    """
+    model = serializer.Meta.model
+    columns = []
+
+    for field in serializer.fields.values():
+        if field.write_only:
+            continue
+
+        if field.source == "*" or "." in field.source:
+            return None
+
+        try:
+            model_field = model._meta.get_field(field.source)
+
+        except FieldDoesNotExist:
+            return None
+
+        if isinstance(field, serializers.ModelSerializer):
+            if not (model_field.many_to_one or model_field.one_to_one):
+                return None
+
+            columns_child = get_columns(field)
+            if columns_child is None:
+                return None
+
+            columns.append((field.source, columns_child))
+            continue
+
+        if not model_field.concrete or model_field.is_relation:
+            return None
+
+        columns.append((field.source, None))
+
+    return columns
+
+
+def get_lookups(columns, prefix=""):
+    """Give the lookups to get columns with `values_list`.
+
+    Args:
+        columns (list of tuple): Columns, see `get_columns`.
+        prefix (str): Lookup of the related object of the columns.
+
+    Yields:
+        str: Lookup of each column, the lookup of a related object comes
+        before the lookups of its columns.
+    """
+    for name, columns_child in columns:
+        yield prefix + name
+
+        if columns_child is not None:
+            yield from get_lookups(columns_child, f"{prefix}{name}__")
+
+
+def get_row(columns, values):
+    """Give the row of an object from the values of its columns.
+
+    Args:
+        columns (list of tuple): Columns, see `get_columns`.
+        values (iterator): Values in the order of `get_lookups`, they are
+            consumed.
+
+    Returns:
+        dict: Values of the columns by name, with a row for each related
+        object, or None if there is no related object.
+    """
+    row = {}
+    for name, columns_child in columns:
+        value = next(values)
+        if columns_child is None:
+            row[name] = value
+            continue
+
+        row_child = get_row(columns_child, values)
+        row[name] = row_child if value is not None else None
+
+    return row
+
+
+def get_unused_columns(serializer):
+    """Give the columns of the model not needed by a serializer.
+
+    The needed columns are the ones of the fields of the serializer, plus the
+    ones declared in the `only` attribute of its `Meta` class, e.g. columns
+    used by a method field.
+
+    Args:
+        serializer (rest_framework.serializers.ModelSerializer): Serializer
+            instance.
+
+    Returns:
+        list of str: Names of the columns which can be deferred.
+    """
+    meta = serializer.Meta
+    needed = set(meta.only)
+    for field in serializer.fields.values():
+        if field.write_only or field.source == "*":
+            continue
+
+        needed.add(field.source.split(".")[0])
+
+    return [
+        model_field.name
+        for model_field in meta.model._meta.concrete_fields
+        if not model_field.primary_key and model_field.name not in needed
+    ]
+
+
+class ValuesListSerializer(serializers.ListSerializer):
+    """List serializer that represents objects from their columns.
+
+    When given a query set, only the columns needed by the child serializer
+    are fetched, as tuples, instead of model instances. Other data, or a child
+    serializer which needs model instances, are represented as usual.
+
+    To be used with the `list_serializer_class` attribute of the `Meta` class
+    of a serializer.
+    """
+
+    def to_representation(self, data):
+        columns = get_columns(self.child)
+        if columns is None or not isinstance(data, (QuerySet, BaseManager)):
+            return super().to_representation(data)
+
+        query_set = data.all().prefetch_related(None)
+        return [
+            self.child.to_representation(get_row(columns, iter(values)))
+            for values in query_set.values_list(*get_lookups(columns))
+        ]
+
+
+def get_lines(items, size=STREAM_CHUNK_SIZE):
+    """Give items as lines of JSON, grouped in chunks.
+
+    Args:
+        items (iterable): Items to give.
+        size (int): Number of lines of a chunk.
+
+    Yields:
+        str: Chunk of lines, each line being an item in JSON.
+    """
+    items = iter(items)
+    while chunk := list(islice(items, size)):
+        yield "".join(
+            json.dumps(item, cls=JSONEncoder, ensure_ascii=False, separators=(",", ":"))
+            + "\n"
+            for item in chunk
+        )
+
+
+class NDJSONRenderer(renderers.BaseRenderer):
+    """Renderer of newline-delimited JSON.
+
+    A list is rendered with an item per line, other data are rendered on a
+    single line.
+    """
+
+    media_type = "application/x-ndjson"
+    format = "ndjson"
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+
+        items = data if isinstance(data, list) else [data]
+        return "".join(get_lines(items)).encode()
+
+
+class StreamedListMixin:
+    """Mixin that streams the list as newline-delimited JSON.
+
+    The stream is requested with the `Accept: application/x-ndjson` header or
+    with `format=ndjson` in the query string. Objects are fetched by chunks of
+    `STREAM_CHUNK_SIZE`, as rows of the columns needed by the serializer if it
+    can represent objects from their columns, see `get_columns`, so that the
+    memory used does not depend on the number of objects and the first objects
+    are sent before the last ones are fetched.
+    """
+
+    def get_renderers(self):
+        return [*super().get_renderers(), NDJSONRenderer()]
+
+    def list(self, request, *args, **kwargs):
+        if not isinstance(request.accepted_renderer, NDJSONRenderer):
+            return super().list(request, *args, **kwargs)
+
+        query_set = self.filter_queryset(self.get_queryset())
+        serializer = self.get_serializer()
+        columns = get_columns(serializer)
+
+        if columns is None:
+            objects = query_set.iterator(chunk_size=STREAM_CHUNK_SIZE)
+
+        else:
+            objects = (
+                get_row(columns, iter(values))
+                for values in query_set.prefetch_related(None)
+                .values_list(*get_lookups(columns))
+                .iterator(chunk_size=STREAM_CHUNK_SIZE)
+            )
+
+        return StreamingHttpResponse(
+            get_lines(serializer.to_representation(obj) for obj in objects),
+            content_type=NDJSONRenderer.media_type,
+        )
@@ -0,0 +1,90 @@
+from internal.projection import (
+    NDJSONRenderer,
+    get_columns,
+    get_lines,
+    get_lookups,
+    get_row,
+    get_unused_columns,
+)
+from library.serializers import (
+    SongForPlayerSerializer,
+    SongSerializer,
+    WorkForFeederSerializer,
+)
+from playlist.serializers import PlaylistEntryForDigestSerializer
+
+
+class TestGetColumns:
+    """Test the columns needed by serializers."""
+
+    def test_nested(self):
+        """Test to get the columns of a serializer with a related object."""
+        columns = get_columns(WorkForFeederSerializer())
+
+        assert columns == [
+            ("id", None),
+            ("title", None),
+            ("subtitle", None),
+            ("work_type", [("query_name", None)]),
+        ]
+        assert list(get_lookups(columns)) == [
+            "id",
+            "title",
+            "subtitle",
+            "work_type",
+            "work_type__query_name",
+        ]
+
+    def test_instances(self):
+        """Test serializers needing instances have no columns."""
+        # method field and related objects
+        assert get_columns(SongSerializer()) is None
+        assert get_columns(SongForPlayerSerializer()) is None
+
+
+class TestGetRow:
+    """Test the rows built from values of columns."""
+
+    def test_get_row(self):
+        """Test to build a row with related objects."""
+        columns = get_columns(PlaylistEntryForDigestSerializer())
+        values = [1, 2, 2, "Song", None, False, None, False, None, None, None]
+
+        assert get_row(columns, iter(values)) == {
+            "id": 1,
+            "song": {"id": 2, "title": "Song", "duration": None},
+            "use_instrumental": False,
+            "date_play": None,
+            "was_played": False,
+            "owner": None,
+        }
+
+
+class TestGetUnusedColumns:
+    """Test the columns deferred for serializers."""
+
+    def test_get_unused_columns(self):
+        """Test columns used by a method field are kept."""
+        columns = get_unused_columns(SongForPlayerSerializer())
+
+        assert "lyrics" in columns
+        assert "title" not in columns
+        assert "directory" not in columns
+        assert "filename" not in columns
+
+
+class TestGetLines:
+    """Test the lines of JSON of streamed lists."""
+
+    def test_get_lines(self):
+        """Test to group lines in chunks."""
+        lines = list(get_lines([{"id": 1}, {"id": 2}, {"id": 3}], size=2))
+
+        assert lines == ['{"id":1}\n{"id":2}\n', '{"id":3}\n']
+
+    def test_render(self):
+        """Test to render a list and other data."""
+        renderer = NDJSONRenderer()
+
+        assert renderer.render([{"id": 1}, {"id": 2}]) == b'{"id":1}\n{"id":2}\n'
+        assert renderer.render({"detail": "é"}) == '{"detail":"é"}\n'.encode()
@@ -0,0 +1,12 @@
+from internal.apps import DakaraConfig
+
+
+class LibraryConfig(DakaraConfig):
+    """Library app."""
+
+    name = "library"
+
+    def ready_reload(self):
+        """Method called when app start and by reloader."""
+        # connect the signals once the models are loaded
+        from library import signals  # noqa F401
@@ -0,0 +1,226 @@
+import re
+
+from django.db.models import Q
+
+from library.models import SearchPrefix, Song, SongTag
+from library.normalization import get_prefix_expression, normalize
+from library.query_language import KEYWORDS, get_parser
+
+SUGGESTIONS_LIMIT = 10
+SUGGESTIONS_LIMIT_MAX = 50
+KEY_MAX_LENGTH = 255
+
+# last token of a query, possibly following a keyword, possibly quoted
+TOKEN_MATCHER = re.compile(
+    r"""
+    (?:(?<!\S)(?P<keyword>\w+):\s?)?    # keyword and separator
+    (?P<quote>"{1,2})?                  # opening quotes
+    (?P<value>(?(quote)[^"]*|\S*))      # value being typed
+    $
+    """,
+    re.X,
+)
+
+# kinds of texts that can be completed by keyword
+KEYWORD_KINDS = {
+    "artist": [SearchPrefix.ARTIST],
+    "title": [SearchPrefix.SONG],
+    "work": [SearchPrefix.WORK, SearchPrefix.ALTERNATIVE_TITLE],
+}
+
+# kind of suggestions by kind of texts
+SUGGESTION_KINDS = {
+    SearchPrefix.SONG: "song",
+    SearchPrefix.ARTIST: "artist",
+    SearchPrefix.WORK: "work",
+    SearchPrefix.ALTERNATIVE_TITLE: "work",
+}
+
+
+def get_prefix_keys(text):
+    """Give the keys of the prefix index of a text.
+
+    Args:
+        text (str): Text to index.
+
+    Returns:
+        list of str: Normalized text starting from each of its words.
+    """
+    text = normalize(text)
+    return [
+        text[match.start() : match.start() + KEY_MAX_LENGTH]
+        for match in re.finditer(r"\w+", text)
+    ]
+
+
+def update_prefixes(kind, objects):
+    """Replace the prefix index entries of objects.
+
+    Scopes are stored normalized, so that they are compared by equality.
+
+    Args:
+        kind (str): Kind of the objects, see `SearchPrefix.KIND_CHOICES`.
+        objects (list of tuple): List of ID, text and scope of objects to
+            index.
+    """
+    objects = list(objects)
+    delete_prefixes(kind, [object_id for object_id, _, _ in objects])
+
+    SearchPrefix.objects.bulk_create(
+        [
+            SearchPrefix(
+                kind=kind,
+                object_id=object_id,
+                key=key,
+                label=text,
+                scope=normalize(scope),
+            )
+            for object_id, text, scope in objects
+            for key in get_prefix_keys(text)
+        ],
+        batch_size=500,
+    )
+
+
+def delete_prefixes(kind, object_ids):
+    """Delete the prefix index entries of objects.
+
+    Args:
+        kind (str): Kind of the objects, see `SearchPrefix.KIND_CHOICES`.
+        object_ids (list of int): IDs of the objects.
+    """
+    SearchPrefix.objects.filter(kind=kind, object_id__in=object_ids).delete()
+
+
+class Autocomplete:
+    """Give suggestions to complete the last token of a query.
+
+    The token can be a keyword of the query language, a tag, or a prefix of
+    a song title, an artist name, a work title or a work alternative title,
+    possibly restricted by a keyword.
+
+    Args:
+        show_disabled (bool): If True, suggest tags that are disabled and
+            titles of songs with disabled tags.
+        limit (int): Maximum number of suggestions.
+    """
+
+    def __init__(self, show_disabled=False, limit=SUGGESTIONS_LIMIT):
+        self.show_disabled = show_disabled
+        self.limit = limit
+
+    def get_suggestions(self, query):
+        """Give suggestions for a query.
+
+        Args:
+            query (str): Query being typed.
+
+        Returns:
+            list of tuple: Kind of suggestion and suggested text, the kind
+            being `keyword`, `tag`, `song`, `artist` or `work`.
+        """
+        match = TOKEN_MATCHER.search(query)
+        keyword = (match.group("keyword") or "").lower()
+        value = match.group("value")
+
+        if not keyword:
+            if not value:
+                return []
+
+            if value.startswith("#"):
+                return self.get_tags(value[1:])
+
+            return (self.get_keywords(value) + self.get_texts(value))[: self.limit]
+
+        if keyword in KEYWORD_KINDS:
+            return self.get_texts(value, KEYWORD_KINDS[keyword])
+
+        if keyword in get_parser().keywords_work_type:
+            return self.get_texts(value, KEYWORD_KINDS["work"], scope=keyword)
+
+        return []
+
+    def get_keywords(self, prefix):
+        """Give keywords of the query language starting with a prefix.
+
+        Args:
+            prefix (str): Prefix to complete.
+
+        Returns:
+            list of tuple: Suggestions.
+        """
+        prefix = prefix.lower()
+        return [
+            ("keyword", keyword + ":")
+            for keyword in KEYWORDS + get_parser().keywords_work_type
+            if keyword.lower().startswith(prefix)
+        ]
+
+    def get_tags(self, prefix):
+        """Give tags starting with a prefix.
+
+        Args:
+            prefix (str): Prefix to complete.
+
+        Returns:
+            list of tuple: Suggestions.
+        """
+        tags = SongTag.objects.filter(name__istartswith=prefix)
+        if not self.show_disabled:
+            tags = tags.filter(disabled=False)
+
+        return [
+            ("tag", "#" + name)
+            for name in tags.order_by("name").values_list("name", flat=True)[
+                : self.limit
+            ]
+        ]
+
+    def get_texts(self, prefix, kinds=None, scope=None):
+        """Give searchable texts having a word starting with a prefix.
+
+        The lookup is a prefix of the key of the prefix index, served by its
+        index in the order of the keys, so that it is stopped as soon as
+        enough entries are found, see
+        `library.normalization.get_prefix_expression`.
+
+        Args:
+            prefix (str): Prefix to complete.
+            kinds (list of str): Kinds of texts to consider, all kinds if not
+                provided.
+            scope (str): Query name of the work type to restrict works to.
+
+        Returns:
+            list of tuple: Suggestions.
+        """
+        prefix = normalize(prefix)[:KEY_MAX_LENGTH]
+        if not prefix:
+            return []
+
+        entries = SearchPrefix.objects.alias(
+            prefix_key=get_prefix_expression("key", SearchPrefix.objects.db)
+        ).filter(prefix_key__startswith=prefix)
+
+        if kinds is not None:
+            entries = entries.filter(kind__in=kinds)
+
+        if scope is not None:
+            entries = entries.filter(scope=normalize(scope))
+
+        if not self.show_disabled:
+            entries = entries.exclude(
+                Q(kind=SearchPrefix.SONG)
+                & Q(object_id__in=Song.objects.filter(hidden=True).values("pk"))
+            )
+
+        # several entries can have the same text, so more entries than needed
+        # are fetched
+        suggestions = []
+        for kind, label in entries.order_by("prefix_key").values_list("kind", "label")[
+            : self.limit * 4
+        ]:
+            suggestion = (SUGGESTION_KINDS[kind], label)
+            if suggestion not in suggestions:
+                suggestions.append(suggestion)
+
+        return suggestions[: self.limit]
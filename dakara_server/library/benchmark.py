@@ -0,0 +1,740 @@
+import itertools
+import random
+import statistics
+import time
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.db import DEFAULT_DB_ALIAS, connection, transaction
+from django.db.models import Q
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from library.lyrics import update_lyrics_tokens
+from library.models import (
+    Artist,
+    SearchLyricsToken,
+    Song,
+    SongTag,
+    SongWorkLink,
+    Work,
+    WorkAlternativeTitle,
+    WorkType,
+)
+from library.query_language import QueryLanguageParser
+from library.search import (
+    SongExistsSearch,
+    SongSearch,
+    chunks,
+    update_song_search_documents,
+)
+from library.search_cache import bump_library_revision
+from library.signals import index_texts, update_hidden_songs, update_song_counts
+
+UserModel = get_user_model()
+
+BATCH_SIZE = 1000
+PAGE_SIZE = 10
+LYRICS_RATIO = 0.6
+
+# possible numbers of objects of each kind linked to a song
+ARTISTS_FAN_OUT = (1, 1, 1, 2, 3)
+WORKS_FAN_OUT = (0, 1, 1, 1, 2)
+TAGS_FAN_OUT = (0, 0, 0, 1, 2)
+
+WORDS = (
+    "love heart night star dream sky fire rain summer winter light dark blue "
+    "red angel blade spirit ghost moon sun ocean river wind storm flower "
+    "cherry snow shadow crystal silver golden eternal last first final "
+    "brave wild lonely secret magic hero legend world future memory promise "
+    "tomorrow yesterday forever hope wings voice song melody rhythm dance "
+    "city road journey"
+).split()
+
+WORK_TYPES = (
+    ("Anime", "anime"),
+    ("Game", "game"),
+    ("Cartoon", "cartoon"),
+    ("Live action", "live"),
+)
+
+QUERIES = (
+    "love",
+    "night sky",
+    "artist:star",
+    'artist:""silver moon""',
+    "anime:dream",
+    'title:""love""',
+    "#TAG1",
+    "summer anime:angel #TAG2",
+)
+
+
+def get_text(generator, words_min, words_max):
+    """Generate a random text.
+
+    Args:
+        generator (random.Random): Random generator.
+        words_min (int): Minimum number of words.
+        words_max (int): Maximum number of words.
+
+    Returns:
+        str: Text of random words.
+    """
+    return " ".join(
+        generator.choice(WORDS).capitalize()
+        for _ in range(generator.randint(words_min, words_max))
+    )
+
+
+def get_lyrics(generator):
+    """Generate random lyrics.
+
+    Args:
+        generator (random.Random): Random generator.
+
+    Returns:
+        str: Lines of random words, or empty string for songs without lyrics.
+    """
+    if generator.random() >= LYRICS_RATIO:
+        return ""
+
+    return "\n".join(get_text(generator, 3, 7) for _ in range(generator.randint(4, 12)))
+
+
+def get_popularity(count):
+    """Give the cumulated popularity of objects.
+
+    The popularity of objects follows a Zipf law, so that a few objects are
+    linked to many songs and most objects are linked to a few songs.
+
+    Args:
+        count (int): Number of objects.
+
+    Returns:
+        list of float: Cumulated weights, to be used with `random.choices`.
+    """
+    return list(itertools.accumulate(1 / (rank + 1) for rank in range(count)))
+
+
+def pick(generator, population, popularity, fan_out):
+    """Pick distinct objects by popularity.
+
+    Args:
+        generator (random.Random): Random generator.
+        population (list): Objects to pick from.
+        popularity (list of float): Cumulated weights of the objects.
+        fan_out (tuple): Possible numbers of objects to pick.
+
+    Returns:
+        list: Objects picked.
+    """
+    count = generator.choice(fan_out)
+    if not count:
+        return []
+
+    return list(
+        dict.fromkeys(generator.choices(population, cum_weights=popularity, k=count))
+    )
+
+
+def normalized(obj):
+    """Update the normalized fields of an object created in bulk.
+
+    Args:
+        obj (library.models.NormalizedFieldsModel): Object.
+
+    Returns:
+        library.models.NormalizedFieldsModel: The object.
+    """
+    obj.update_normalized_fields()
+    return obj
+
+
+def previewed(song):
+    """Update the extract of the lyrics of a song created in bulk.
+
+    Args:
+        song (library.models.Song): Song.
+
+    Returns:
+        library.models.Song: The song.
+    """
+    song.update_lyrics_preview()
+    return song
+
+
+@transaction.atomic
+def create_synthetic_library(songs_count, seed=0):
+    """Populate the library with random songs and related objects.
+
+    The library has a number of artists and works proportional to the number
+    of songs, 4 work types and 20 tags, one of them disabled. Artists and
+    works are linked to songs according to their popularity.
+
+    Objects are created in bulk, without sending signals, then the data
+    maintained by signals are computed, see `index_synthetic_library`.
+
+    Args:
+        songs_count (int): Number of songs to create.
+        seed (int): Seed of the random generator, for reproducibility.
+    """
+    generator = random.Random(seed)
+
+    work_types = WorkType.objects.bulk_create(
+        WorkType(name=name, name_plural=name + "s", query_name=query_name)
+        for name, query_name in WORK_TYPES
+    )
+    tags = SongTag.objects.bulk_create(
+        normalized(SongTag(name="TAG{}".format(index), disabled=index == 19))
+        for index in range(20)
+    )
+    artists = Artist.objects.bulk_create(
+        (
+            normalized(Artist(name=get_text(generator, 1, 3)))
+            for _ in range(max(songs_count // 4, 1))
+        ),
+        batch_size=BATCH_SIZE,
+    )
+    works = Work.objects.bulk_create(
+        (
+            normalized(
+                Work(
+                    title=get_text(generator, 1, 4),
+                    subtitle=generator.choice(("", "", get_text(generator, 1, 3))),
+                    work_type=generator.choice(work_types),
+                )
+            )
+            for _ in range(max(songs_count // 3, 1))
+        ),
+        batch_size=BATCH_SIZE,
+    )
+    alternative_titles = WorkAlternativeTitle.objects.bulk_create(
+        (
+            normalized(WorkAlternativeTitle(title=get_text(generator, 1, 4), work=work))
+            for work in works
+            for _ in range(generator.choice((0, 0, 1, 2)))
+        ),
+        batch_size=BATCH_SIZE,
+    )
+    songs = Song.objects.bulk_create(
+        (
+            previewed(
+                normalized(
+                    Song(
+                        title=get_text(generator, 1, 4),
+                        filename="song{}.mp4".format(index),
+                        directory="directory{}".format(index % 100),
+                        duration=timedelta(seconds=generator.randint(60, 300)),
+                        version=generator.choice(("", "", "TV", "Full")),
+                        lyrics=get_lyrics(generator),
+                    )
+                )
+            )
+            for index in range(songs_count)
+        ),
+        batch_size=BATCH_SIZE,
+    )
+
+    artists_popularity = get_popularity(len(artists))
+    Song.artists.through.objects.bulk_create(
+        (
+            Song.artists.through(song_id=song.pk, artist_id=artist.pk)
+            for song in songs
+            for artist in pick(generator, artists, artists_popularity, ARTISTS_FAN_OUT)
+        ),
+        batch_size=BATCH_SIZE,
+    )
+    tags_popularity = get_popularity(len(tags))
+    Song.tags.through.objects.bulk_create(
+        (
+            Song.tags.through(song_id=song.pk, songtag_id=tag.pk)
+            for song in songs
+            for tag in pick(generator, tags, tags_popularity, TAGS_FAN_OUT)
+        ),
+        batch_size=BATCH_SIZE,
+    )
+    works_popularity = get_popularity(len(works))
+    SongWorkLink.objects.bulk_create(
+        (
+            SongWorkLink(
+                song_id=song.pk,
+                work_id=work.pk,
+                link_type=generator.choice(list(SongWorkLink.LINK_TYPE_CHOICES)),
+            )
+            for song in songs
+            for work in pick(generator, works, works_popularity, WORKS_FAN_OUT)
+        ),
+        batch_size=BATCH_SIZE,
+    )
+
+    index_synthetic_library(songs, artists, works, alternative_titles, tags)
+
+
+def index_synthetic_library(songs, artists, works, alternative_titles, tags):
+    """Compute the data maintained by signals for objects created in bulk.
+
+    Args:
+        songs (list of library.models.Song): Songs.
+        artists (list of library.models.Artist): Artists.
+        works (list of library.models.Work): Works.
+        alternative_titles (list of library.models.WorkAlternativeTitle):
+            Alternative titles of works.
+        tags (list of library.models.SongTag): Tags.
+    """
+    for model, instances in (
+        (Song, songs),
+        (Artist, artists),
+        (Work, works),
+        (WorkAlternativeTitle, alternative_titles),
+    ):
+        for instances_chunk in chunks(instances):
+            index_texts(model, instances_chunk)
+
+    for model, instances in ((Artist, artists), (Work, works), (SongTag, tags)):
+        for instances_chunk in chunks(instances):
+            update_song_counts(model, [instance.pk for instance in instances_chunk])
+
+    for songs_chunk in chunks(songs):
+        update_hidden_songs([song.pk for song in songs_chunk])
+        update_lyrics_tokens(
+            [(song.pk, song.lyrics) for song in songs_chunk if song.lyrics]
+        )
+
+    update_song_search_documents([song.pk for song in songs])
+
+
+class SongJoinSearch(SongExistsSearch):
+    """Resolve a parsed query by joining the related tables of songs.
+
+    This is the former way songs were searched, kept for comparison. All the
+    terms are resolved on the same joined rows, which multiplies the rows of
+    songs and requires a `DISTINCT`.
+    """
+
+    # lookups of the fields of songs
+    LOOKUPS = {
+        "title": ["title"],
+        "artists": ["artists__name"],
+        "works": ["works__title", "works__alternative_title__title"],
+        "tags": ["tags__name"],
+        "details": ["version", "detail", "detail_video"],
+    }
+
+    def lookup(self, fields, lookup_type, value, work_type=None):
+        query = Q()
+        for field in fields:
+            for lookup in self.LOOKUPS[field]:
+                query |= Q(**{"{}__{}".format(lookup, lookup_type): value})
+
+        if work_type is not None:
+            query &= Q(works__work_type__query_name__iexact=work_type)
+
+        return query
+
+    def filter(self, query_set, query_parsed):
+        return super().filter(query_set, query_parsed).distinct()
+
+
+def benchmark_synthetic_searches(songs_count, queries=QUERIES, repeat=5, seed=0):
+    """Compare the ways to search songs on a synthetic library.
+
+    The library is created in a transaction which is rolled back once the
+    searches are measured, so that the database is left as it was.
+
+    Args:
+        songs_count (int): Number of songs of the synthetic library.
+        queries (list of str): Queries to search.
+        repeat (int): Number of times each search is run.
+        seed (int): Seed of the synthetic library.
+
+    Returns:
+        list of dict: Results by query and way of searching, see
+        `benchmark_searches`.
+    """
+    with transaction.atomic():
+        create_synthetic_library(songs_count, seed=seed)
+        results = benchmark_searches(DEFAULT_DB_ALIAS, queries=queries, repeat=repeat)
+        transaction.set_rollback(True)
+
+    return results
+
+
+def benchmark_searches(using, queries=QUERIES, repeat=5):
+    """Compare the ways to search songs.
+
+    For each query and each way, the songs matching are counted and the first
+    page is fetched, as done by the list of songs, and the query plan is
+    collected.
+
+    Args:
+        using (str): Alias of the database to search in.
+        queries (list of str): Queries to search.
+        repeat (int): Number of times each search is run, the median duration
+            is kept.
+
+    Returns:
+        list of dict: Results by query and way of searching, with the number
+        of songs matching, the median duration in seconds and the query plan.
+    """
+    searches = {
+        "join": SongJoinSearch(using),
+        "exists": SongExistsSearch(using),
+        "document": SongSearch(using),
+    }
+    parser = QueryLanguageParser()
+    query_set = Song.objects.using(using).filter(hidden=False)
+
+    results = []
+    for query in queries:
+        query_parsed = parser.parse(query)
+        for name, search in searches.items():
+            songs = search.filter(query_set, query_parsed).order_by("title_normalized")
+            durations = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                count = songs.count()
+                list(songs.values_list("pk", flat=True)[:PAGE_SIZE])
+                durations.append(time.perf_counter() - start)
+
+            results.append(
+                {
+                    "query": query,
+                    "search": name,
+                    "count": count,
+                    "duration": statistics.median(durations),
+                    "plan": songs.explain(),
+                }
+            )
+
+    return results
+
+
+class LegacyQueryLanguageParser(QueryLanguageParser):
+    """Parse the query language as the former parser.
+
+    This is the former way queries were parsed, kept as a reference for tests
+    and benchmarks. The expression of keyword terms is run, then substituted
+    to get the remaining text, which is split one character at a time. Tags
+    are removed from the list of remaining words one by one, which is
+    quadratic in the number of tags.
+    """
+
+    @staticmethod
+    def split_remaining(string):
+        """Split the text left once terms are removed, char by char."""
+        result = []
+        current_expression = ""
+        in_quotes = False
+        previous_char = ""
+        for char in string:
+            if char == '"':
+                if in_quotes:
+                    if current_expression:
+                        result.append(current_expression)
+                    in_quotes = False
+                    current_expression = ""
+                else:
+                    current_expression = current_expression.strip()
+                    if current_expression:
+                        result.append(current_expression)
+                    in_quotes = True
+                    current_expression = ""
+            elif char == " " and not in_quotes and previous_char != "\\":
+                current_expression = current_expression.strip()
+                if current_expression:
+                    result.append(current_expression)
+                current_expression = ""
+            elif char != "\\":
+                current_expression += char
+
+            previous_char = char
+
+        current_expression = current_expression.strip()
+        if current_expression:
+            result.append(current_expression)
+
+        return result
+
+    def parse_uncached(self, query):
+        result = {
+            "artist": {"contains": [], "exact": []},
+            "work": {"contains": [], "exact": []},
+            "title": {"contains": [], "exact": []},
+            "lyrics": {"contains": [], "exact": []},
+            "work_type": {},
+            "remaining": [],
+            "tag": [],
+        }
+
+        for match in self.language_matcher.finditer(query):
+            group_index = match.groupdict()
+
+            # extract values
+            target = group_index["keyword"].strip().lower()
+            value_exact = (group_index["exact"] or "").strip()
+            value_contains = (
+                (group_index["contains"] or group_index["contains2"] or "")
+                .replace("\\", "")
+                .strip()
+            )
+
+            if target in self.keywords_work_type:
+                # create worktype if not exists
+                if target not in result["work_type"]:
+                    result["work_type"][target] = {"contains": [], "exact": []}
+
+                result_target = result["work_type"][target]
+
+            else:
+                result_target = result[target]
+
+            if value_contains and not value_exact:
+                result_target["contains"].append(value_contains)
+
+            elif value_exact and not value_contains:
+                result_target["exact"].append(value_exact)
+
+            else:
+                raise ValueError("Inconsistency")
+
+        # deal with remaining
+        remaining = self.language_matcher.sub("", query)
+        result["remaining"] = self.split_remaining(remaining)
+
+        # deal with tags
+        for item in result["remaining"][:]:
+            if item[0] == "#":
+                result["remaining"].remove(item)
+                item_clean = item[1:]
+                if item_clean:
+                    result["tag"].append(item_clean.upper())
+
+        return result
+
+
+# fragments of the queries of the parsers benchmark
+QUERY_FRAGMENTS = (
+    "love",
+    "night sky",
+    "title:dream",
+    'artist:"star light"',
+    'work:""legend of""',
+    "anime:angel",
+    "#TAG1",
+    "lyrics:hope",
+    "summer\\ night",
+    '"quoted words"',
+)
+
+
+def get_query(generator, terms):
+    """Generate a random query.
+
+    Args:
+        generator (random.Random): Random generator.
+        terms (int): Number of fragments of the query.
+
+    Returns:
+        str: Fragments of `QUERY_FRAGMENTS` separated by spaces.
+    """
+    return " ".join(generator.choice(QUERY_FRAGMENTS) for _ in range(terms))
+
+
+def benchmark_parsers(lengths=(10, 100, 1000), repeat=5, seed=0):
+    """Compare the ways to parse queries.
+
+    Parsers are used without their cache of parsed queries.
+
+    Args:
+        lengths (list of int): Numbers of fragments of the parsed queries.
+        repeat (int): Number of times each query is parsed, the median
+            duration is kept.
+        seed (int): Seed of the queries.
+
+    Returns:
+        list of dict: Results by length of query and parser, with the number
+        of characters of the query and the median duration in seconds.
+    """
+    generator = random.Random(seed)
+    parsers = {
+        "legacy": LegacyQueryLanguageParser(),
+        "current": QueryLanguageParser(),
+    }
+
+    results = []
+    for length in lengths:
+        query = get_query(generator, length)
+        for name, parser in parsers.items():
+            durations = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                parser.parse_uncached(query)
+                durations.append(time.perf_counter() - start)
+
+            results.append(
+                {
+                    "terms": length,
+                    "characters": len(query),
+                    "parser": name,
+                    "duration": statistics.median(durations),
+                }
+            )
+
+    return results
+
+
+# URL names of the benchmarked views
+VIEWS = {
+    "song": "library-song-list",
+    "artist": "library-artist-list",
+    "work": "library-work-list",
+}
+
+# benchmarks of the views, with their view, name and query string, covering
+# each construct of the query language
+VIEW_BENCHMARKS = (
+    ("song", "list", {}),
+    ("song", "list_last_page", {"page": "last"}),
+    ("song", "remaining", {"query": "love"}),
+    ("song", "remaining_words", {"query": "night sky"}),
+    ("song", "title_contains", {"query": "title:dream"}),
+    ("song", "title_exact", {"query": 'title:""love""'}),
+    ("song", "artist_contains", {"query": "artist:star"}),
+    ("song", "artist_exact", {"query": 'artist:""star""'}),
+    ("song", "work_contains", {"query": "work:legend"}),
+    ("song", "work_exact", {"query": 'work:""legend""'}),
+    ("song", "work_type_contains", {"query": "anime:dream"}),
+    ("song", "work_type_exact", {"query": 'anime:""dream""'}),
+    ("song", "tag", {"query": "#TAG1"}),
+    ("song", "lyrics_contains", {"query": 'lyrics:"hope wings"'}),
+    ("song", "lyrics_exact", {"query": 'lyrics:""love dream""'}),
+    ("song", "complex", {"query": "summer anime:angel #TAG2"}),
+    ("song", "fuzzy", {"query": "melodi", "fuzzy": "1"}),
+    ("song", "relevance", {"query": "love", "ordering": "relevance"}),
+    ("song", "facets", {"query": "love", "facets": "work_type,tag,artist"}),
+    ("song", "cursor", {"query": "love", "cursor": ""}),
+    ("artist", "list", {}),
+    ("artist", "query", {"query": "star"}),
+    ("artist", "fuzzy", {"query": "journy", "fuzzy": "1"}),
+    ("artist", "song_count", {"ordering": "song_count"}),
+    ("work", "list", {}),
+    ("work", "query", {"query": "legend"}),
+    ("work", "fuzzy", {"query": "lgend", "fuzzy": "1"}),
+    ("work", "type", {"type": "anime"}),
+    ("work", "song_count", {"ordering": "song_count"}),
+)
+
+
+def request_view(view_name, params, user):
+    """Request a view and measure the request.
+
+    Args:
+        view_name (str): Name of the view, see `VIEWS`.
+        params (dict): Query string.
+        user (django.contrib.auth.models.AbstractUser): User requesting.
+
+    Returns:
+        tuple: Response, duration in seconds and number of queries.
+    """
+    url = reverse(VIEWS[view_name])
+    request = APIRequestFactory().get(url, params)
+    force_authenticate(request, user=user)
+
+    with CaptureQueriesContext(connection) as queries:
+        start = time.perf_counter()
+        response = resolve(url).func(request)
+        response.render()
+        duration = time.perf_counter() - start
+
+    return response, duration, len(queries)
+
+
+def benchmark_views(benchmarks=VIEW_BENCHMARKS, repeat=5):
+    """Measure the views listing the library.
+
+    Each benchmark is requested by a user without rights, first with the
+    cached search results invalidated, then once more to use them.
+
+    Args:
+        benchmarks (list of tuple): View, name and query string of each
+            benchmark.
+        repeat (int): Number of times each benchmark is requested without
+            cache, the median duration is kept.
+
+    Returns:
+        dict: Report, with the size of the library and the results of each
+        benchmark: status code, number of objects listed, median duration in
+        seconds and number of queries, with and without cache.
+    """
+    user = UserModel(username="benchmark", library_permission_level=UserModel.USER)
+
+    results = []
+    for view_name, name, params in benchmarks:
+        durations = []
+        for _ in range(repeat):
+            bump_library_revision()
+            response, duration, queries_count = request_view(view_name, params, user)
+            durations.append(duration)
+
+        _, duration_cached, queries_count_cached = request_view(view_name, params, user)
+
+        results.append(
+            {
+                "view": view_name,
+                "name": name,
+                "params": params,
+                "status": response.status_code,
+                "count": response.data.get("count"),
+                "duration": statistics.median(durations),
+                "queries": queries_count,
+                "duration_cached": duration_cached,
+                "queries_cached": queries_count_cached,
+            }
+        )
+
+    return {
+        "library": {
+            "songs": Song.objects.count(),
+            "artists": Artist.objects.count(),
+            "works": Work.objects.count(),
+            "lyrics_tokens": SearchLyricsToken.objects.count(),
+        },
+        "repeat": repeat,
+        "results": results,
+    }
+
+
+def compare_reports(report, baseline):
+    """Compare the results of a report with the ones of a baseline report.
+
+    Args:
+        report (dict): Report, see `benchmark_views`.
+        baseline (dict): Baseline report.
+
+    Returns:
+        list of dict: View, name, ratio of the durations and difference of the
+        number of queries of each benchmark present in both reports.
+    """
+    baseline_results = {
+        (result["view"], result["name"]): result for result in baseline["results"]
+    }
+
+    comparison = []
+    for result in report["results"]:
+        baseline_result = baseline_results.get((result["view"], result["name"]))
+        if baseline_result is None:
+            continue
+
+        comparison.append(
+            {
+                "view": result["view"],
+                "name": result["name"],
+                "duration_ratio": result["duration"]
+                / max(baseline_result["duration"], 1e-9),
+                "queries_difference": result["queries"] - baseline_result["queries"],
+            }
+        )
+
+    return comparison
@@ -0,0 +1,146 @@
+import weakref
+
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+from library.models import (
+    Artist,
+    LibraryChange,
+    Song,
+    SongTag,
+    Work,
+    WorkAlternativeTitle,
+    WorkType,
+)
+from library.search import chunks
+
+# kind of changes by model
+MODEL_KINDS = {
+    Song: LibraryChange.SONG,
+    Artist: LibraryChange.ARTIST,
+    Work: LibraryChange.WORK,
+    WorkAlternativeTitle: LibraryChange.ALTERNATIVE_TITLE,
+    WorkType: LibraryChange.WORK_TYPE,
+    SongTag: LibraryChange.SONG_TAG,
+}
+
+# name of the kind of changes given to clients
+CHANGE_KINDS = {
+    LibraryChange.SONG: "song",
+    LibraryChange.ARTIST: "artist",
+    LibraryChange.WORK: "work",
+    LibraryChange.ALTERNATIVE_TITLE: "work_alternative_title",
+    LibraryChange.WORK_TYPE: "work_type",
+    LibraryChange.SONG_TAG: "song_tag",
+}
+
+
+class CommitCallback:
+    """Function to run once the transaction is committed, see `on_commit_once`.
+
+    Args:
+        function (callable): Function to run.
+        registered (dict): Callbacks registered on the connection, by
+            function, from which the callback is removed when run.
+    """
+
+    def __init__(self, function, registered):
+        self.function = function
+        self.registered = registered
+
+    def __call__(self):
+        self.registered.pop(self.function, None)
+        self.function()
+
+
+# callbacks registered for the current transaction of each connection, by
+# function, as weak references
+_registered_callbacks = weakref.WeakKeyDictionary()
+
+
+def on_commit_once(function, using=DEFAULT_DB_ALIAS):
+    """Run a function once the current transaction is committed, only once.
+
+    The function is registered by `transaction.on_commit` the first time it
+    is given during the transaction. Only a weak reference to the callback is
+    kept, so that a callback discarded by the rollback of the transaction, or
+    of the savepoint it was registered in, is released and the function is
+    registered again the next time it is given. Outside of a transaction, the
+    function is run immediately.
+
+    Args:
+        function (callable): Function to run.
+        using (str): Alias of the database.
+    """
+    connection = transaction.get_connection(using)
+    registered = _registered_callbacks.setdefault(connection, {})
+    reference = registered.get(function)
+    if reference is not None and reference() is not None:
+        return
+
+    callback = CommitCallback(function, registered)
+    registered[function] = weakref.ref(callback)
+    transaction.on_commit(callback, using=using)
+
+
+def lock_changes(using):
+    """Serialize the writes to the changes until the transaction is committed.
+
+    Sequence numbers of changes are given when they are inserted, so that two
+    transactions writing changes at the same time could be committed in the
+    reverse order of their sequence numbers, and a client asking for the
+    changes in between would miss the changes of the first one. The changes
+    are then written by one transaction at a time, so that sequence numbers
+    are committed in order. SQLite already allows one writing transaction at
+    a time, the table of changes is locked on PostgreSQL. On other databases,
+    changes are only given in order with a single writer. As changes are
+    written with the objects, the transactions changing the library are then
+    serialized once they record changes.
+
+    Args:
+        using (str): Alias of the database, must be in a transaction.
+    """
+    connection = connections[using]
+    if connection.vendor != "postgresql":
+        return
+
+    # this mode conflicts with itself but not with reads
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "LOCK TABLE {} IN SHARE ROW EXCLUSIVE MODE".format(
+                connection.ops.quote_name(LibraryChange._meta.db_table)
+            )
+        )
+
+
+def record_changes(model, object_ids, deleted=False, using=DEFAULT_DB_ALIAS):
+    """Record the changes of objects in the current transaction.
+
+    The previous change of each object is replaced, so that the new change
+    gets a greater sequence number. Changes are written with the objects, so
+    that they are committed or rolled back with them. Outside of a
+    transaction, changes are written in their own transaction.
+
+    Args:
+        model (type): Model of the objects.
+        object_ids (iterable): IDs of the objects, None values are ignored.
+        deleted (bool): If True, the objects were deleted.
+        using (str): Alias of the database.
+    """
+    kind = MODEL_KINDS[model]
+    object_ids = list(
+        dict.fromkeys(object_id for object_id in object_ids if object_id is not None)
+    )
+    if not object_ids:
+        return
+
+    with transaction.atomic(using=using, savepoint=False):
+        lock_changes(using)
+
+        for object_ids_chunk in chunks(object_ids):
+            LibraryChange.objects.using(using).filter(
+                kind=kind, object_id__in=object_ids_chunk
+            ).delete()
+            LibraryChange.objects.using(using).bulk_create(
+                LibraryChange(kind=kind, object_id=object_id, deleted=deleted)
+                for object_id in object_ids_chunk
+            )
@@ -0,0 +1,106 @@
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import CASCADE
+
+from library.autocomplete import delete_prefixes
+from library.changes import on_commit_once, record_changes
+from library.fuzzy import delete_trigrams
+from library.models import Artist, SearchEntry, Song, SongTag, SongWorkLink, Work
+from library.search import chunks
+from library.search_cache import bump_library_revision
+from library.signals import SONG_COUNT_LINKS, update_song_counts
+
+
+def get_song_relations():
+    """Give the relations of other models to songs.
+
+    Returns:
+        list of django.db.models.ForeignObjectRel: Relations from objects
+        deleted with their song, including links to artists and tags.
+    """
+    return [
+        field
+        for field in Song._meta.get_fields(include_hidden=True)
+        if field.auto_created
+        and not field.concrete
+        and (field.one_to_many or field.one_to_one)
+    ]
+
+
+@transaction.atomic
+def delete_songs(queryset):
+    """Delete songs with the objects referencing them, in bulk.
+
+    This is the bulk counterpart of deleting songs one by one. Songs are
+    deleted by chunks, each relation to songs being deleted by a query per
+    chunk. As songs and song-work links are deleted without sending signals,
+    the data maintained by signals are updated afterwards for all the songs:
+    numbers of songs of their artists, tags and works, indexes of their
+    titles, changes of the library and revision of the library.
+
+    Objects referencing songs are deleted by `QuerySet.delete`, so playlist
+    entries are still removed from the playlist by their own signals. If a
+    relation to songs does not cascade their deletion, songs are deleted by
+    `QuerySet.delete` as well, so that the rule of each relation is applied.
+
+    Args:
+        queryset (django.db.models.QuerySet): Songs to delete.
+
+    Returns:
+        tuple: Total number of deleted objects, and number of deleted objects
+        by model label, as given by `QuerySet.delete`.
+    """
+    song_ids = list(queryset.order_by().values_list("pk", flat=True))
+    relations = get_song_relations()
+    cascade = all(relation.on_delete is CASCADE for relation in relations)
+    deleted_counts = Counter()
+    object_ids = {Artist: set(), SongTag: set(), Work: set()}
+
+    for song_ids_chunk in chunks(song_ids):
+        # remember the objects which songs are counted
+        for model, (link, field) in SONG_COUNT_LINKS.items():
+            object_ids[model].update(
+                link.objects.filter(song_id__in=song_ids_chunk).values_list(
+                    field, flat=True
+                )
+            )
+
+        songs_chunk = Song._base_manager.filter(pk__in=song_ids_chunk)
+        if not cascade:
+            # the rule of each relation is applied by the collector
+            _, deleted_counts_chunk = songs_chunk.delete()
+            deleted_counts.update(deleted_counts_chunk)
+
+        else:
+            for relation in relations:
+                related_queryset = relation.related_model._base_manager.filter(
+                    **{f"{relation.field.name}__in": song_ids_chunk}
+                )
+
+                # signals of song-work links are replaced by the updates below
+                if relation.related_model is SongWorkLink:
+                    deleted_counts[
+                        SongWorkLink._meta.label
+                    ] += related_queryset._raw_delete(related_queryset.db)
+                    continue
+
+                _, deleted_counts_related = related_queryset.delete()
+                deleted_counts.update(deleted_counts_related)
+
+            # all objects referencing the songs are deleted
+            deleted_counts[Song._meta.label] += songs_chunk._raw_delete(songs_chunk.db)
+
+        delete_trigrams(SearchEntry.SONG, song_ids_chunk)
+        delete_prefixes(SearchEntry.SONG, song_ids_chunk)
+
+    for model, object_ids_model in object_ids.items():
+        for object_ids_chunk in chunks(object_ids_model):
+            update_song_counts(model, object_ids_chunk)
+
+    record_changes(Song, song_ids, deleted=True)
+
+    bump_library_revision()
+    on_commit_once(bump_library_revision)
+
+    return sum(deleted_counts.values()), dict(deleted_counts)
@@ -0,0 +1,112 @@
+from django.db.models import Count
+
+from library.models import Song, SongWorkLink
+
+ARTISTS_LIMIT = 10
+
+
+def count_songs_by(links, keys, limit=None):
+    """Count songs of links grouped by keys.
+
+    Args:
+        links (django.db.models.QuerySet): Links between songs and objects.
+        keys (dict): Lookups of the keys to group by, by name. The second one
+            is used to order groups with the same number of songs, the first
+            one must identify the group.
+        limit (int): Maximum number of groups, all groups if not provided.
+
+    Returns:
+        list of dict: Keys and number of songs of each group, by decreasing
+        number of songs.
+    """
+    lookups = list(keys.values())
+    groups = (
+        links.values(*lookups)
+        .annotate(count=Count("song_id", distinct=True))
+        .order_by("-count", lookups[1], lookups[0])
+        .values_list(*lookups, "count")
+    )
+
+    if limit is not None:
+        groups = groups[:limit]
+
+    return [dict(zip([*keys, "count"], group)) for group in groups]
+
+
+def count_work_types(song_ids):
+    """Count songs by type of their works.
+
+    Args:
+        song_ids (django.db.models.QuerySet): IDs of the songs to count.
+
+    Returns:
+        list of dict: ID, name, query name and number of songs of each work
+        type, by decreasing number of songs.
+    """
+    return count_songs_by(
+        SongWorkLink.objects.filter(song_id__in=song_ids),
+        {
+            "id": "work__work_type_id",
+            "name": "work__work_type__name",
+            "query_name": "work__work_type__query_name",
+        },
+    )
+
+
+def count_tags(song_ids):
+    """Count songs by tag.
+
+    Args:
+        song_ids (django.db.models.QuerySet): IDs of the songs to count.
+
+    Returns:
+        list of dict: ID, name and number of songs of each tag, by decreasing
+        number of songs.
+    """
+    return count_songs_by(
+        Song.tags.through.objects.filter(song_id__in=song_ids),
+        {"id": "songtag_id", "name": "songtag__name"},
+    )
+
+
+def count_artists(song_ids):
+    """Count songs by artist, for the artists with the most songs.
+
+    Args:
+        song_ids (django.db.models.QuerySet): IDs of the songs to count.
+
+    Returns:
+        list of dict: ID, name and number of songs of the `ARTISTS_LIMIT`
+        artists with the most songs, by decreasing number of songs.
+    """
+    return count_songs_by(
+        Song.artists.through.objects.filter(song_id__in=song_ids),
+        {"id": "artist_id", "name": "artist__name"},
+        limit=ARTISTS_LIMIT,
+    )
+
+
+# counting function of each facet
+FACETS = {
+    "work_type": count_work_types,
+    "tag": count_tags,
+    "artist": count_artists,
+}
+
+
+def count_facets(query_set, names):
+    """Count songs by facet.
+
+    Each facet is counted by a single grouped query over the songs, which are
+    given as a subquery.
+
+    Args:
+        query_set (django.db.models.QuerySet): Songs to count.
+        names (list of str): Names of the facets, see `FACETS`.
+
+    Returns:
+        dict: Counts of each facet, by name.
+    """
+    song_ids = query_set.order_by().values("pk")
+
+    return {name: FACETS[name](song_ids) for name in names}
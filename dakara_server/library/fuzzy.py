@@ -0,0 +1,325 @@
+import re
+
+from django.db import connections
+from django.db.models import Case, Count, F, FloatField, Value, When
+from django.db.models.functions import Cast
+
+from library.models import (
+    Artist,
+    SearchTrigram,
+    Song,
+    SongWorkLink,
+    Work,
+    WorkAlternativeTitle,
+)
+from library.normalization import normalize
+
+SIMILARITY_THRESHOLD = 0.3
+CANDIDATES_LIMIT = 100
+
+# models and fields of the texts of each kind of trigram
+SOURCES = {
+    SearchTrigram.SONG: (Song, "title_normalized"),
+    SearchTrigram.ARTIST: (Artist, "name_normalized"),
+    SearchTrigram.WORK: (Work, "title_normalized"),
+    SearchTrigram.ALTERNATIVE_TITLE: (WorkAlternativeTitle, "title_normalized"),
+}
+
+_pg_trgm_available = {}
+
+
+def get_trigrams(text):
+    """Extract the trigrams of a text.
+
+    Trigrams are extracted the same way `pg_trgm` does: the text is
+    normalized and split in words of alphanumeric characters, each word is
+    padded with two spaces before and one space after.
+
+    Args:
+        text (str): Text to extract trigrams from.
+
+    Returns:
+        set of str: Distinct trigrams of the text.
+    """
+    trigrams = set()
+    for word in re.findall(r"\w+", normalize(text)):
+        word = "  " + word + " "
+        trigrams.update(word[index : index + 3] for index in range(len(word) - 2))
+
+    return trigrams
+
+
+def update_trigrams(kind, objects):
+    """Replace the trigrams of objects.
+
+    Args:
+        kind (str): Kind of the objects, see `SearchTrigram.KIND_CHOICES`.
+        objects (list of tuple): List of ID and text of objects to index.
+    """
+    objects = list(objects)
+    delete_trigrams(kind, [object_id for object_id, _ in objects])
+
+    search_trigrams = []
+    for object_id, text in objects:
+        trigrams = get_trigrams(text)
+        search_trigrams.extend(
+            SearchTrigram(
+                trigram=trigram, kind=kind, object_id=object_id, total=len(trigrams)
+            )
+            for trigram in trigrams
+        )
+
+    SearchTrigram.objects.bulk_create(search_trigrams, batch_size=500)
+
+
+def delete_trigrams(kind, object_ids):
+    """Delete the trigrams of objects.
+
+    Args:
+        kind (str): Kind of the objects, see `SearchTrigram.KIND_CHOICES`.
+        object_ids (list of int): IDs of the objects.
+    """
+    SearchTrigram.objects.filter(kind=kind, object_id__in=object_ids).delete()
+
+
+def has_pg_trgm(using):
+    """Tell if the `pg_trgm` PostgreSQL extension is available.
+
+    Args:
+        using (str): Alias of the database.
+
+    Returns:
+        bool: True if the extension can be used.
+    """
+    if using not in _pg_trgm_available:
+        connection = connections[using]
+        available = False
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+                available = cursor.fetchone() is not None
+
+        _pg_trgm_available[using] = available
+
+    return _pg_trgm_available[using]
+
+
+class FuzzySearch:
+    """Typo-tolerant search based on trigram similarity.
+
+    The similarity of two texts is the number of trigrams they share divided
+    by the number of distinct trigrams of both texts. It is computed by the
+    `pg_trgm` extension if available, or from the precomputed trigrams of
+    `SearchTrigram` otherwise.
+
+    Only the most similar objects are considered, so that the cost of a search
+    does not depend on the size of the library.
+
+    Args:
+        using (str): Alias of the database to search in.
+        threshold (float): Minimal similarity for a text to match.
+        limit (int): Maximum number of objects matching, per kind of text.
+    """
+
+    def __init__(self, using, threshold=SIMILARITY_THRESHOLD, limit=CANDIDATES_LIMIT):
+        self.using = using
+        self.threshold = threshold
+        self.limit = limit
+        self.pg_trgm = has_pg_trgm(using)
+
+        if self.pg_trgm:
+            # the similarity operator, served by the trigram indexes, uses the
+            # threshold of the session
+            with connections[using].cursor() as cursor:
+                cursor.execute(
+                    "SELECT set_config('pg_trgm.similarity_threshold', %s, false)",
+                    [str(threshold)],
+                )
+
+    def get_similarities(self, kind, text):
+        """Give the objects of a kind which text is similar to a text.
+
+        Args:
+            kind (str): Kind of the objects, see `SearchTrigram.KIND_CHOICES`.
+            text (str): Text to search.
+
+        Returns:
+            dict: Similarity of each matching object, by ID.
+        """
+        if self.pg_trgm:
+            from django.contrib.postgres.lookups import TrigramSimilar
+            from django.contrib.postgres.search import TrigramSimilarity
+
+            model, field = SOURCES[kind]
+            text = normalize(text)
+            similarities = (
+                model.objects.using(self.using)
+                .filter(TrigramSimilar(F(field), text))
+                .annotate(similarity=TrigramSimilarity(field, text))
+                .filter(similarity__gte=self.threshold)
+                .order_by("-similarity", "pk")
+                .values_list("pk", "similarity")[: self.limit]
+            )
+
+            return dict(similarities)
+
+        trigrams = get_trigrams(text)
+        if not trigrams:
+            return {}
+
+        similarities = (
+            SearchTrigram.objects.using(self.using)
+            .filter(
+                kind=kind,
+                object_id__in=self.get_candidates(kind, trigrams),
+                trigram__in=trigrams,
+            )
+            .values("object_id", "total")
+            .annotate(shared=Count("pk"))
+            .annotate(
+                similarity=Cast(F("shared"), FloatField())
+                / (len(trigrams) + F("total") - F("shared"))
+            )
+            .filter(similarity__gte=self.threshold)
+            .order_by("-similarity", "object_id")
+            .values_list("object_id", "similarity")[: self.limit]
+        )
+
+        return dict(similarities)
+
+    def get_candidates(self, kind, trigrams):
+        """Give the objects of a kind which may be similar to trigrams.
+
+        An object similar enough shares at least a given part of the trigrams,
+        so it contains one of the rarest trigrams beyond this part, and only
+        the objects containing them are compared. No object similar enough is
+        left out.
+
+        Args:
+            kind (str): Kind of the objects, see `SearchTrigram.KIND_CHOICES`.
+            trigrams (set of str): Trigrams of the text to search.
+
+        Returns:
+            django.db.models.QuerySet: IDs of the objects to compare.
+        """
+        postings = dict(
+            SearchTrigram.objects.using(self.using)
+            .filter(kind=kind, trigram__in=trigrams)
+            .values_list("trigram")
+            .annotate(Count("pk"))
+            .order_by()
+        )
+        trigrams_sorted = sorted(
+            trigrams, key=lambda trigram: (postings.get(trigram, 0), trigram)
+        )
+
+        # an object with a similarity of at least the threshold shares at least
+        # the threshold of the trigrams, trigrams of no objects select nothing
+        shared_min = max(int(self.threshold * len(trigrams)), 1)
+        trigrams_selecting = [
+            trigram
+            for trigram in trigrams_sorted[: len(trigrams) - shared_min + 1]
+            if trigram in postings
+        ]
+
+        return (
+            SearchTrigram.objects.using(self.using)
+            .filter(kind=kind, trigram__in=trigrams_selecting)
+            .values("object_id")
+        )
+
+    def get_work_similarities(self, text):
+        """Give the works which title or alternative titles are similar.
+
+        Args:
+            text (str): Text to search.
+
+        Returns:
+            dict: Similarity of each matching work, by ID.
+        """
+        similarities = self.get_similarities(SearchTrigram.WORK, text)
+        alternative_titles = self.get_similarities(
+            SearchTrigram.ALTERNATIVE_TITLE, text
+        )
+        for alternative_title_id, work_id in (
+            WorkAlternativeTitle.objects.using(self.using)
+            .filter(pk__in=alternative_titles)
+            .values_list("pk", "work_id")
+        ):
+            merge(similarities, work_id, alternative_titles[alternative_title_id])
+
+        return similarities
+
+    def get_artist_similarities(self, text):
+        """Give the artists which name is similar.
+
+        Args:
+            text (str): Text to search.
+
+        Returns:
+            dict: Similarity of each matching artist, by ID.
+        """
+        return self.get_similarities(SearchTrigram.ARTIST, text)
+
+    def get_song_similarities(self, text):
+        """Give the songs which title, artists or works are similar.
+
+        Args:
+            text (str): Text to search.
+
+        Returns:
+            dict: Similarity of each matching song, by ID.
+        """
+        similarities = self.get_similarities(SearchTrigram.SONG, text)
+
+        artists = self.get_artist_similarities(text)
+        for song_id, artist_id in (
+            Song.artists.through.objects.using(self.using)
+            .filter(artist_id__in=artists)
+            .values_list("song_id", "artist_id")
+        ):
+            merge(similarities, song_id, artists[artist_id])
+
+        works = self.get_work_similarities(text)
+        for song_id, work_id in (
+            SongWorkLink.objects.using(self.using)
+            .filter(work_id__in=works)
+            .values_list("song_id", "work_id")
+        ):
+            merge(similarities, song_id, works[work_id])
+
+        return similarities
+
+    @staticmethod
+    def rank(query_set, similarities):
+        """Filter and order objects by similarity.
+
+        Args:
+            query_set (django.db.models.QuerySet): Objects to filter.
+            similarities (dict): Similarity of objects by ID.
+
+        Returns:
+            django.db.models.QuerySet: Objects matching, annotated with their
+            similarity, by decreasing similarity.
+        """
+        return query_set.filter(pk__in=similarities).annotate(
+            similarity=Case(
+                *(
+                    When(pk=pk, then=Value(similarity))
+                    for pk, similarity in similarities.items()
+                ),
+                default=Value(0.0),
+                output_field=FloatField(),
+            )
+        )
+
+
+def merge(similarities, object_id, similarity):
+    """Keep the highest similarity of an object.
+
+    Args:
+        similarities (dict): Similarity of objects by ID, modified in place.
+        object_id (int): ID of the object.
+        similarity (float): New similarity of the object.
+    """
+    similarities[object_id] = max(similarities.get(object_id, 0), similarity)
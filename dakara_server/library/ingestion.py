@@ -0,0 +1,270 @@
+from django.db import transaction
+
+from library.changes import on_commit_once, record_changes
+from library.lyrics import update_lyrics_tokens
+from library.models import Artist, Song, SongTag, SongWorkLink, Work, WorkType
+from library.query_language import clear_parser
+from library.search import chunks, update_song_search_documents
+from library.search_cache import bump_library_revision
+from library.signals import index_texts, update_song_counts
+
+BATCH_SIZE = 1000
+
+
+def get_or_create_in_bulk(model, field, objects, get_key):
+    """Get objects or create the ones which do not exist, in bulk.
+
+    Existing objects are fetched by a query per chunk of values of the field,
+    missing objects are created without sending signals. If several existing
+    objects have the same key, the first created one is given.
+
+    Args:
+        model (type): Model of the objects.
+        field (str): Field of the model to look up the objects with.
+        objects (dict): Unsaved objects to create if they do not exist, by
+            key.
+        get_key (callable): Gives the key of an object.
+
+    Returns:
+        tuple: Objects by key, and list of the created objects.
+    """
+    values = {getattr(obj, field) for obj in objects.values()}
+    objects_found = {}
+    for values_chunk in chunks(values):
+        for obj in model.objects.filter(**{f"{field}__in": values_chunk}).order_by(
+            "pk"
+        ):
+            objects_found.setdefault(get_key(obj), obj)
+
+    objects_created = model.objects.bulk_create(
+        [obj for key, obj in objects.items() if key not in objects_found],
+        batch_size=BATCH_SIZE,
+    )
+    objects_found.update((get_key(obj), obj) for obj in objects_created)
+
+    return objects_found, objects_created
+
+
+def get_artists(songs_data):
+    """Get or create the artists of songs, by name.
+
+    Args:
+        songs_data (list of dict): Validated data of songs.
+
+    Returns:
+        tuple: Artists by name, and list of the created artists.
+    """
+    artists = {}
+    for song_data in songs_data:
+        for artist_data in song_data.get("artists", []):
+            if artist_data["name"] not in artists:
+                artist = Artist(**artist_data)
+                artist.update_normalized_fields()
+                artists[artist.name] = artist
+
+    return get_or_create_in_bulk(Artist, "name", artists, lambda obj: obj.name)
+
+
+def get_tags(songs_data):
+    """Get or create the tags of songs, by name.
+
+    A tag is created with the attributes it has in the first song using it,
+    existing tags are not modified.
+
+    Args:
+        songs_data (list of dict): Validated data of songs.
+
+    Returns:
+        tuple: Tags by name, and list of the created tags.
+    """
+    tags = {}
+    for song_data in songs_data:
+        for tag_data in song_data.get("tags", []):
+            if tag_data["name"] not in tags:
+                tag = SongTag(**tag_data)
+                tag.update_normalized_fields()
+                tags[tag.name] = tag
+
+    return get_or_create_in_bulk(SongTag, "name", tags, lambda obj: obj.name)
+
+
+def get_work_types(songs_data):
+    """Get or create the work types of the works of songs, by query name.
+
+    A work type is created with the attributes it has in the first song using
+    it, existing work types are not modified.
+
+    Args:
+        songs_data (list of dict): Validated data of songs.
+
+    Returns:
+        tuple: Work types by query name, and list of the created work types.
+    """
+    work_types = {}
+    for song_data in songs_data:
+        for songworklink_data in song_data.get("songworklink_set", []):
+            work_type_data = songworklink_data["work"]["work_type"]
+            work_types.setdefault(
+                work_type_data["query_name"], WorkType(**work_type_data)
+            )
+
+    return get_or_create_in_bulk(
+        WorkType, "query_name", work_types, lambda obj: obj.query_name
+    )
+
+
+def get_work_key(work_data, work_type):
+    """Give the key of a work.
+
+    Args:
+        work_data (dict): Validated data of the work, without its type.
+        work_type (models.WorkType): Type of the work.
+
+    Returns:
+        tuple: Title, subtitle and work type ID of the work.
+    """
+    return work_data["title"], work_data.get("subtitle", ""), work_type.pk
+
+
+def get_works(songs_data, work_types):
+    """Get or create the works of songs, by title, subtitle and work type.
+
+    Args:
+        songs_data (list of dict): Validated data of songs.
+        work_types (dict): Work types by query name.
+
+    Returns:
+        tuple: Works by key, see `get_work_key`, and list of the created works.
+    """
+    works = {}
+    for song_data in songs_data:
+        for songworklink_data in song_data.get("songworklink_set", []):
+            work_data = songworklink_data["work"]
+            work_type = work_types[work_data["work_type"]["query_name"]]
+            key = get_work_key(work_data, work_type)
+            if key not in works:
+                work = Work(title=key[0], subtitle=key[1], work_type=work_type)
+                work.update_normalized_fields()
+                works[key] = work
+
+    return get_or_create_in_bulk(
+        Work, "title", works, lambda obj: (obj.title, obj.subtitle, obj.work_type_id)
+    )
+
+
+@transaction.atomic
+def create_songs(songs_data):
+    """Create songs with their artists, tags and works, in bulk.
+
+    This is the bulk counterpart of `serializers.SongSerializer.create`.
+    Artists, tags, work types and works of all the songs are fetched or
+    created at once, then songs and their links are created. As objects are
+    created without sending signals, the data maintained by signals are
+    computed afterwards for all the songs, see `index_created_songs`.
+
+    Args:
+        songs_data (list of dict): Validated data of songs, as given by
+            `serializers.SongSerializer`.
+
+    Returns:
+        list of models.Song: Created songs, in the same order.
+    """
+    artists, artists_created = get_artists(songs_data)
+    tags, _ = get_tags(songs_data)
+    work_types, work_types_created = get_work_types(songs_data)
+    works, works_created = get_works(songs_data, work_types)
+
+    songs = []
+    artist_links = []
+    tag_links = []
+    songworklinks = []
+    for song_data in songs_data:
+        song_data = dict(song_data)
+        artists_data = song_data.pop("artists", [])
+        tags_data = song_data.pop("tags", [])
+        songworklinks_data = song_data.pop("songworklink_set", [])
+
+        song = Song(**song_data)
+        song.update_normalized_fields()
+        song.update_lyrics_preview()
+        songs.append(song)
+
+        # links get the ID of the song when they are created
+        for name in dict.fromkeys(artist_data["name"] for artist_data in artists_data):
+            artist_links.append(Song.artists.through(song=song, artist=artists[name]))
+
+        for name in dict.fromkeys(tag_data["name"] for tag_data in tags_data):
+            tag_links.append(Song.tags.through(song=song, songtag=tags[name]))
+            song.hidden = song.hidden or tags[name].disabled
+
+        for songworklink_data in songworklinks_data:
+            songworklink_data = dict(songworklink_data)
+            work_data = songworklink_data.pop("work")
+            work_type = work_types[work_data["work_type"]["query_name"]]
+            songworklinks.append(
+                SongWorkLink(
+                    **songworklink_data,
+                    song=song,
+                    work=works[get_work_key(work_data, work_type)],
+                )
+            )
+
+    Song.objects.bulk_create(songs, batch_size=BATCH_SIZE)
+    for model, links in (
+        (Song.artists.through, artist_links),
+        (Song.tags.through, tag_links),
+        (SongWorkLink, songworklinks),
+    ):
+        model.objects.bulk_create(links, batch_size=BATCH_SIZE)
+
+    index_created_songs(songs, artists_created, works_created)
+    record_changes(Song, [song.pk for song in songs])
+    record_changes(WorkType, [work_type.pk for work_type in work_types_created])
+
+    # recount the songs of the objects linked to the new songs, which records
+    # their changes
+    for model, object_ids in (
+        (Artist, {link.artist_id for link in artist_links}),
+        (SongTag, {link.songtag_id for link in tag_links}),
+        (Work, {link.work_id for link in songworklinks}),
+    ):
+        for object_ids_chunk in chunks(object_ids):
+            update_song_counts(model, object_ids_chunk)
+
+    if work_types_created:
+        # work types are keywords of the query language
+        clear_parser()
+        on_commit_once(clear_parser)
+
+    bump_library_revision()
+    on_commit_once(bump_library_revision)
+
+    return songs
+
+
+def index_created_songs(songs, artists_created, works_created):
+    """Index songs created in bulk, with their new artists and works.
+
+    The searchable texts, lyrics and search documents are indexed, as done by
+    signals for objects created one by one.
+
+    Args:
+        songs (list of models.Song): Created songs.
+        artists_created (list of models.Artist): Artists created for the
+            songs.
+        works_created (list of models.Work): Works created for the songs.
+    """
+    for model, instances in (
+        (Song, songs),
+        (Artist, artists_created),
+        (Work, works_created),
+    ):
+        for instances_chunk in chunks(instances):
+            index_texts(model, instances_chunk)
+
+    for songs_chunk in chunks(songs):
+        update_lyrics_tokens(
+            [(song.pk, song.lyrics) for song in songs_chunk if song.lyrics]
+        )
+
+    update_song_search_documents([song.pk for song in songs])
@@ -0,0 +1,216 @@
+import logging
+import os
+import socket
+from datetime import timedelta
+from uuid import uuid4
+
+from apscheduler.executors.pool import ThreadPoolExecutor
+from apscheduler.schedulers.background import BackgroundScheduler
+from django.db import connection, transaction
+from django.db.models import Value
+from django.db.models.functions import Coalesce
+from django.db.utils import OperationalError
+from django.utils import timezone
+
+from library.models import ImportJob
+from library.search import chunks
+from library.serializers import SongSerializer, WorkSerializer
+
+IMPORT_JOB_NAME = "library_import_{id}"
+IMPORT_REQUEUE_JOB_NAME = "library_import_requeue"
+IMPORT_BATCH_SIZE = 500
+
+# a running job which worker did not give news for this duration is
+# considered interrupted, it must be longer than the creation of a batch
+IMPORT_JOB_LEASE = timedelta(minutes=5)
+
+# ID of the worker of this process
+WORKER_ID = "{}:{}:{}".format(socket.gethostname(), os.getpid(), uuid4().hex[:8])
+
+# serializer creating the objects of each kind of job
+SERIALIZERS = {ImportJob.SONG: SongSerializer, ImportJob.WORK: WorkSerializer}
+
+logger = logging.getLogger(__name__)
+
+# jobs are processed one at a time, in order
+scheduler = BackgroundScheduler(executors={"default": ThreadPoolExecutor(1)})
+scheduler.start()
+
+
+def create_import_job(kind, payload):
+    """Queue a job creating a list of objects.
+
+    The job is scheduled once the current transaction is committed, so that
+    the worker can read it.
+
+    Args:
+        kind (str): Kind of the job, see `ImportJob.KIND_CHOICES`.
+        payload (list of dict): Data of the objects to create.
+
+    Returns:
+        ImportJob: Queued job.
+    """
+    job = ImportJob.objects.create(kind=kind, payload=payload, total=len(payload))
+    transaction.on_commit(lambda: schedule_import_job(job.pk))
+
+    return job
+
+
+def schedule_import_job(job_id):
+    """Schedule a queued job to be processed by the background worker.
+
+    Args:
+        job_id (int): ID of the job.
+    """
+    scheduler.add_job(
+        run_import_job,
+        args=[job_id],
+        id=IMPORT_JOB_NAME.format(id=job_id),
+        replace_existing=True,
+        misfire_grace_time=None,
+    )
+    logger.debug("Import job %i was scheduled", job_id)
+
+
+def run_import_job(job_id):
+    """Process a job in the background worker.
+
+    Args:
+        job_id (int): ID of the job.
+    """
+    try:
+        process_import_job(job_id)
+
+    finally:
+        # the connection belongs to the thread of the worker
+        connection.close()
+
+
+def process_import_job(job_id):
+    """Create the objects of a queued job, in batches.
+
+    The job is claimed by setting its status and its worker, so that it is
+    processed only once. Each batch is validated and created in its own
+    transaction, with the progress of the job and the heartbeat of its
+    worker, so that an interrupted job can be resumed after its last created
+    batch. If the job was given to another worker in the meantime, see
+    `requeue_import_jobs`, the batch is not created and the job is left to the
+    other worker. If a batch is invalid or cannot be created, the job fails
+    and the objects of the previous batches are kept. The payload is cleared
+    once the job is finished.
+
+    Args:
+        job_id (int): ID of the job.
+    """
+    claimed = ImportJob.objects.filter(pk=job_id, status=ImportJob.QUEUED).update(
+        status=ImportJob.RUNNING,
+        worker=WORKER_ID,
+        date_heartbeat=timezone.now(),
+        date_started=Coalesce("date_started", Value(timezone.now())),
+    )
+    if not claimed:
+        return
+
+    job = ImportJob.objects.get(pk=job_id)
+    job_owned = ImportJob.objects.filter(
+        pk=job_id, status=ImportJob.RUNNING, worker=WORKER_ID
+    )
+    serializer_class = SERIALIZERS[job.kind]
+    status = ImportJob.DONE
+    errors = None
+
+    try:
+        for batch in chunks(job.payload[job.processed :], IMPORT_BATCH_SIZE):
+            with transaction.atomic():
+                serializer = serializer_class(data=batch, many=True)
+                if not serializer.is_valid():
+                    status = ImportJob.FAILED
+                    errors = [
+                        {"index": job.processed + offset, "errors": error}
+                        for offset, error in enumerate(serializer.errors)
+                        if error
+                    ]
+                    break
+
+                serializer.save()
+
+                job.processed += len(batch)
+                if not job_owned.update(
+                    processed=job.processed, date_heartbeat=timezone.now()
+                ):
+                    transaction.set_rollback(True)
+                    logger.warning("Import job %i was given to another worker", job_id)
+                    return
+
+    except Exception as error:
+        logger.exception("Import job %i failed", job_id)
+        status = ImportJob.FAILED
+        errors = [{"detail": str(error)}]
+
+    job_owned.update(
+        status=status, errors=errors, payload=[], date_finished=timezone.now()
+    )
+    job.refresh_from_db()
+    logger.info(
+        "Import job %i finished, %i of %i objects created (%.1f per second)",
+        job_id,
+        job.processed,
+        job.total,
+        job.throughput or 0,
+    )
+
+
+def requeue_import_jobs():
+    """Queue again the running jobs which worker is gone.
+
+    A running job which heartbeat is older than `IMPORT_JOB_LEASE` was
+    interrupted, by a stop of its worker for instance. It is queued again and
+    scheduled, so that it is resumed after its last created batch. Jobs owned
+    by a live worker, in this process or another one, are left untouched.
+    """
+    ImportJob.objects.filter(
+        status=ImportJob.RUNNING,
+        date_heartbeat__lt=timezone.now() - IMPORT_JOB_LEASE,
+    ).update(status=ImportJob.QUEUED, worker="")
+
+    job_ids = list(
+        ImportJob.objects.filter(status=ImportJob.QUEUED)
+        .order_by("pk")
+        .values_list("pk", flat=True)
+    )
+
+    for job_id in job_ids:
+        schedule_import_job(job_id)
+
+
+def run_requeue_import_jobs():
+    """Queue again the interrupted jobs in the background worker."""
+    try:
+        requeue_import_jobs()
+
+    finally:
+        # the connection belongs to the thread of the worker
+        connection.close()
+
+
+def resume_import_jobs_on_app_ready():
+    """Schedule the queued jobs and the jobs interrupted by a stop.
+
+    Interrupted jobs are then looked for periodically, for the jobs of
+    workers which stopped while this process is running.
+    """
+    try:
+        requeue_import_jobs()
+
+    # if database does not exist when checking jobs, abort the function
+    # this case occurs on startup before running tests
+    except OperationalError:
+        return
+
+    scheduler.add_job(
+        run_requeue_import_jobs,
+        "interval",
+        seconds=IMPORT_JOB_LEASE.total_seconds(),
+        id=IMPORT_REQUEUE_JOB_NAME,
+        replace_existing=True,
+    )
@@ -0,0 +1,103 @@
+import re
+
+from django.db.models import Exists, OuterRef, Q
+
+from library.models import SearchLyricsToken
+from library.normalization import get_prefix_expression, normalize
+
+TOKEN_MAX_LENGTH = SearchLyricsToken._meta.get_field("token").max_length
+
+
+def get_tokens(text):
+    """Split a text in tokens.
+
+    Args:
+        text (str): Text to split.
+
+    Returns:
+        list of str: Normalized words of the text, in order.
+    """
+    return [word[:TOKEN_MAX_LENGTH] for word in re.findall(r"\w+", normalize(text))]
+
+
+def update_lyrics_tokens(songs):
+    """Replace the lyrics tokens of songs.
+
+    Args:
+        songs (list of tuple): List of ID and lyrics of songs to index.
+    """
+    songs = list(songs)
+    SearchLyricsToken.objects.filter(song_id__in=[pk for pk, _ in songs]).delete()
+
+    SearchLyricsToken.objects.bulk_create(
+        (
+            SearchLyricsToken(song_id=song_id, token=token, position=position)
+            for song_id, lyrics in songs
+            for position, token in enumerate(get_tokens(lyrics))
+        ),
+        batch_size=500,
+    )
+
+
+def lyrics_contains(value):
+    """Give the condition for lyrics to contain the words of a value.
+
+    The words can be anywhere in the lyrics, the last word may be incomplete.
+
+    Args:
+        value (str): Value to search.
+
+    Returns:
+        django.db.models.Q: Condition on songs, matching no song if the value
+        has no words.
+    """
+    tokens = get_tokens(value)
+    if not tokens:
+        return Q(pk__in=[])
+
+    query = Q()
+    for index, token in enumerate(tokens):
+        if index == len(tokens) - 1:
+            # the prefix is served by the prefix index of tokens
+            song_tokens = SearchLyricsToken.objects.alias(
+                prefix_token=get_prefix_expression(
+                    "token", SearchLyricsToken.objects.db
+                )
+            ).filter(prefix_token__startswith=token)
+
+        else:
+            song_tokens = SearchLyricsToken.objects.filter(token=token)
+
+        query &= Q(pk__in=song_tokens.values("song_id"))
+
+    return query
+
+
+def lyrics_exact(value):
+    """Give the condition for lyrics to contain exactly a sequence of words.
+
+    Args:
+        value (str): Value to search.
+
+    Returns:
+        django.db.models.Q: Condition on songs, matching no song if the value
+        has no words.
+    """
+    tokens = get_tokens(value)
+    if not tokens:
+        return Q(pk__in=[])
+
+    # the first word is searched, followed by each other word at its offset
+    first_tokens = SearchLyricsToken.objects.filter(token=tokens[0])
+    for offset, token in enumerate(tokens[1:], 1):
+        first_tokens = first_tokens.filter(
+            Exists(
+                SearchLyricsToken.objects.filter(
+                    song_id=OuterRef("song_id"),
+                    position=OuterRef("position") + offset,
+                    token=token,
+                )
+            )
+        )
+
+    return Q(pk__in=first_tokens.values("song_id"))
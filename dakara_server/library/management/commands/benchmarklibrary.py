@@ -0,0 +1,60 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from library.benchmark import benchmark_views, compare_reports
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure the views listing songs, artists and works, and give a JSON "
+        "report of durations and numbers of queries."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=5,
+            help="Number of times each benchmark is run (default: 5).",
+        )
+        parser.add_argument(
+            "--output", help="File to write the report to, instead of the output."
+        )
+        parser.add_argument(
+            "--baseline",
+            help="Report to compare with, the report must be written to a file.",
+        )
+
+    def handle(self, *args, **options):
+        if options["baseline"] and not options["output"]:
+            raise CommandError("A baseline requires the report to be written to a file")
+
+        baseline = None
+        if options["baseline"]:
+            with open(options["baseline"]) as file:
+                baseline = json.load(file)
+
+        report = benchmark_views(repeat=options["repeat"])
+        report_json = json.dumps(report, indent=2, sort_keys=True)
+
+        if not options["output"]:
+            self.stdout.write(report_json)
+            return
+
+        with open(options["output"], "w") as file:
+            file.write(report_json + "\n")
+
+        if baseline is None:
+            return
+
+        for comparison in compare_reports(report, baseline):
+            self.stdout.write(
+                "{view:<8} {name:<20} {duration_ratio:>6.2f}x {queries:+d} "
+                "queries".format(
+                    view=comparison["view"],
+                    name=comparison["name"],
+                    duration_ratio=comparison["duration_ratio"],
+                    queries=comparison["queries_difference"],
+                )
+            )
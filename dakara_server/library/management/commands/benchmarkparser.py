@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+
+from library.benchmark import benchmark_parsers
+
+
+class Command(BaseCommand):
+    help = "Compare the ways to parse queries of increasing length."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=5,
+            help="Number of times each query is parsed (default: 5).",
+        )
+        parser.add_argument(
+            "--seed",
+            type=int,
+            default=0,
+            help="Seed of the queries (default: 0).",
+        )
+        parser.add_argument(
+            "lengths",
+            nargs="*",
+            type=int,
+            default=[10, 100, 1000],
+            help="Numbers of terms of the queries (default: 10 100 1000).",
+        )
+
+    def handle(self, *args, **options):
+        results = benchmark_parsers(
+            options["lengths"], repeat=options["repeat"], seed=options["seed"]
+        )
+
+        for result in results:
+            self.stdout.write(
+                "{terms:>6} terms {characters:>8} chars {parser:<10} "
+                "{duration:>10.3f} ms".format(
+                    terms=result["terms"],
+                    characters=result["characters"],
+                    parser=result["parser"],
+                    duration=result["duration"] * 1000,
+                )
+            )
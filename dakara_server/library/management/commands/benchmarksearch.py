@@ -0,0 +1,60 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from library.benchmark import QUERIES, benchmark_synthetic_searches
+from library.models import Song
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the ways to search songs on a synthetic library, created in an "
+        "empty library and rolled back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--songs",
+            type=int,
+            default=100000,
+            help="Number of songs of the synthetic library (default: 100000).",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=5,
+            help="Number of times each search is run (default: 5).",
+        )
+        parser.add_argument(
+            "--seed",
+            type=int,
+            default=0,
+            help="Seed of the synthetic library (default: 0).",
+        )
+        parser.add_argument(
+            "--plans", action="store_true", help="Display the query plans."
+        )
+        parser.add_argument("queries", nargs="*", help="Queries to search.")
+
+    def handle(self, *args, **options):
+        if Song.objects.exists():
+            raise CommandError("The library is not empty")
+
+        self.stdout.write("Creating a library of {} songs...".format(options["songs"]))
+        results = benchmark_synthetic_searches(
+            options["songs"],
+            queries=options["queries"] or QUERIES,
+            repeat=options["repeat"],
+            seed=options["seed"],
+        )
+
+        for result in results:
+            self.stdout.write(
+                "{query:<32} {search:<10} {count:>8} songs {duration:>10.2f} ms".format(
+                    query=result["query"],
+                    search=result["search"],
+                    count=result["count"],
+                    duration=result["duration"] * 1000,
+                )
+            )
+
+            if options["plans"]:
+                self.stdout.write(result["plan"] + "\n")
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from library.benchmark import create_synthetic_library
+from library.models import Song
+
+
+class Command(BaseCommand):
+    help = (
+        "Populate an empty library with a reproducible synthetic library of "
+        "songs, artists, works, work types, tags and lyrics."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--songs",
+            type=int,
+            default=100000,
+            help="Number of songs of the synthetic library (default: 100000).",
+        )
+        parser.add_argument(
+            "--seed",
+            type=int,
+            default=0,
+            help="Seed of the synthetic library (default: 0).",
+        )
+
+    def handle(self, *args, **options):
+        if Song.objects.exists():
+            raise CommandError("The library is not empty")
+
+        self.stdout.write("Creating a library of {} songs...".format(options["songs"]))
+        create_synthetic_library(options["songs"], seed=options["seed"])
+        self.stdout.write(self.style.SUCCESS("Library created"))
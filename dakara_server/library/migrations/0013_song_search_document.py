@@ -0,0 +1,161 @@
+# Generated by Django 5.1.15 on 2026-10-17 05:57
+
+from collections import defaultdict
+
+import django.db.models.deletion
+from django.db import DatabaseError, migrations, models, transaction
+
+FTS_TABLE = "library_songsearchdocument_fts"
+FIELDS = ("title", "artists", "works", "work_types", "tags", "details")
+SEPARATOR = "\x1f"
+SCOPE_SEPARATOR = "\x1e"
+
+
+def create_index(apps, schema_editor):
+    """Create the full text index of search documents.
+
+    On SQLite, an FTS5 virtual table with the trigram tokenizer mirrors the
+    search document table. On PostgreSQL, trigram GIN indexes are created on
+    the search document columns if the `pg_trgm` extension can be enabled.
+    Otherwise, no index is created and the search falls back to pattern
+    matching on the search document table.
+    """
+    vendor = schema_editor.connection.vendor
+    table = "library_songsearchdocument"
+    fields = ", ".join(FIELDS)
+    new_fields = ", ".join("new.{}".format(field) for field in FIELDS)
+    old_fields = ", ".join("old.{}".format(field) for field in FIELDS)
+
+    if vendor == "sqlite":
+        statements = [
+            f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5({fields}, "
+            f"content='{table}', content_rowid='song_id', tokenize='trigram')",
+            f"CREATE TRIGGER {FTS_TABLE}_insert AFTER INSERT ON {table} BEGIN "
+            f"INSERT INTO {FTS_TABLE}(rowid, {fields}) "
+            f"VALUES (new.song_id, {new_fields}); END",
+            f"CREATE TRIGGER {FTS_TABLE}_delete AFTER DELETE ON {table} BEGIN "
+            f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {fields}) "
+            f"VALUES ('delete', old.song_id, {old_fields}); END",
+            f"CREATE TRIGGER {FTS_TABLE}_update AFTER UPDATE ON {table} BEGIN "
+            f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {fields}) "
+            f"VALUES ('delete', old.song_id, {old_fields}); "
+            f"INSERT INTO {FTS_TABLE}(rowid, {fields}) "
+            f"VALUES (new.song_id, {new_fields}); END",
+        ]
+
+    elif vendor == "postgresql":
+        statements = ["CREATE EXTENSION IF NOT EXISTS pg_trgm"] + [
+            f"CREATE INDEX {table}_{field}_trgm ON {table} "
+            f"USING gin ({field} gin_trgm_ops)"
+            for field in FIELDS
+        ]
+
+    else:
+        return
+
+    try:
+        with transaction.atomic(using=schema_editor.connection.alias):
+            for statement in statements:
+                schema_editor.execute(statement)
+
+    except DatabaseError:
+        # the database does not support the index
+        pass
+
+
+def drop_index(apps, schema_editor):
+    """Drop the full text index of search documents."""
+    if schema_editor.connection.vendor == "sqlite":
+        schema_editor.execute("DROP TABLE IF EXISTS {}".format(FTS_TABLE))
+
+
+def join_values(values):
+    values = [value.lower() for value in values if value]
+    if not values:
+        return ""
+
+    return SEPARATOR + SEPARATOR.join(values) + SEPARATOR
+
+
+def index_songs(apps, schema_editor):
+    """Create the search document of existing songs."""
+    Song = apps.get_model("library", "Song")
+    SongWorkLink = apps.get_model("library", "SongWorkLink")
+    WorkAlternativeTitle = apps.get_model("library", "WorkAlternativeTitle")
+    SongSearchDocument = apps.get_model("library", "SongSearchDocument")
+
+    artists = defaultdict(list)
+    for song_id, name in Song.artists.through.objects.values_list(
+        "song_id", "artist__name"
+    ):
+        artists[song_id].append(name)
+
+    tags = defaultdict(list)
+    for song_id, name in Song.tags.through.objects.values_list(
+        "song_id", "songtag__name"
+    ):
+        tags[song_id].append(name)
+
+    works = defaultdict(list)
+    work_types = defaultdict(list)
+    work_titles = SongWorkLink.objects.values_list(
+        "song_id", "work__title", "work__work_type__query_name"
+    )
+    alternative_titles = WorkAlternativeTitle.objects.filter(
+        work__songworklink__isnull=False
+    ).values_list("work__songworklink__song_id", "title", "work__work_type__query_name")
+    for song_id, title, query_name in [*work_titles, *alternative_titles]:
+        works[song_id].append(title)
+        work_types[song_id].append(query_name + SCOPE_SEPARATOR + title)
+
+    songs = Song.objects.values_list(
+        "pk", "title", "version", "detail", "detail_video"
+    ).iterator()
+    SongSearchDocument.objects.bulk_create(
+        [
+            SongSearchDocument(
+                song_id=song_id,
+                title=join_values([title]),
+                artists=join_values(artists[song_id]),
+                works=join_values(works[song_id]),
+                work_types=join_values(work_types[song_id]),
+                tags=join_values(tags[song_id]),
+                details=join_values([version, detail, detail_video]),
+            )
+            for song_id, title, version, detail, detail_video in songs
+        ],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("library", "0012_id_fields"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SongSearchDocument",
+            fields=[
+                (
+                    "song",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="search_document",
+                        serialize=False,
+                        to="library.song",
+                    ),
+                ),
+                ("title", models.TextField(blank=True)),
+                ("artists", models.TextField(blank=True)),
+                ("works", models.TextField(blank=True)),
+                ("work_types", models.TextField(blank=True)),
+                ("tags", models.TextField(blank=True)),
+                ("details", models.TextField(blank=True)),
+            ],
+        ),
+        migrations.RunPython(create_index, drop_index),
+        migrations.RunPython(index_songs, migrations.RunPython.noop),
+    ]
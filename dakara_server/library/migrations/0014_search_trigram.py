@@ -0,0 +1,94 @@
+# Generated by Django 5.1.15 on 2026-10-17 06:00
+
+import re
+
+from django.db import migrations, models
+
+SOURCES = (
+    ("SO", "Song", "title"),
+    ("AR", "Artist", "name"),
+    ("WO", "Work", "title"),
+    ("AT", "WorkAlternativeTitle", "title"),
+)
+
+
+def get_trigrams(text):
+    trigrams = set()
+    for word in re.findall(r"\w+", text.lower()):
+        word = "  " + word + " "
+        trigrams.update(word[index : index + 3] for index in range(len(word) - 2))
+
+    return trigrams
+
+
+def index_trigrams(apps, schema_editor):
+    """Create the trigrams of existing searchable texts."""
+    SearchTrigram = apps.get_model("library", "SearchTrigram")
+
+    for kind, model_name, field in SOURCES:
+        model = apps.get_model("library", model_name)
+        search_trigrams = []
+        for object_id, text in model.objects.values_list("pk", field).iterator():
+            trigrams = get_trigrams(text)
+            search_trigrams.extend(
+                SearchTrigram(
+                    trigram=trigram,
+                    kind=kind,
+                    object_id=object_id,
+                    total=len(trigrams),
+                )
+                for trigram in trigrams
+            )
+
+        SearchTrigram.objects.bulk_create(search_trigrams, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("library", "0013_song_search_document"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SearchTrigram",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("trigram", models.CharField(max_length=3)),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[
+                            ("SO", "Song title"),
+                            ("AR", "Artist name"),
+                            ("WO", "Work title"),
+                            ("AT", "Work alternative title"),
+                        ],
+                        max_length=2,
+                    ),
+                ),
+                ("object_id", models.BigIntegerField()),
+                ("total", models.IntegerField()),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["trigram", "kind", "object_id", "total"],
+                        name="library_sea_trigram_6f6634_idx",
+                    ),
+                    models.Index(
+                        fields=["kind", "object_id"], name="library_sea_kind_b6a961_idx"
+                    ),
+                ],
+            },
+        ),
+        migrations.RunPython(index_trigrams, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,101 @@
+# Generated by Django 5.1.15 on 2026-10-17 06:03
+
+import re
+
+from django.db import migrations, models
+
+KEY_MAX_LENGTH = 255
+
+
+def get_prefix_keys(text):
+    text = text.lower()
+    return [
+        text[match.start() : match.start() + KEY_MAX_LENGTH]
+        for match in re.finditer(r"\w+", text)
+    ]
+
+
+def index_prefixes(apps, schema_editor):
+    """Create the prefix index entries of existing searchable texts."""
+    SearchPrefix = apps.get_model("library", "SearchPrefix")
+    Song = apps.get_model("library", "Song")
+    Artist = apps.get_model("library", "Artist")
+    Work = apps.get_model("library", "Work")
+    WorkAlternativeTitle = apps.get_model("library", "WorkAlternativeTitle")
+
+    sources = (
+        ("SO", Song.objects.values_list("pk", "title")),
+        ("AR", Artist.objects.values_list("pk", "name")),
+        ("WO", Work.objects.values_list("pk", "title", "work_type__query_name")),
+        (
+            "AT",
+            WorkAlternativeTitle.objects.values_list(
+                "pk", "title", "work__work_type__query_name"
+            ),
+        ),
+    )
+
+    for kind, values in sources:
+        search_prefixes = []
+        for object_id, text, *scope in values.iterator():
+            search_prefixes.extend(
+                SearchPrefix(
+                    kind=kind,
+                    object_id=object_id,
+                    key=key,
+                    label=text,
+                    scope=scope[0] if scope else "",
+                )
+                for key in get_prefix_keys(text)
+            )
+
+        SearchPrefix.objects.bulk_create(search_prefixes, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("library", "0014_search_trigram"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SearchPrefix",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[
+                            ("SO", "Song title"),
+                            ("AR", "Artist name"),
+                            ("WO", "Work title"),
+                            ("AT", "Work alternative title"),
+                        ],
+                        max_length=2,
+                    ),
+                ),
+                ("object_id", models.BigIntegerField()),
+                ("key", models.CharField(max_length=255)),
+                ("label", models.CharField(max_length=255)),
+                ("scope", models.CharField(blank=True, max_length=255)),
+            ],
+            options={
+                "indexes": [
+                    models.Index(fields=["key"], name="library_sea_key_c94ddc_idx"),
+                    models.Index(
+                        fields=["kind", "object_id"], name="library_sea_kind_5ef4fe_idx"
+                    ),
+                ],
+            },
+        ),
+        migrations.RunPython(index_prefixes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.1.15 on 2026-10-17 06:08
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+LINKS = (
+    ("Artist", "Song_artists", "artist_id"),
+    ("SongTag", "Song_tags", "songtag_id"),
+    ("Work", "SongWorkLink", "work_id"),
+)
+
+
+def count_songs(apps, schema_editor):
+    """Count the songs of existing artists, tags and works."""
+    for model_name, link_name, field in LINKS:
+        model = apps.get_model("library", model_name)
+        link = apps.get_model("library", link_name)
+        counts = (
+            link.objects.filter(**{field: OuterRef("pk")})
+            .order_by()
+            .values(field)
+            .annotate(count=Count("song_id", distinct=True))
+            .values("count")
+        )
+        model.objects.update(song_count=Coalesce(Subquery(counts), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("library", "0015_search_prefix"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="artist",
+            name="song_count",
+            field=models.PositiveIntegerField(db_index=True, default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="songtag",
+            name="song_count",
+            field=models.PositiveIntegerField(db_index=True, default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="work",
+            name="song_count",
+            field=models.PositiveIntegerField(db_index=True, default=0, editable=False),
+        ),
+        migrations.RunPython(count_songs, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.1.15 on 2026-10-17 06:14
+
+from django.db import migrations, models
+from django.db.models import Exists, OuterRef
+
+
+def hide_songs(apps, schema_editor):
+    """Hide existing songs with disabled tags."""
+    Song = apps.get_model("library", "Song")
+    SongTags = apps.get_model("library", "Song_tags")
+
+    Song.objects.update(
+        hidden=Exists(
+            SongTags.objects.filter(song_id=OuterRef("pk"), songtag__disabled=True)
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("library", "0016_song_count"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="song",
+            name="hidden",
+            field=models.BooleanField(db_index=True, default=False, editable=False),
+        ),
+        migrations.RunPython(hide_songs, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,150 @@
+# Generated by Django 5.1.15 on 2026-10-17 06:21
+
+import re
+import unicodedata
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+BATCH_SIZE = 500
+
+NORMALIZED_FIELDS = (
+    ("Song", {"title": "title_normalized"}),
+    ("Artist", {"name": "name_normalized"}),
+    ("Work", {"title": "title_normalized", "subtitle": "subtitle_normalized"}),
+    ("WorkAlternativeTitle", {"title": "title_normalized"}),
+)
+
+DOCUMENT_FIELDS = ("title", "artists", "works", "work_types", "tags", "details")
+
+TRIGRAM_SOURCES = (
+    ("SO", "Song", "title"),
+    ("AR", "Artist", "name"),
+    ("WO", "Work", "title"),
+    ("AT", "WorkAlternativeTitle", "title"),
+)
+
+
+def normalize(text):
+    text = re.sub(r"[\u0300-\u036f]", "", unicodedata.normalize("NFKD", text))
+    return unicodedata.normalize("NFC", text).casefold()
+
+
+def get_trigrams(text):
+    trigrams = set()
+    for word in re.findall(r"\w+", normalize(text)):
+        word = "  " + word + " "
+        trigrams.update(word[index : index + 3] for index in range(len(word) - 2))
+
+    return trigrams
+
+
+def normalize_texts(apps, schema_editor):
+    """Fill the normalized fields and normalize the search indexes."""
+    for model_name, fields in NORMALIZED_FIELDS:
+        model = apps.get_model("library", model_name)
+        objects = list(model.objects.only(*fields))
+        for obj in objects:
+            for field, field_normalized in fields.items():
+                setattr(obj, field_normalized, normalize(getattr(obj, field))[:255])
+
+        model.objects.bulk_update(objects, fields.values(), batch_size=BATCH_SIZE)
+
+    SongSearchDocument = apps.get_model("library", "SongSearchDocument")
+    documents = list(SongSearchDocument.objects.all())
+    for document in documents:
+        for field in DOCUMENT_FIELDS:
+            setattr(document, field, normalize(getattr(document, field)))
+
+    SongSearchDocument.objects.bulk_update(
+        documents, DOCUMENT_FIELDS, batch_size=BATCH_SIZE
+    )
+
+    SearchPrefix = apps.get_model("library", "SearchPrefix")
+    prefixes = list(SearchPrefix.objects.only("key"))
+    for prefix in prefixes:
+        prefix.key = normalize(prefix.key)[:255]
+
+    SearchPrefix.objects.bulk_update(prefixes, ["key"], batch_size=BATCH_SIZE)
+
+    SearchTrigram = apps.get_model("library", "SearchTrigram")
+    SearchTrigram.objects.all().delete()
+    for kind, model_name, field in TRIGRAM_SOURCES:
+        model = apps.get_model("library", model_name)
+        search_trigrams = []
+        for object_id, text in model.objects.values_list("pk", field).iterator():
+            trigrams = get_trigrams(text)
+            search_trigrams.extend(
+                SearchTrigram(
+                    trigram=trigram,
+                    kind=kind,
+                    object_id=object_id,
+                    total=len(trigrams),
+                )
+                for trigram in trigrams
+            )
+
+        SearchTrigram.objects.bulk_create(search_trigrams, batch_size=BATCH_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("library", "0017_song_hidden"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="artist",
+            name="name_normalized",
+            field=models.CharField(
+                blank=True, db_index=True, editable=False, max_length=255
+            ),
+        ),
+        migrations.AddField(
+            model_name="song",
+            name="title_normalized",
+            field=models.CharField(
+                blank=True, db_index=True, editable=False, max_length=255
+            ),
+        ),
+        migrations.AddField(
+            model_name="work",
+            name="subtitle_normalized",
+            field=models.CharField(blank=True, editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name="work",
+            name="title_normalized",
+            field=models.CharField(blank=True, editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name="workalternativetitle",
+            name="title_normalized",
+            field=models.CharField(
+                blank=True, db_index=True, editable=False, max_length=255
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="songtag",
+            index=models.Index(
+                django.db.models.functions.text.Lower("name"),
+                name="library_songtag_lower_name",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="work",
+            index=models.Index(
+                fields=["title_normalized", "subtitle_normalized"],
+                name="library_wor_title_n_5da44c_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="worktype",
+            index=models.Index(
+                django.db.models.functions.text.Lower("name"),
+                name="library_worktype_lower_name",
+            ),
+        ),
+        migrations.RunPython(normalize_texts, migrations.RunPython.noop),
+    ]
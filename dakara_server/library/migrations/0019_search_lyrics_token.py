@@ -0,0 +1,76 @@
+# Generated by Django 5.1.15 on 2026-10-17 06:24
+
+import re
+import unicodedata
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+TOKEN_MAX_LENGTH = 64
+
+
+def normalize(text):
+    text = re.sub(r"[\u0300-\u036f]", "", unicodedata.normalize("NFKD", text))
+    return unicodedata.normalize("NFC", text).casefold()
+
+
+def index_lyrics(apps, schema_editor):
+    """Create the lyrics tokens of existing songs."""
+    Song = apps.get_model("library", "Song")
+    SearchLyricsToken = apps.get_model("library", "SearchLyricsToken")
+
+    SearchLyricsToken.objects.bulk_create(
+        (
+            SearchLyricsToken(
+                song_id=song_id, token=word[:TOKEN_MAX_LENGTH], position=position
+            )
+            for song_id, lyrics in Song.objects.exclude(lyrics="")
+            .values_list("pk", "lyrics")
+            .iterator()
+            for position, word in enumerate(re.findall(r"\w+", normalize(lyrics)))
+        ),
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("library", "0018_normalized_fields"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SearchLyricsToken",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("token", models.CharField(max_length=64)),
+                ("position", models.PositiveIntegerField()),
+                (
+                    "song",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="lyrics_tokens",
+                        to="library.song",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["token", "song", "position"],
+                        name="library_sea_token_eaf64a_idx",
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(index_lyrics, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.1.15 on 2026-10-17 06:33
+
+from django.db import migrations, models
+
+LYRICS_PREVIEW_LINES = 5
+
+
+def preview_lyrics(apps, schema_editor):
+    """Create the extract of the lyrics of existing songs."""
+    Song = apps.get_model("library", "Song")
+
+    songs = []
+    for song in Song.objects.exclude(lyrics="").only("pk", "lyrics").iterator():
+        lyrics_list = song.lyrics.splitlines()
+        song.lyrics_truncated = len(lyrics_list) > LYRICS_PREVIEW_LINES
+        song.lyrics_preview = (
+            "\n".join(lyrics_list[:LYRICS_PREVIEW_LINES])
+            if song.lyrics_truncated
+            else song.lyrics
+        )
+        songs.append(song)
+
+    Song.objects.bulk_update(
+        songs, ["lyrics_preview", "lyrics_truncated"], batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("library", "0019_search_lyrics_token"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="song",
+            name="lyrics_preview",
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name="song",
+            name="lyrics_truncated",
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.RunPython(preview_lyrics, migrations.RunPython.noop),
+    ]
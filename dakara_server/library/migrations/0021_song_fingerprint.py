@@ -0,0 +1,25 @@
+# Generated by Django 5.1.15 on 2026-10-17 06:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("library", "0020_song_lyrics_preview"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="song",
+            name="fingerprint",
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AddIndex(
+            model_name="song",
+            index=models.Index(
+                fields=["directory", "filename", "fingerprint"],
+                name="library_song_location",
+            ),
+        ),
+    ]
@@ -0,0 +1,72 @@
+# Generated by Django 5.1.15 on 2026-10-17 07:02
+
+from django.db import migrations, models
+
+# kind of changes by model
+MODEL_KINDS = {
+    "Song": "SO",
+    "Artist": "AR",
+    "Work": "WO",
+    "WorkAlternativeTitle": "AT",
+    "WorkType": "WT",
+    "SongTag": "TG",
+}
+
+
+def record_objects(apps, schema_editor):
+    """Record a change for each existing object of the library."""
+    LibraryChange = apps.get_model("library", "LibraryChange")
+
+    for model_name, kind in MODEL_KINDS.items():
+        model = apps.get_model("library", model_name)
+        LibraryChange.objects.bulk_create(
+            (
+                LibraryChange(kind=kind, object_id=object_id)
+                for object_id in model.objects.order_by("pk")
+                .values_list("pk", flat=True)
+                .iterator()
+            ),
+            batch_size=500,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("library", "0021_song_fingerprint"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="LibraryChange",
+            fields=[
+                ("seq", models.BigAutoField(primary_key=True, serialize=False)),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[
+                            ("SO", "Song"),
+                            ("AR", "Artist"),
+                            ("WO", "Work"),
+                            ("AT", "Work alternative title"),
+                            ("WT", "Work type"),
+                            ("TG", "Song tag"),
+                        ],
+                        max_length=2,
+                    ),
+                ),
+                ("object_id", models.BigIntegerField()),
+                ("deleted", models.BooleanField(default=False)),
+                ("date_changed", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("kind", "object_id"),
+                        name="library_librarychange_object",
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(record_objects, migrations.RunPython.noop),
+    ]
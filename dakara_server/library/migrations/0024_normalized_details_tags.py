@@ -0,0 +1,70 @@
+# Generated by Django 5.1.15 on 2026-10-17 07:27
+
+import re
+import unicodedata
+
+from django.db import migrations, models
+
+BATCH_SIZE = 500
+
+NORMALIZED_FIELDS = (
+    (
+        "Song",
+        {
+            "version": "version_normalized",
+            "detail": "detail_normalized",
+            "detail_video": "detail_video_normalized",
+        },
+    ),
+    ("SongTag", {"name": "name_normalized"}),
+)
+
+
+def normalize(text):
+    text = re.sub(r"[\u0300-\u036f]", "", unicodedata.normalize("NFKD", text))
+    return unicodedata.normalize("NFC", text).casefold()
+
+
+def normalize_texts(apps, schema_editor):
+    """Fill the normalized fields of details of songs and names of tags."""
+    for model_name, fields in NORMALIZED_FIELDS:
+        model = apps.get_model("library", model_name)
+        objects = list(model.objects.only(*fields))
+        for obj in objects:
+            for field, field_normalized in fields.items():
+                setattr(obj, field_normalized, normalize(getattr(obj, field))[:255])
+
+        model.objects.bulk_update(objects, fields.values(), batch_size=BATCH_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("library", "0023_import_job"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="song",
+            name="detail_normalized",
+            field=models.CharField(blank=True, editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name="song",
+            name="detail_video_normalized",
+            field=models.CharField(blank=True, editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name="song",
+            name="version_normalized",
+            field=models.CharField(blank=True, editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name="songtag",
+            name="name_normalized",
+            field=models.CharField(
+                blank=True, db_index=True, editable=False, max_length=255
+            ),
+        ),
+        migrations.RunPython(normalize_texts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.15 on 2026-10-17 07:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("library", "0024_normalized_details_tags"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="importjob",
+            name="date_heartbeat",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="importjob",
+            name="worker",
+            field=models.CharField(blank=True, max_length=255),
+        ),
+    ]
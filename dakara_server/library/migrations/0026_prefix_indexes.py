@@ -0,0 +1,73 @@
+# Generated by Django 5.1.15 on 2026-10-17 07:52
+
+import re
+import unicodedata
+
+from django.db import migrations
+
+BATCH_SIZE = 500
+
+# prefix indexes by table and column
+PREFIX_INDEXES = (
+    ("library_searchprefix", "key"),
+    ("library_searchlyricstoken", "token"),
+)
+
+# collation of the prefix indexes by database vendor
+PREFIX_COLLATIONS = {"sqlite": "NOCASE", "postgresql": "C"}
+
+
+def normalize(text):
+    text = re.sub(r"[\u0300-\u036f]", "", unicodedata.normalize("NFKD", text))
+    return unicodedata.normalize("NFC", text).casefold()
+
+
+def create_prefix_indexes(apps, schema_editor):
+    """Create the indexes of the prefix lookups of normalized texts.
+
+    SQLite serves a `LIKE` by an index only if the index is case insensitive,
+    PostgreSQL only if the index is in the C collation. On other databases,
+    the indexes of the columns are used.
+    """
+    collation = PREFIX_COLLATIONS.get(schema_editor.connection.vendor)
+    if collation is None:
+        return
+
+    for table, column in PREFIX_INDEXES:
+        schema_editor.execute(
+            f"CREATE INDEX {table}_{column}_prefix "
+            f'ON {table} ({column} COLLATE "{collation}")'
+        )
+
+
+def drop_prefix_indexes(apps, schema_editor):
+    """Drop the indexes of the prefix lookups of normalized texts."""
+    if schema_editor.connection.vendor not in PREFIX_COLLATIONS:
+        return
+
+    for table, column in PREFIX_INDEXES:
+        schema_editor.execute(f"DROP INDEX IF EXISTS {table}_{column}_prefix")
+
+
+def normalize_scopes(apps, schema_editor):
+    """Normalize the scopes of the prefix index entries."""
+    SearchPrefix = apps.get_model("library", "SearchPrefix")
+
+    entries = []
+    for entry in SearchPrefix.objects.exclude(scope="").only("scope").iterator():
+        entry.scope = normalize(entry.scope)
+        entries.append(entry)
+
+    SearchPrefix.objects.bulk_update(entries, ["scope"], batch_size=BATCH_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("library", "0025_import_job_worker"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_prefix_indexes, drop_prefix_indexes),
+        migrations.RunPython(normalize_scopes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.1.15 on 2026-10-17 08:45
+
+from django.db import DatabaseError, migrations, transaction
+
+# columns compared by the typo-tolerant search, by table
+TRIGRAM_INDEXES = (
+    ("library_song", "title_normalized"),
+    ("library_artist", "name_normalized"),
+    ("library_work", "title_normalized"),
+    ("library_workalternativetitle", "title_normalized"),
+)
+
+
+def create_trigram_indexes(apps, schema_editor):
+    """Create the trigram indexes of the typo-tolerant search.
+
+    On PostgreSQL, trigram GIN indexes are created on the normalized texts if
+    the `pg_trgm` extension can be enabled, so that the similarity operator
+    is served by them. Other databases use the `SearchTrigram` table instead.
+    """
+    if schema_editor.connection.vendor != "postgresql":
+        return
+
+    statements = ["CREATE EXTENSION IF NOT EXISTS pg_trgm"] + [
+        f"CREATE INDEX {table}_{column}_trgm ON {table} "
+        f"USING gin ({column} gin_trgm_ops)"
+        for table, column in TRIGRAM_INDEXES
+    ]
+
+    try:
+        with transaction.atomic(using=schema_editor.connection.alias):
+            for statement in statements:
+                schema_editor.execute(statement)
+
+    except DatabaseError:
+        # the database does not support the index
+        pass
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    """Drop the trigram indexes of the typo-tolerant search."""
+    if schema_editor.connection.vendor != "postgresql":
+        return
+
+    for table, column in TRIGRAM_INDEXES:
+        schema_editor.execute(f"DROP INDEX IF EXISTS {table}_{column}_trgm")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("library", "0026_prefix_indexes"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
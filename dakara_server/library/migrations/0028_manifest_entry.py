@@ -0,0 +1,38 @@
+# Generated by Django 5.1.15 on 2026-10-17 08:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("library", "0027_trigram_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ManifestEntry",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("directory", models.CharField(blank=True, max_length=255)),
+                ("filename", models.CharField(max_length=255)),
+                ("fingerprint", models.CharField(blank=True, max_length=255)),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["directory", "filename", "fingerprint"],
+                        name="library_manifestentry_loc",
+                    )
+                ],
+            },
+        ),
+    ]
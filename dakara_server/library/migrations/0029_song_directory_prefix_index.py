@@ -0,0 +1,44 @@
+# Generated by Django 5.1.15 on 2026-10-17 08:45
+
+from django.db import migrations
+
+# collation of the prefix indexes by database vendor
+PREFIX_COLLATIONS = {"sqlite": "NOCASE", "postgresql": "C"}
+
+
+def create_directory_prefix_index(apps, schema_editor):
+    """Create the index of the prefix lookups of song directories.
+
+    SQLite serves a `LIKE` by an index only if the index is case insensitive,
+    PostgreSQL only if the index is in the C collation. On other databases,
+    the index of the location of songs is used.
+    """
+    collation = PREFIX_COLLATIONS.get(schema_editor.connection.vendor)
+    if collation is None:
+        return
+
+    schema_editor.execute(
+        "CREATE INDEX library_song_directory_prefix "
+        f'ON library_song (directory COLLATE "{collation}")'
+    )
+
+
+def drop_directory_prefix_index(apps, schema_editor):
+    """Drop the index of the prefix lookups of song directories."""
+    if schema_editor.connection.vendor not in PREFIX_COLLATIONS:
+        return
+
+    schema_editor.execute("DROP INDEX IF EXISTS library_song_directory_prefix")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("library", "0028_manifest_entry"),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            create_directory_prefix_index, drop_directory_prefix_index
+        ),
+    ]
@@ -2,57 +2,187 @@ from datetime import timedelta
 
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
+from django.db.models.functions import Lower
+from django.utils import timezone
 
+from library.normalization import normalize
 
-class Song(models.Model):
+
+class NormalizedFieldsModel(models.Model):
+    """Model with normalized copies of some of its text fields.
+
+    The copies are used to search and order objects regardless of case, width
+    and diacritics, see `library.normalization.normalize`. They are updated
+    on save, or with `update_normalized_fields` when objects are created in
+    bulk.
+
+    `NORMALIZED_FIELDS` maps the name of each text field to the name of its
+    normalized copy.
+    """
+
+    NORMALIZED_FIELDS = {}
+
+    class Meta:
+        abstract = True
+
+    def update_normalized_fields(self):
+        """Update the normalized copies of text fields."""
+        for field, field_normalized in self.NORMALIZED_FIELDS.items():
+            max_length = self._meta.get_field(field_normalized).max_length
+            setattr(
+                self, field_normalized, normalize(getattr(self, field))[:max_length]
+            )
+
+    def save(self, *args, **kwargs):
+        self.update_normalized_fields()
+
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None:
+            kwargs["update_fields"] = {
+                *update_fields,
+                *(
+                    field_normalized
+                    for field, field_normalized in self.NORMALIZED_FIELDS.items()
+                    if field in update_fields
+                ),
+            }
+
+        super().save(*args, **kwargs)
+
+
+class Song(NormalizedFieldsModel):
     """Song object."""
 
+    NORMALIZED_FIELDS = {
+        "title": "title_normalized",
+        "version": "version_normalized",
+        "detail": "detail_normalized",
+        "detail_video": "detail_video_normalized",
+    }
+    LYRICS_PREVIEW_LINES = 5
+
     title = models.CharField(max_length=255)
+    title_normalized = models.CharField(
+        max_length=255, blank=True, db_index=True, editable=False
+    )
     filename = models.CharField(max_length=255)
     directory = models.CharField(max_length=255, blank=True)
+    # opaque fingerprint of the file given by the feeder, e.g. size and date of
+    # modification or hash, to detect changes of the file
+    fingerprint = models.CharField(max_length=255, blank=True)
     duration = models.DurationField(default=timedelta(0))
     version = models.CharField(max_length=255, blank=True)
     detail = models.CharField(max_length=255, blank=True)
     detail_video = models.CharField(max_length=255, blank=True)
+    version_normalized = models.CharField(max_length=255, blank=True, editable=False)
+    detail_normalized = models.CharField(max_length=255, blank=True, editable=False)
+    detail_video_normalized = models.CharField(
+        max_length=255, blank=True, editable=False
+    )
     tags = models.ManyToManyField("SongTag")
     artists = models.ManyToManyField("Artist")
     works = models.ManyToManyField("Work", through="SongWorkLink")
     lyrics = models.TextField(blank=True)
+    lyrics_preview = models.TextField(blank=True, editable=False)
+    lyrics_truncated = models.BooleanField(default=False, editable=False)
     has_instrumental = models.BooleanField(default=False)
+    hidden = models.BooleanField(default=False, db_index=True, editable=False)
     date_created = models.DateTimeField(auto_now_add=True)
     date_updated = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["directory", "filename", "fingerprint"],
+                name="library_song_location",
+            )
+        ]
+
     def __str__(self):
         return self.title
 
+    def update_lyrics_preview(self):
+        """Update the extract of the lyrics.
+
+        The extract has at most `LYRICS_PREVIEW_LINES` lines of lyrics, it is
+        marked as truncated if more lines remain.
+        """
+        lyrics_list = self.lyrics.splitlines()
+        self.lyrics_truncated = len(lyrics_list) > self.LYRICS_PREVIEW_LINES
+
+        if self.lyrics_truncated:
+            self.lyrics_preview = "\n".join(lyrics_list[: self.LYRICS_PREVIEW_LINES])
+
+        else:
+            self.lyrics_preview = self.lyrics
+
+    def save(self, *args, **kwargs):
+        # the extract is kept as is if the lyrics are not saved
+        update_fields = kwargs.get("update_fields")
+        if "lyrics" not in self.get_deferred_fields() and (
+            update_fields is None or "lyrics" in update_fields
+        ):
+            self.update_lyrics_preview()
+
+            if update_fields is not None:
+                kwargs["update_fields"] = {
+                    *update_fields,
+                    "lyrics_preview",
+                    "lyrics_truncated",
+                }
+
+        super().save(*args, **kwargs)
 
-class Artist(models.Model):
+
+class Artist(NormalizedFieldsModel):
     """Artist object."""
 
+    NORMALIZED_FIELDS = {"name": "name_normalized"}
+
     name = models.CharField(max_length=255)
+    name_normalized = models.CharField(
+        max_length=255, blank=True, db_index=True, editable=False
+    )
+    song_count = models.PositiveIntegerField(default=0, db_index=True, editable=False)
 
     def __str__(self):
         return self.name
 
 
-class Work(models.Model):
+class Work(NormalizedFieldsModel):
     """Work object that uses a song.
 
     Example: an anime, a game and so on.
     """
 
+    NORMALIZED_FIELDS = {
+        "title": "title_normalized",
+        "subtitle": "subtitle_normalized",
+    }
+
     title = models.CharField(max_length=255)
+    title_normalized = models.CharField(max_length=255, blank=True, editable=False)
     subtitle = models.CharField(max_length=255, blank=True)
+    subtitle_normalized = models.CharField(max_length=255, blank=True, editable=False)
     work_type = models.ForeignKey("WorkType", on_delete=models.CASCADE)
+    song_count = models.PositiveIntegerField(default=0, db_index=True, editable=False)
+
+    class Meta:
+        indexes = [models.Index(fields=["title_normalized", "subtitle_normalized"])]
 
     def __str__(self):
         return "{} ({})".format(self.title, self.work_type)
 
 
-class WorkAlternativeTitle(models.Model):
+class WorkAlternativeTitle(NormalizedFieldsModel):
     """Alternative title of a work."""
 
+    NORMALIZED_FIELDS = {"title": "title_normalized"}
+
     title = models.CharField(max_length=255)
+    title_normalized = models.CharField(
+        max_length=255, blank=True, db_index=True, editable=False
+    )
     work = models.ForeignKey(
         Work,
         on_delete=models.CASCADE,
@@ -76,6 +206,9 @@ class WorkType(models.Model):
     # icon_name refers to a fontawesome icon name
     icon_name = models.CharField(max_length=255, null=True)
 
+    class Meta:
+        indexes = [models.Index(Lower("name"), name="library_worktype_lower_name")]
+
     def __str__(self):
         return self.name or self.query_name
 
@@ -116,14 +249,285 @@ class SongWorkLink(models.Model):
         return self.__hash__() == other.__hash__()
 
 
-class SongTag(models.Model):
+class SongTag(NormalizedFieldsModel):
     """Song tag object."""
 
+    NORMALIZED_FIELDS = {"name": "name_normalized"}
+
     name = models.CharField(max_length=255, unique=True)
+    name_normalized = models.CharField(
+        max_length=255, blank=True, db_index=True, editable=False
+    )
     color_hue = models.IntegerField(
         null=True, validators=[MinValueValidator(0), MaxValueValidator(360)]
     )
     disabled = models.BooleanField(default=False)
+    song_count = models.PositiveIntegerField(default=0, db_index=True, editable=False)
+
+    class Meta:
+        indexes = [models.Index(Lower("name"), name="library_songtag_lower_name")]
 
     def __str__(self):
         return self.name
+
+
+class SongSearchDocument(models.Model):
+    """Denormalized search document of a song.
+
+    Gathers in a single row all the texts a song can be searched by, so that
+    the query language can be resolved without joining the related tables.
+    Texts are stored normalized, see `library.normalization.normalize`,
+    multiple values of a field are surrounded by `SEPARATOR`, and titles of
+    works are prefixed by the query name of their work type followed by
+    `SCOPE_SEPARATOR` in `work_types`.
+
+    The document is kept up to date by signals, see `library.signals`.
+    """
+
+    SEPARATOR = "\x1f"
+    SCOPE_SEPARATOR = "\x1e"
+
+    song = models.OneToOneField(
+        Song,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="search_document",
+    )
+    title = models.TextField(blank=True)
+    artists = models.TextField(blank=True)
+    works = models.TextField(blank=True)
+    work_types = models.TextField(blank=True)
+    tags = models.TextField(blank=True)
+    details = models.TextField(blank=True)
+
+    def __str__(self):
+        return "Search document of {}".format(self.song_id)
+
+
+class SearchEntry(models.Model):
+    """Entry of a search index about a searchable text.
+
+    Searchable texts are song titles, artist names, work titles and work
+    alternative titles. An entry refers to the object of kind `kind` and ID
+    `object_id` the text belongs to.
+    """
+
+    SONG = "SO"
+    ARTIST = "AR"
+    WORK = "WO"
+    ALTERNATIVE_TITLE = "AT"
+    KIND_CHOICES = {
+        SONG: "Song title",
+        ARTIST: "Artist name",
+        WORK: "Work title",
+        ALTERNATIVE_TITLE: "Work alternative title",
+    }
+
+    kind = models.CharField(max_length=2, choices=KIND_CHOICES)
+    object_id = models.BigIntegerField()
+
+    class Meta:
+        abstract = True
+
+
+class SearchTrigram(SearchEntry):
+    """Trigram of a searchable text, used for typo-tolerant search.
+
+    A row tells that the text contains the trigram, `total` being the number
+    of distinct trigrams of this text.
+
+    The trigrams are kept up to date by signals, see `library.signals`.
+    """
+
+    trigram = models.CharField(max_length=3)
+    total = models.IntegerField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["trigram", "kind", "object_id", "total"]),
+            models.Index(fields=["kind", "object_id"]),
+        ]
+
+    def __str__(self):
+        return "{} <{}> {}".format(self.trigram, self.kind, self.object_id)
+
+
+class SearchPrefix(SearchEntry):
+    """Prefix index entry of a searchable text, used for autocompletion.
+
+    There is an entry for each word of the text, its key being the normalized
+    text starting from this word, so that a prefix of any word of the text
+    can be completed. For works and alternative titles, `scope` is the
+    normalized query name of the work type.
+
+    The entries are kept up to date by signals, see `library.signals`.
+    """
+
+    key = models.CharField(max_length=255)
+    label = models.CharField(max_length=255)
+    scope = models.CharField(max_length=255, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["key"]),
+            models.Index(fields=["kind", "object_id"]),
+        ]
+
+    def __str__(self):
+        return "{} <{}> {}".format(self.key, self.kind, self.object_id)
+
+
+class SearchLyricsToken(models.Model):
+    """Token of the lyrics of a song, used to search lyrics.
+
+    Lyrics are split in normalized words, there is an entry for each word,
+    `position` being its rank in the lyrics, so that songs can be found from
+    their words without scanning the lyrics.
+
+    The tokens are kept up to date by signals, see `library.signals`.
+    """
+
+    song = models.ForeignKey(
+        Song, on_delete=models.CASCADE, related_name="lyrics_tokens"
+    )
+    token = models.CharField(max_length=64)
+    position = models.PositiveIntegerField()
+
+    class Meta:
+        indexes = [models.Index(fields=["token", "song", "position"])]
+
+    def __str__(self):
+        return "{} <{}> {}".format(self.token, self.position, self.song_id)
+
+
+class LibraryChange(models.Model):
+    """Change of an object of the library, used to synchronize caches.
+
+    A change tells that the object of kind `kind` and ID `object_id` was
+    created or modified, or deleted if `deleted` is True. Only the last change
+    of an object is kept, with a new sequence number, so that the changes
+    since a sequence number give each changed object once.
+
+    The changes are recorded by signals, see `library.signals`, in the
+    transaction of the objects, see `library.changes.record_changes`, so that
+    they are committed or rolled back with them. Changes are written by one
+    transaction at a time, so that sequence numbers are committed in order,
+    see `library.changes.lock_changes`.
+    """
+
+    SONG = "SO"
+    ARTIST = "AR"
+    WORK = "WO"
+    ALTERNATIVE_TITLE = "AT"
+    WORK_TYPE = "WT"
+    SONG_TAG = "TG"
+    KIND_CHOICES = {
+        SONG: "Song",
+        ARTIST: "Artist",
+        WORK: "Work",
+        ALTERNATIVE_TITLE: "Work alternative title",
+        WORK_TYPE: "Work type",
+        SONG_TAG: "Song tag",
+    }
+
+    seq = models.BigAutoField(primary_key=True)
+    kind = models.CharField(max_length=2, choices=KIND_CHOICES)
+    object_id = models.BigIntegerField()
+    deleted = models.BooleanField(default=False)
+    date_changed = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["kind", "object_id"], name="library_librarychange_object"
+            )
+        ]
+
+    def __str__(self):
+        return "{} <{}> {}".format(self.seq, self.kind, self.object_id)
+
+
+class ManifestEntry(models.Model):
+    """File of a manifest posted by the feeder, to compare with the songs.
+
+    The entries of a manifest are created in a transaction which is rolled
+    back once the manifest is compared, see `library.sync.diff_manifest`, so
+    that the comparison uses the indexes of the songs.
+    """
+
+    directory = models.CharField(max_length=255, blank=True)
+    filename = models.CharField(max_length=255)
+    fingerprint = models.CharField(max_length=255, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["directory", "filename", "fingerprint"],
+                name="library_manifestentry_loc",
+            )
+        ]
+
+    def __str__(self):
+        return "{}/{}".format(self.directory, self.filename)
+
+
+class ImportJob(models.Model):
+    """Job creating a list of songs or works posted by the feeder.
+
+    The job is a queue entry: the objects to create are stored in `payload`
+    and the job is processed in batches by a background worker, see
+    `library.jobs`. The number of objects created so far is in `processed`,
+    errors which stopped the job are in `errors`. A running job is owned by
+    the worker of ID `worker`, as long as it updates `date_heartbeat`.
+    """
+
+    SONG = "SO"
+    WORK = "WO"
+    KIND_CHOICES = {
+        SONG: "Song",
+        WORK: "Work",
+    }
+
+    QUEUED = "QU"
+    RUNNING = "RU"
+    DONE = "DO"
+    FAILED = "FA"
+    STATUS_CHOICES = {
+        QUEUED: "Queued",
+        RUNNING: "Running",
+        DONE: "Done",
+        FAILED: "Failed",
+    }
+
+    kind = models.CharField(max_length=2, choices=KIND_CHOICES)
+    status = models.CharField(max_length=2, choices=STATUS_CHOICES, default=QUEUED)
+    payload = models.JSONField(default=list)
+    total = models.PositiveIntegerField(default=0)
+    processed = models.PositiveIntegerField(default=0)
+    errors = models.JSONField(null=True, blank=True)
+    date_created = models.DateTimeField(auto_now_add=True)
+    date_started = models.DateTimeField(null=True, blank=True)
+    date_finished = models.DateTimeField(null=True, blank=True)
+    worker = models.CharField(max_length=255, blank=True)
+    date_heartbeat = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return "Import job {} <{}> {}".format(self.pk, self.kind, self.status)
+
+    @property
+    def throughput(self):
+        """Give the number of objects created per second.
+
+        Returns:
+            float: Number of objects per second since the start of the job,
+            None if the job has not started.
+        """
+        if self.date_started is None:
+            return None
+
+        date_end = self.date_finished or timezone.now()
+        duration = (date_end - self.date_started).total_seconds()
+        if duration <= 0:
+            return None
+
+        return self.processed / duration
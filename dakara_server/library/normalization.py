@@ -0,0 +1,53 @@
+import re
+import unicodedata
+
+from django.db import connections
+from django.db.models import F
+from django.db.models.functions import Collate
+
+# diacritics combining with latin, greek and cyrillic letters, other combining
+# marks, like the voicing marks of kana, are kept
+DIACRITICS_MATCHER = re.compile(r"[\u0300-\u036f]")
+
+# collation of the prefix indexes of normalized texts by database vendor, as
+# normalized texts have no upper case, both collations compare them by code
+PREFIX_COLLATIONS = {"sqlite": "NOCASE", "postgresql": "C"}
+
+
+def normalize(text):
+    """Fold a text for search and ordering.
+
+    The text is decomposed by compatibility, so that full-width characters and
+    ligatures are replaced by their usual form, diacritics are removed and the
+    case is folded. For instance, "Ｃｏｍｍｅ　l'Été" gives "comme l'ete".
+
+    Args:
+        text (str): Text to normalize.
+
+    Returns:
+        str: Normalized text.
+    """
+    text = DIACRITICS_MATCHER.sub("", unicodedata.normalize("NFKD", text))
+    return unicodedata.normalize("NFC", text).casefold()
+
+
+def get_prefix_expression(field, using):
+    """Give the expression of a normalized text to look up by prefix.
+
+    The text is given in the collation of its prefix index, created by
+    migration, so that a `startswith` lookup and an ordering on the
+    expression are served by the index. SQLite uses an index only for a case
+    insensitive `LIKE`, and PostgreSQL only for a `LIKE` in the C collation.
+
+    Args:
+        field (str): Name of the field of the normalized text.
+        using (str): Alias of the database.
+
+    Returns:
+        django.db.models.Expression: Expression of the text.
+    """
+    collation = PREFIX_COLLATIONS.get(connections[using].vendor)
+    if collation is None:
+        return F(field)
+
+    return Collate(field, collation)
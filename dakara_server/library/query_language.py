@@ -1,38 +1,334 @@
 import re
+from collections import namedtuple
+from copy import deepcopy
+from functools import lru_cache
+from itertools import chain
+from threading import Lock
 
 from library.models import WorkType
 
-KEYWORDS = ["artist", "work", "title"]
+KEYWORDS = ["artist", "work", "title", "lyrics"]
+PARSE_CACHE_SIZE = 512
+
+# regular expression of a keyword term
+TERM_REGEX = r"""
+\b(?P<keyword>{keywords_regex}) # keyword
+:                               # separator
+\s?
+(?:
+    ""(?P<exact>.+?)""          # exact value between double double
+                                # quote
+    |
+    "(?P<contains>.+?)"         # contains value between double
+                                # quote
+    |
+    (?P<contains2>(?:\\\s|\S)+) # contains with no quotes
+)
+"""
+
+_parser = None
+_parser_lock = Lock()
+
+
+def get_parser():
+    """Give the process-wide query language parser.
+
+    The parser is created on first call and kept until it is invalidated by
+    `clear_parser`, so that the work types are not queried and the regular
+    expression is not compiled for each search.
+
+    Returns:
+        QueryLanguageParser: Parser.
+    """
+    global _parser
+
+    with _parser_lock:
+        if _parser is None:
+            _parser = QueryLanguageParser()
+
+        return _parser
+
+
+def clear_parser():
+    """Invalidate the process-wide query language parser.
+
+    Must be called when work types change, as their query names are keywords
+    of the language. The cache of parsed queries is discarded with the parser.
+    """
+    global _parser
+
+    with _parser_lock:
+        _parser = None
+
+
+class Term(namedtuple("Term", ("keyword", "value", "exact", "start", "end"))):
+    """Keyword term of a query, like `artist:name` or `title:""exact title""`.
+
+    Attributes:
+        keyword (str): Keyword in lower case.
+        value (str): Value to search.
+        exact (bool): True if the value must match exactly.
+        start (int): Start position of the term in the query.
+        end (int): End position of the term in the query.
+    """
+
+    __slots__ = ()
+
+
+class Word(namedtuple("Word", ("value", "start", "end"))):
+    """Word or double quoted expression of a query outside of keyword terms.
+
+    Attributes:
+        value (str): Word or expression, without escaping backslashes.
+        start (int): Start position of the word in the query.
+        end (int): End position of the word in the query.
+    """
+
+    __slots__ = ()
+
+
+class Tag(namedtuple("Tag", ("name", "start", "end"))):
+    """Tag of a query, like `#name`.
+
+    Attributes:
+        name (str): Name of the tag in upper case.
+        start (int): Start position of the tag in the query.
+        end (int): End position of the tag in the query.
+    """
+
+    __slots__ = ()
+
+
+def get_expression(value, start, end, tags):
+    """Create the node of an expression outside of keyword terms.
+
+    Args:
+        value (str): Expression, without escaping backslashes.
+        start (int): Start position of the expression in the query.
+        end (int): End position of the expression in the query.
+        tags (bool): If True, an expression starting with a hash is a tag.
+
+    Returns:
+        Word or Tag: Node of the expression, None if the expression is empty
+        or is a tag without name.
+    """
+    if not value:
+        return None
+
+    if not tags or value[0] != "#":
+        return Word(value, start, end)
+
+    if len(value) > 1:
+        return Tag(value[1:].upper(), start, end)
+
+    return None
+
+
+def tokenize(query, matcher=None, tags=True):
+    """Split a query in nodes, in a single pass.
+
+    Keyword terms are found by one run of their regular expression, the text
+    between them is split in expressions on the fly: by spaces not escaped
+    with a backslash, double quoted expressions being kept whole. Text around
+    a term is read as if the term was not there.
+
+    Args:
+        query (str): Words or commands of the query language separated with
+            spaces.
+        matcher (re.Pattern): Compiled `TERM_REGEX`, terms are not read if
+            not given.
+        tags (bool): If True, expressions starting with a hash are tags.
+
+    Returns:
+        list: Term, Word or Tag nodes of the query, in order of their end in
+        the query. Tags without name are ignored.
+
+    Raises:
+        ValueError: If a keyword has an empty value.
+    """
+    nodes = []
+    append = nodes.append
+
+    # nodes are created as tuples, which is faster than with their constructor
+    new_node = tuple.__new__
+
+    # parts of the current expression, it can be interrupted by terms
+    parts = []
+    start = end = position = 0
+    in_quotes = False
+    previous_char = ""
+
+    matches = matcher.finditer(query) if matcher is not None else ()
+    for match in chain(matches, (None,)):
+        text = query[position : len(query) if match is None else match.start()]
+
+        if text == " " and not in_quotes and previous_char != "\\":
+            # terms are usually separated by a single space
+            if parts:
+                node = get_expression("".join(parts).strip(), start, end, tags)
+                parts.clear()
+                if node is not None:
+                    append(node)
+
+            previous_char = " "
+
+        else:
+            # double quotes open and close expressions
+            segment_start = position
+            for index, segment in enumerate(text.split('"')):
+                if index:
+                    if parts:
+                        # the content of double quotes is kept as is
+                        value = "".join(parts)
+                        parts.clear()
+                        node = get_expression(
+                            value if in_quotes else value.strip(), start, end, tags
+                        )
+                        if node is not None:
+                            append(node)
+
+                    in_quotes = not in_quotes
+                    previous_char = '"'
+                    segment_start += 1
+
+                if not segment:
+                    continue
+
+                segment_end = segment_start + len(segment)
+                if in_quotes:
+                    # spaces are kept as is, backslashes are removed
+                    value = segment.replace("\\", "")
+                    if value:
+                        if not parts:
+                            start = segment_start
+
+                        parts.append(value)
+                        end = segment_end
+
+                    segment_start = segment_end
+                    previous_char = segment[-1]
+                    continue
+
+                # each piece but the last is followed by a space
+                pieces = segment.split(" ")
+                piece_start = segment_start
+                for piece in pieces[:-1]:
+                    if piece and not parts and "\\" not in piece:
+                        # the word is complete, which is the most common case
+                        value = piece.strip()
+                        piece_end = piece_start + len(piece)
+                        if value:
+                            if tags and value[0] == "#":
+                                if len(value) > 1:
+                                    append(
+                                        new_node(
+                                            Tag,
+                                            (value[1:].upper(), piece_start, piece_end),
+                                        )
+                                    )
+
+                            else:
+                                append(new_node(Word, (value, piece_start, piece_end)))
+
+                        piece_start = piece_end + 1
+                        continue
+
+                    # a space is escaped by a backslash before it, even if a term
+                    # is between them
+                    if piece:
+                        value = piece.replace("\\", "")
+                        if value:
+                            if not parts:
+                                start = piece_start
+
+                            parts.append(value)
+                            end = piece_start + len(piece)
+
+                        escaped = piece[-1] == "\\"
+
+                    else:
+                        escaped = piece_start == segment_start and previous_char == "\\"
+
+                    piece_start += len(piece)
+                    if escaped:
+                        if not parts:
+                            start = piece_start
+
+                        parts.append(" ")
+                        end = piece_start + 1
+
+                    elif parts:
+                        node = get_expression("".join(parts).strip(), start, end, tags)
+                        parts.clear()
+                        if node is not None:
+                            append(node)
+
+                    piece_start += 1
+
+                # the last piece can be continued after a term
+                piece = pieces[-1]
+                if piece:
+                    value = piece.replace("\\", "")
+                    if value:
+                        if not parts:
+                            start = piece_start
+
+                        parts.append(value)
+                        end = segment_end
+
+                segment_start = segment_end
+                previous_char = segment[-1]
+
+        if match is None:
+            break
+
+        # only one of the values is given, it must not be empty
+        keyword, exact, contains, contains2 = match.groups()
+        if exact:
+            value = exact.strip()
+
+        else:
+            value = (contains or contains2).replace("\\", "").strip()
+
+        if not value:
+            raise ValueError("Inconsistency")
+
+        term_start, position = match.span()
+        append(
+            new_node(Term, (keyword.lower(), value, bool(exact), term_start, position))
+        )
+
+    # an expression not closed by double quotes is complete as well
+    if parts:
+        node = get_expression("".join(parts).strip(), start, end, tags)
+        if node is not None:
+            append(node)
+
+    return nodes
 
 
 class QueryLanguageParser:
-    """Parser for search query mini language used to search song."""
+    """Parser for search query mini language used to search song.
+
+    Parsed queries are kept in a bounded LRU cache, keyed by the raw query.
 
-    def __init__(self):
+    Args:
+        cache_size (int): Maximum number of parsed queries kept in cache.
+    """
+
+    def __init__(self, cache_size=PARSE_CACHE_SIZE):
         self.keywords_work_type = [
             work_type.query_name for work_type in WorkType.objects.all()
         ]
 
         self.keywords = KEYWORDS + self.keywords_work_type
 
-        regex = r"""
-        \b(?P<keyword>{keywords_regex}) # keyword
-        :                               # separator
-        \s?
-        (?:
-            ""(?P<exact>.+?)""          # exact value between double double
-                                        # quote
-            |
-            "(?P<contains>.+?)"         # contains value between double
-                                        # quote
-            |
-            (?P<contains2>(?:\\\s|\S)+) # contains with no quotes
-        )
-        """.format(
-            keywords_regex=r"|".join(self.keywords)
+        # the expression of terms is only tried before one of the first
+        # characters of the keywords, as it is tried before most tokens
+        self.language_matcher = re.compile(
+            TERM_REGEX.format(keywords_regex=r"|".join(self.keywords)), re.I | re.X
         )
-
-        self.language_matcher = re.compile(regex, re.I | re.X)
+        self.parse_cached = lru_cache(maxsize=cache_size)(self.parse_uncached)
 
     @staticmethod
     def split_remaining(string):
@@ -47,38 +343,21 @@ class QueryLanguageParser:
         Returns:
             list: List of splitted words or expressions.
         """
-        result = []
-        current_expression = ""
-        in_quotes = False
-        previous_char = ""
-        for char in string:
-            if char == '"':
-                if in_quotes:
-                    if current_expression:
-                        result.append(current_expression)
-                    in_quotes = False
-                    current_expression = ""
-                else:
-                    current_expression = current_expression.strip()
-                    if current_expression:
-                        result.append(current_expression)
-                    in_quotes = True
-                    current_expression = ""
-            elif char == " " and not in_quotes and previous_char != "\\":
-                current_expression = current_expression.strip()
-                if current_expression:
-                    result.append(current_expression)
-                current_expression = ""
-            elif char != "\\":
-                current_expression += char
-
-            previous_char = char
-
-        current_expression = current_expression.strip()
-        if current_expression:
-            result.append(current_expression)
+        return [word.value for word in tokenize(string, tags=False)]
 
-        return result
+    def tokenize(self, query):
+        """Split a query in keyword terms, words and tags.
+
+        See `library.query_language.tokenize`.
+
+        Args:
+            query (str): Words or commands of the query language separated
+                with spaces.
+
+        Returns:
+            list: Term, Word or Tag nodes of the query.
+        """
+        return tokenize(query, self.language_matcher)
 
     def parse(self, query):
         """Parse query mini language.
@@ -99,64 +378,56 @@ class QueryLanguageParser:
                 `title:
                     `contains`: Titles to match partially
                     `exact`: Titles to match exactly.
+                `lyrics`:
+                    `contains`: Words to find in lyrics.
+                    `exact`: Sequences of words to find in lyrics.
                 `tag`: List of tags to match in uppercase.
                 `work_type`: Dict with queryname as key and a dict as value
                     with the keys `contains` and `exact`.
 
                 `remaining`: Unparsed text.
         """
+        # the cached result is copied as the caller may modify it
+        return deepcopy(self.parse_cached(query))
+
+    def parse_uncached(self, query):
+        """Parse query mini language without using the cache.
+
+        See `parse` for arguments and return value.
+        """
         # create results structure
         # work_type will be filled only if necessary
         result = {
             "artist": {"contains": [], "exact": []},
             "work": {"contains": [], "exact": []},
             "title": {"contains": [], "exact": []},
+            "lyrics": {"contains": [], "exact": []},
             "work_type": {},
             "remaining": [],
             "tag": [],
         }
 
-        for match in self.language_matcher.finditer(query):
-            group_index = match.groupdict()
+        remaining = result["remaining"]
+        tags = result["tag"]
+        for node in self.tokenize(query):
+            node_type = type(node)
+            if node_type is Word:
+                remaining.append(node.value)
+                continue
 
-            # extract values
-            target = group_index["keyword"].strip().lower()
-            value_exact = (group_index["exact"] or "").strip()
-            value_contains = (
-                (group_index["contains"] or group_index["contains2"] or "")
-                .replace("\\", "")
-                .strip()
-            )
+            if node_type is Tag:
+                tags.append(node.name)
+                continue
 
-            if target in self.keywords_work_type:
+            if node.keyword in self.keywords_work_type:
                 # create worktype if not exists
-                if target not in result["work_type"]:
-                    result["work_type"][target] = {"contains": [], "exact": []}
-
-                result_target = result["work_type"][target]
+                result_target = result["work_type"].setdefault(
+                    node.keyword, {"contains": [], "exact": []}
+                )
 
             else:
-                result_target = result[target]
-
-            if value_contains and not value_exact:
-                result_target["contains"].append(value_contains)
+                result_target = result[node.keyword]
 
-            elif value_exact and not value_contains:
-                result_target["exact"].append(value_exact)
-
-            else:
-                raise ValueError("Inconsistency")
-
-        # deal with remaining
-        remaining = self.language_matcher.sub("", query)
-        result["remaining"] = self.split_remaining(remaining)
-
-        # deal with tags
-        for item in result["remaining"][:]:
-            if item[0] == "#":
-                result["remaining"].remove(item)
-                item_clean = item[1:]
-                if item_clean:
-                    result["tag"].append(item_clean.upper())
+            result_target["exact" if node.exact else "contains"].append(node.value)
 
         return result
@@ -0,0 +1,485 @@
+import re
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import Case, Exists, IntegerField, OuterRef, Q, Value, When
+from django.db.models.expressions import RawSQL
+
+from library.lyrics import lyrics_contains, lyrics_exact
+from library.models import (
+    Song,
+    SongSearchDocument,
+    SongWorkLink,
+    WorkAlternativeTitle,
+)
+from library.normalization import normalize
+
+FTS_TABLE = "library_songsearchdocument_fts"
+FTS_FIELDS = ("title", "artists", "works", "work_types", "tags", "details")
+TRIGRAM_LENGTH = 3
+CHUNK_SIZE = 500
+
+# relevance of a term for each field of the search document, when the term is
+# exactly a value of the field and when it is contained in it, by decreasing
+# order
+RELEVANCE = (
+    ("title", 8, 7),
+    ("artists", 6, 5),
+    ("works", 4, 3),
+    ("details", 2, 1),
+)
+
+SEPARATOR = SongSearchDocument.SEPARATOR
+SCOPE_SEPARATOR = SongSearchDocument.SCOPE_SEPARATOR
+
+_full_text_index_available = {}
+
+
+def join_values(values):
+    """Join several values of a search document field.
+
+    Each value is normalized and surrounded by `SEPARATOR`, so that a value
+    can be matched exactly by searching it with its separators.
+
+    Args:
+        values (list of str): Values to join.
+
+    Returns:
+        str: Joined values, or empty string if there are no values.
+    """
+    values = [normalize(value) for value in values if value]
+    if not values:
+        return ""
+
+    return SEPARATOR + SEPARATOR.join(values) + SEPARATOR
+
+
+def chunks(iterable, size=CHUNK_SIZE):
+    """Split an iterable in lists of at most the given size.
+
+    Args:
+        iterable (iterable): Iterable to split.
+        size (int): Maximum size of a chunk.
+
+    Yields:
+        list: Chunk of the iterable.
+    """
+    items = list(iterable)
+    for index in range(0, len(items), size):
+        yield items[index : index + size]
+
+
+def update_song_search_documents(song_ids):
+    """Create or update the search document of the given songs.
+
+    The documents are computed with a constant amount of queries per chunk of
+    songs, whatever the number of related objects.
+
+    Args:
+        song_ids (iterable of int): IDs of the songs to index. IDs of songs that
+            do not exist are ignored.
+    """
+    for song_ids_chunk in chunks(set(song_ids)):
+        songs = Song.objects.filter(pk__in=song_ids_chunk).values_list(
+            "pk", "title", "version", "detail", "detail_video"
+        )
+
+        artists = defaultdict(list)
+        for song_id, name in Song.artists.through.objects.filter(
+            song_id__in=song_ids_chunk
+        ).values_list("song_id", "artist__name"):
+            artists[song_id].append(name)
+
+        tags = defaultdict(list)
+        for song_id, name in Song.tags.through.objects.filter(
+            song_id__in=song_ids_chunk
+        ).values_list("song_id", "songtag__name"):
+            tags[song_id].append(name)
+
+        works = defaultdict(list)
+        work_types = defaultdict(list)
+        work_titles = SongWorkLink.objects.filter(
+            song_id__in=song_ids_chunk
+        ).values_list("song_id", "work__title", "work__work_type__query_name")
+        alternative_titles = WorkAlternativeTitle.objects.filter(
+            work__songworklink__song_id__in=song_ids_chunk
+        ).values_list(
+            "work__songworklink__song_id", "title", "work__work_type__query_name"
+        )
+        for song_id, title, query_name in [*work_titles, *alternative_titles]:
+            works[song_id].append(title)
+            work_types[song_id].append(query_name + SCOPE_SEPARATOR + title)
+
+        SongSearchDocument.objects.bulk_create(
+            [
+                SongSearchDocument(
+                    song_id=song_id,
+                    title=join_values([title]),
+                    artists=join_values(artists[song_id]),
+                    works=join_values(works[song_id]),
+                    work_types=join_values(work_types[song_id]),
+                    tags=join_values(tags[song_id]),
+                    details=join_values([version, detail, detail_video]),
+                )
+                for song_id, title, version, detail, detail_video in songs
+            ],
+            update_conflicts=True,
+            unique_fields=["song"],
+            update_fields=FTS_FIELDS,
+        )
+
+
+def has_full_text_index(using):
+    """Tell if the full text index of search documents is available.
+
+    The index is a SQLite FTS5 virtual table using the trigram tokenizer,
+    created by migration when the database supports it.
+
+    Args:
+        using (str): Alias of the database.
+
+    Returns:
+        bool: True if the index can be used.
+    """
+    if using not in _full_text_index_available:
+        connection = connections[using]
+        available = False
+        if connection.vendor == "sqlite":
+            with connection.cursor() as cursor:
+                available = FTS_TABLE in connection.introspection.table_names(cursor)
+
+        _full_text_index_available[using] = available
+
+    return _full_text_index_available[using]
+
+
+class SongSearch:
+    """Resolve a parsed query against the search documents of songs.
+
+    Each term of the query gives a condition on the search document. When the
+    full text index is available, conditions on terms long enough to contain
+    a trigram are resolved by the index, otherwise they are resolved by
+    pattern matching on the search document table. In both cases, no joins on
+    the related tables of songs are involved.
+
+    Args:
+        using (str): Alias of the database to search in.
+    """
+
+    def __init__(self, using):
+        self.full_text_index = has_full_text_index(using)
+
+    def contains(self, fields, value):
+        """Give the condition for a field to contain a value.
+
+        Args:
+            fields (list of str): Names of the search document fields, the
+                condition is true if any of them contains the value.
+            value (str): Normalized value to search.
+
+        Returns:
+            django.db.models.Q: Condition on songs.
+        """
+        if self.full_text_index and len(value) >= TRIGRAM_LENGTH:
+            expression = '{{{}}} : "{}"'.format(
+                " ".join(fields), value.replace('"', '""')
+            )
+            return Q(
+                pk__in=RawSQL(
+                    "SELECT rowid FROM {0} WHERE {0} MATCH %s".format(FTS_TABLE),
+                    [expression],
+                )
+            )
+
+        query = Q()
+        for field in fields:
+            query |= Q(**{"search_document__{}__contains".format(field): value})
+
+        return query
+
+    def exact(self, fields, value):
+        """Give the condition for a field to have exactly a value.
+
+        Args:
+            fields (list of str): Names of the search document fields, the
+                condition is true if any of them has the value.
+            value (str): Normalized value to search.
+
+        Returns:
+            django.db.models.Q: Condition on songs.
+        """
+        return self.contains(fields, SEPARATOR + value + SEPARATOR)
+
+    def work_type_contains(self, query_name, value):
+        """Give the condition for a work of a given type to contain a value.
+
+        Args:
+            query_name (str): Query name of the work type.
+            value (str): Normalized value to search.
+
+        Returns:
+            django.db.models.Q: Condition on songs.
+        """
+        prefix = SEPARATOR + normalize(query_name) + SCOPE_SEPARATOR
+        regex = "{}[^{}]*{}".format(re.escape(prefix), SEPARATOR, re.escape(value))
+
+        # the index conditions narrow the candidates, the regular expression
+        # ensures the value is in a title of a work of the requested type
+        return (
+            self.contains(["work_types"], prefix)
+            & self.contains(["work_types"], value)
+            & Q(search_document__work_types__regex=regex)
+        )
+
+    def work_type_exact(self, query_name, value):
+        """Give the condition for a work of a given type to have a value.
+
+        Args:
+            query_name (str): Query name of the work type.
+            value (str): Normalized value to search.
+
+        Returns:
+            django.db.models.Q: Condition on songs.
+        """
+        return self.exact(
+            ["work_types"], normalize(query_name) + SCOPE_SEPARATOR + value
+        )
+
+    def get_query(self, query_parsed):
+        """Give the condition corresponding to a parsed query.
+
+        Args:
+            query_parsed (dict): Query parsed by
+                `library.query_language.QueryLanguageParser.parse`.
+
+        Returns:
+            django.db.models.Q: Condition on songs.
+        """
+        query = Q()
+
+        # specific terms of the research, i.e. artists, works and titles
+        for target in ("artist", "title", "work"):
+            field = "title" if target == "title" else target + "s"
+            for value in query_parsed[target]["contains"]:
+                query &= self.contains([field], normalize(value))
+
+            for value in query_parsed[target]["exact"]:
+                query &= self.exact([field], normalize(value))
+
+        # specific terms of the research derivating from work
+        for query_name, search_keywords in query_parsed["work_type"].items():
+            for value in search_keywords["contains"]:
+                query &= self.work_type_contains(query_name, normalize(value))
+
+            for value in search_keywords["exact"]:
+                query &= self.work_type_exact(query_name, normalize(value))
+
+        # unspecific terms of the research
+        for value in query_parsed["remaining"]:
+            query &= self.contains(
+                ["title", "artists", "works", "details"], normalize(value)
+            )
+
+        # tags
+        for tag in query_parsed["tag"]:
+            query &= self.exact(["tags"], normalize(tag))
+
+        # lyrics, resolved by their tokens
+        for value in query_parsed["lyrics"]["contains"]:
+            query &= lyrics_contains(value)
+
+        for value in query_parsed["lyrics"]["exact"]:
+            query &= lyrics_exact(value)
+
+        return query
+
+    @staticmethod
+    def get_term_relevance(fields, value, exact_value=None):
+        """Give the relevance of songs for a term of a query.
+
+        Args:
+            fields (list of tuple): Fields of the search document the term is
+                searched in, as defined by `RELEVANCE`, by decreasing order of
+                relevance.
+            value (str): Normalized value of the term.
+            exact_value (str): Value of the term as stored in the search
+                document, if different from the value.
+
+        Returns:
+            django.db.models.Expression: Relevance of the best field the term
+            matches.
+        """
+        if exact_value is None:
+            exact_value = value
+
+        cases = []
+        for field, relevance_exact, relevance_contains in fields:
+            lookup = "search_document__{}__contains".format(field)
+            cases.append(
+                When(
+                    Q(**{lookup: SEPARATOR + exact_value + SEPARATOR}),
+                    then=Value(relevance_exact),
+                )
+            )
+            cases.append(When(Q(**{lookup: value}), then=Value(relevance_contains)))
+
+        return Case(*cases, default=Value(0), output_field=IntegerField())
+
+    @classmethod
+    def get_relevance(cls, query_parsed):
+        """Give the relevance of songs for a parsed query.
+
+        Each unspecific term of the query adds the relevance of the best field
+        of the search document it matches, as defined by `RELEVANCE`. A title
+        match outranks an artist match, which outranks a work match, which
+        outranks a detail match, and an exact match outranks a partial match
+        on the same field.
+
+        Each specific term of the query adds the relevance of the field it
+        targets, works of a given type being scored as works. As the term
+        matches this field for all songs, only an exact match of a partial
+        term makes a difference.
+
+        Args:
+            query_parsed (dict): Query parsed by
+                `library.query_language.QueryLanguageParser.parse`.
+
+        Returns:
+            django.db.models.Expression: Relevance of songs, to be used as an
+            annotation.
+        """
+        relevance_fields = {field: scores for field, *scores in RELEVANCE}
+        relevance = Value(0)
+
+        # specific terms of the research, i.e. artists, works and titles
+        for target in ("artist", "title", "work"):
+            field = "title" if target == "title" else target + "s"
+            relevance_exact, relevance_contains = relevance_fields[field]
+            for value in query_parsed[target]["contains"]:
+                relevance += cls.get_term_relevance(
+                    [(field, relevance_exact, relevance_contains)], normalize(value)
+                )
+
+            # exact terms match exactly all the songs found
+            relevance += Value(relevance_exact * len(query_parsed[target]["exact"]))
+
+        # specific terms of the research derivating from work
+        relevance_exact, relevance_contains = relevance_fields["works"]
+        for query_name, search_keywords in query_parsed["work_type"].items():
+            prefix = normalize(query_name) + SCOPE_SEPARATOR
+            for value in search_keywords["contains"]:
+                value = normalize(value)
+                relevance += cls.get_term_relevance(
+                    [("work_types", relevance_exact, relevance_contains)],
+                    value,
+                    exact_value=prefix + value,
+                )
+
+            relevance += Value(relevance_exact * len(search_keywords["exact"]))
+
+        # unspecific terms of the research
+        for value in query_parsed["remaining"]:
+            relevance += cls.get_term_relevance(RELEVANCE, normalize(value))
+
+        return relevance
+
+    def filter(self, query_set, query_parsed):
+        """Filter songs matching a parsed query.
+
+        Args:
+            query_set (django.db.models.QuerySet): Songs to filter.
+            query_parsed (dict): Query parsed by
+                `library.query_language.QueryLanguageParser.parse`.
+
+        Returns:
+            django.db.models.QuerySet: Filtered songs.
+        """
+        return query_set.filter(self.get_query(query_parsed))
+
+
+class SongExistsSearch(SongSearch):
+    """Resolve a parsed query against the related tables of songs.
+
+    Each term of the query gives a correlated `EXISTS` subquery on the table
+    of the related objects it targets, so that the rows of songs are never
+    multiplied by their related objects and no `DISTINCT` is needed.
+
+    Args:
+        using (str): Alias of the database to search in.
+    """
+
+    # lookups of the fields of songs, by relation to the song
+    LOOKUPS = {
+        "title": (None, ["title_normalized"]),
+        "artists": (Song.artists.through, ["artist__name_normalized"]),
+        "works": (
+            SongWorkLink,
+            ["work__title_normalized", "work__alternative_title__title_normalized"],
+        ),
+        "tags": (Song.tags.through, ["songtag__name_normalized"]),
+        "details": (
+            None,
+            ["version_normalized", "detail_normalized", "detail_video_normalized"],
+        ),
+    }
+
+    def lookup(self, fields, lookup_type, value, work_type=None):
+        """Give the condition for fields of songs to match a value.
+
+        Args:
+            fields (list of str): Names of the fields, as named in the search
+                document, the condition is true if any of them matches.
+            lookup_type (str): Type of lookup, `icontains` or `iexact`.
+            value (str): Normalized value to search.
+            work_type (str): Query name of the type of works to search in.
+
+        Returns:
+            django.db.models.Q: Condition on songs.
+        """
+        query = Q()
+        for field in fields:
+            relation, lookups = self.LOOKUPS[field]
+            query_field = Q()
+            for lookup in lookups:
+                query_field |= Q(**{"{}__{}".format(lookup, lookup_type): value})
+
+            if relation is None:
+                query |= query_field
+                continue
+
+            if work_type is not None:
+                query_field &= Q(work__work_type__query_name__iexact=work_type)
+
+            query |= Exists(
+                relation.objects.filter(query_field, song_id=OuterRef("pk"))
+            )
+
+        return query
+
+    def contains(self, fields, value):
+        return self.lookup(fields, "icontains", value)
+
+    def exact(self, fields, value):
+        return self.lookup(fields, "iexact", value)
+
+    def work_type_contains(self, query_name, value):
+        return self.lookup(["works"], "icontains", value, work_type=query_name)
+
+    def work_type_exact(self, query_name, value):
+        return self.lookup(["works"], "iexact", value, work_type=query_name)
+
+
+SEARCHES = {"document": SongSearch, "exists": SongExistsSearch}
+
+
+def get_song_search(using):
+    """Give the search of songs selected by the `LIBRARY_SEARCH` setting.
+
+    Args:
+        using (str): Alias of the database to search in.
+
+    Returns:
+        SongSearch: Search of songs.
+    """
+    return SEARCHES[getattr(settings, "LIBRARY_SEARCH", "document")](using)
@@ -0,0 +1,206 @@
+import hashlib
+import json
+import time
+
+from django.core.cache import cache
+
+from library.normalization import normalize
+
+LIBRARY_REVISION_KEY = "library.revision"
+SEARCH_RESULTS_KEY = "library.search.{revision}.{digest}"
+SEARCH_RESULTS_TIMEOUT = 600
+SEARCH_RESULTS_MAX_COUNT = 1000
+
+
+def get_library_revision():
+    """Give the revision of the library.
+
+    The revision is initialized from the current time, so that a revision lost
+    by the cache is not reused.
+
+    Returns:
+        int: Revision.
+    """
+    return cache.get_or_set(LIBRARY_REVISION_KEY, time.time_ns, timeout=None)
+
+
+def bump_library_revision():
+    """Change the revision of the library.
+
+    All the cached search results are then invalidated.
+    """
+    try:
+        cache.incr(LIBRARY_REVISION_KEY)
+
+    except ValueError:
+        get_library_revision()
+
+
+def normalize_query(value):
+    """Normalize a parsed query.
+
+    Terms are normalized and sorted, as the search does not depend on their
+    case, diacritics and order.
+
+    Args:
+        value (any): Parsed query, or part of it.
+
+    Returns:
+        any: Normalized parsed query.
+    """
+    if isinstance(value, dict):
+        return {key: normalize_query(item) for key, item in value.items()}
+
+    if isinstance(value, list):
+        return sorted(normalize_query(item) for item in value)
+
+    if isinstance(value, str):
+        return normalize(value)
+
+    return value
+
+
+class CachedIds:
+    """IDs of songs matching a search, of which only the first ones are cached.
+
+    It can be paginated as a list of all the IDs, as long as the pages are
+    among the cached IDs.
+
+    Args:
+        ids (list of int): Cached IDs of songs, in order.
+        count (int): Number of songs matching.
+    """
+
+    def __init__(self, ids, count):
+        self.ids = ids
+        self.total = count
+
+    def count(self):
+        return self.total
+
+    def __getitem__(self, key):
+        return self.ids[key]
+
+
+class SearchResultCache:
+    """Cache of the IDs of songs matching a search.
+
+    Results are identified by the normalized parsed query, the search options
+    and the visibility class of the user, i.e. if they can see songs with
+    disabled tags. They are identified by the revision of the library as well,
+    so that any change of the library invalidates them.
+
+    Only the first `SEARCH_RESULTS_MAX_COUNT` IDs are cached, with the number
+    of songs matching, so that a search matching most of the library does not
+    fill the cache. Pages past them are obtained from the database.
+
+    Args:
+        query_parsed (dict): Query parsed by
+            `library.query_language.QueryLanguageParser.parse`.
+        show_disabled (bool): If True, the user can see songs with disabled
+            tags.
+        options (dict): Other parameters the results depend on.
+    """
+
+    def __init__(self, query_parsed, show_disabled, **options):
+        digest = hashlib.sha1(
+            json.dumps(
+                {
+                    "query": normalize_query(query_parsed),
+                    "show_disabled": show_disabled,
+                    "options": options,
+                },
+                sort_keys=True,
+            ).encode()
+        ).hexdigest()
+        self.key = SEARCH_RESULTS_KEY.format(
+            revision=get_library_revision(), digest=digest
+        )
+        self.results = cache.get(self.key)
+
+    def fetch(self, query_set, score_field=None):
+        """Obtain the results of the search and store them.
+
+        Args:
+            query_set (django.db.models.QuerySet): Songs matching, in order.
+            score_field (str): Name of the annotation of the score of songs,
+                if results are ranked.
+        """
+        query_set = query_set.prefetch_related(None)
+        if score_field is None:
+            ids = list(
+                query_set.values_list("pk", flat=True)[: SEARCH_RESULTS_MAX_COUNT + 1]
+            )
+            scores = None
+
+        else:
+            scores = dict(
+                query_set.values_list("pk", score_field)[: SEARCH_RESULTS_MAX_COUNT + 1]
+            )
+            ids = list(scores)
+
+        # the songs are counted only if they are not all cached
+        count = len(ids)
+        if count > SEARCH_RESULTS_MAX_COUNT:
+            count = query_set.count()
+            ids = ids[:SEARCH_RESULTS_MAX_COUNT]
+            if scores is not None:
+                scores = {pk: scores[pk] for pk in ids}
+
+        self.results = {"ids": ids, "count": count, "scores": scores, "facets": {}}
+        cache.set(self.key, self.results, SEARCH_RESULTS_TIMEOUT)
+
+    def has_window(self, window):
+        """Tell if the IDs of songs of a window of the results are cached.
+
+        Args:
+            window (tuple): Start and stop indexes of the window, or None if
+                the window is unknown.
+
+        Returns:
+            bool: True if the results are cached and the window is among the
+            cached IDs.
+        """
+        if self.results is None or window is None:
+            return False
+
+        ids = self.results["ids"]
+        return len(ids) == self.results["count"] or window[1] <= len(ids)
+
+    def get_ids(self):
+        """Give the IDs of songs of the results.
+
+        Returns:
+            CachedIds: IDs of songs, to be paginated.
+        """
+        return CachedIds(self.results["ids"], self.results["count"])
+
+    def get_facets(self, names):
+        """Give the cached counts of facets of the results.
+
+        Args:
+            names (list of str): Names of the facets.
+
+        Returns:
+            dict: Counts of each facet by name, or None if the results or
+            some of the facets are not cached.
+        """
+        if self.results is None:
+            return None
+
+        facets = self.results["facets"]
+        if any(name not in facets for name in names):
+            return None
+
+        return {name: facets[name] for name in names}
+
+    def set_facets(self, facets):
+        """Store counts of facets of the results.
+
+        The results must be stored already.
+
+        Args:
+            facets (dict): Counts of each facet by name.
+        """
+        self.results["facets"].update(facets)
+        cache.set(self.key, self.results, SEARCH_RESULTS_TIMEOUT)
@@ -1,9 +1,19 @@
 import os
 
+from django.db import connection
+from django.db.models import prefetch_related_objects
 from rest_framework import serializers
 
+from internal.prefetch import get_prefetch_plan
+from internal.projection import ValuesListSerializer
+from library.autocomplete import SUGGESTIONS_LIMIT, SUGGESTIONS_LIMIT_MAX
+from library.changes import CHANGE_KINDS
+from library.facets import FACETS
+from library.ingestion import create_songs
 from library.models import (
     Artist,
+    ImportJob,
+    LibraryChange,
     Song,
     SongTag,
     SongWorkLink,
@@ -11,6 +21,12 @@ from library.models import (
     WorkAlternativeTitle,
     WorkType,
 )
+from library.search import chunks
+
+# range of the IDs of songs which can be stored in database
+SONG_ID_MIN, SONG_ID_MAX = connection.ops.integer_field_range(
+    Song._meta.pk.get_internal_type()
+)
 
 
 class SecondsDurationField(serializers.DurationField):
@@ -60,17 +76,10 @@ class ArtistWithCountSerializer(serializers.ModelSerializer):
     Used in artists listing.
     """
 
-    song_count = serializers.SerializerMethodField()
-
     class Meta:
         model = Artist
         fields = ("id", "name", "song_count")
 
-    @staticmethod
-    def get_song_count(artist):
-        """Count the amount of songs associated to the artist."""
-        return Song.objects.filter(artists=artist).count()
-
 
 class WorkAlternativeTitleSerializer(serializers.ModelSerializer):
     """Work alternative title serialize."""
@@ -158,6 +167,7 @@ class WorkTypeOnlyQueryNameSerializer(serializers.ModelSerializer):
     class Meta:
         model = WorkType
         fields = ("query_name",)
+        only = ()
 
 
 class WorkNoCountSerializer(serializers.ModelSerializer):
@@ -176,7 +186,6 @@ class WorkSerializer(serializers.ModelSerializer):
 
     alternative_titles = WorkAlternativeTitleSerializer(many=True, required=False)
     work_type = WorkTypeForWorkSerializer(many=False)
-    song_count = serializers.SerializerMethodField()
 
     class Meta:
         model = Work
@@ -190,18 +199,6 @@ class WorkSerializer(serializers.ModelSerializer):
         )
         read_only_fields = ("id", "song_count")
 
-    @staticmethod
-    def get_song_count(work):
-        """Count the amount of songs associated to the work.
-
-        Args:
-            work (models.Work): Work to count songs of.
-
-        Returns:
-            int: Number of songs associated with the provided work.
-        """
-        return Song.objects.filter(works=work).count()
-
     def create(self, validated_data):
         """Create the Work instance."""
         alternative_titles_data = validated_data.pop("alternative_titles", [])
@@ -293,7 +290,7 @@ class SongTagSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = SongTag
-        fields = ("id", "name", "color_hue", "disabled")
+        fields = ("id", "name", "color_hue", "disabled", "song_count")
 
     @staticmethod
     def set(song, tags_data):
@@ -327,6 +324,24 @@ class SongTagForSongSerializer(serializers.ModelSerializer):
         extra_kwargs = {"name": {"validators": []}}
 
 
+class SongListSerializer(serializers.ListSerializer):
+    """List serializer that creates songs in bulk.
+
+    See `library.ingestion.create_songs`.
+    """
+
+    def create(self, validated_data):
+        """Create the Song instances."""
+        songs = create_songs(validated_data)
+
+        # fetch the related objects to represent the songs
+        _, prefetch_related, _ = get_prefetch_plan(self.child)
+        for songs_chunk in chunks(songs):
+            prefetch_related_objects(songs_chunk, *prefetch_related)
+
+        return songs
+
+
 class SongSerializer(serializers.ModelSerializer):
     """Song serializer."""
 
@@ -343,6 +358,7 @@ class SongSerializer(serializers.ModelSerializer):
             "title",
             "filename",
             "directory",
+            "fingerprint",
             "duration",
             "version",
             "detail",
@@ -357,22 +373,23 @@ class SongSerializer(serializers.ModelSerializer):
             "date_updated",
         )
         extra_kwargs = {"lyrics": {"write_only": True}}
+        defer = ("lyrics",)
+        list_serializer_class = SongListSerializer
 
     @staticmethod
-    def get_lyrics_preview(song, max_lines=5):
+    def get_lyrics_preview(song):
         """Get an extract of the lyrics.
 
-        Give at most `max_lines` lines of lyrics and tell if more lines remain.
+        Give the extract stored with the song and tell if more lines remain,
+        see `library.models.Song.update_lyrics_preview`.
         """
-        if not song.lyrics:
+        if not song.lyrics_preview and not song.lyrics_truncated:
             return None
 
-        lyrics_list = song.lyrics.splitlines()
-
-        if len(lyrics_list) <= max_lines:
-            return {"text": song.lyrics}
+        if not song.lyrics_truncated:
+            return {"text": song.lyrics_preview}
 
-        return {"text": "\n".join(lyrics_list[:max_lines]), "truncated": True}
+        return {"text": song.lyrics_preview, "truncated": True}
 
     def create(self, validated_data):
         """Create the Song instance."""
@@ -424,6 +441,7 @@ class SongForPlayerSerializer(serializers.ModelSerializer):
             "file_path",
             "has_instrumental",
         )
+        only = ("directory", "filename")
 
     @staticmethod
     def get_file_path(song):
@@ -438,6 +456,8 @@ class SongForFeederSerializer(serializers.ModelSerializer):
         model = Song
         fields = ("id", "filename", "directory")
         read_only_fields = ("id", "filename", "directory")
+        only = ()
+        list_serializer_class = ValuesListSerializer
 
 
 class SongForDigestSerializer(serializers.ModelSerializer):
@@ -449,6 +469,7 @@ class SongForDigestSerializer(serializers.ModelSerializer):
         model = Song
         fields = ("id", "title", "duration")
         read_only_fields = ("id", "title", "duration")
+        only = ()
 
 
 class WorkForFeederSerializer(serializers.ModelSerializer):
@@ -460,3 +481,188 @@ class WorkForFeederSerializer(serializers.ModelSerializer):
         model = Work
         fields = ("id", "title", "subtitle", "work_type")
         read_only_fields = ("id", "title", "subtitle", "work_type")
+        only = ()
+        list_serializer_class = ValuesListSerializer
+
+
+class AutocompleteQuerySerializer(serializers.Serializer):
+    """Query string of autocompletion."""
+
+    query = serializers.CharField(allow_blank=True, trim_whitespace=False)
+    limit = serializers.IntegerField(
+        min_value=1, max_value=SUGGESTIONS_LIMIT_MAX, default=SUGGESTIONS_LIMIT
+    )
+
+
+class SongListQuerySerializer(serializers.Serializer):
+    """Query string of the list of songs, for parameters other than the query.
+
+    Facets and IDs are given as comma-separated lists.
+    """
+
+    IDS_MAX = 100
+
+    facets = serializers.CharField(required=False, default="", allow_blank=True)
+    ids = serializers.CharField(required=False)
+
+    def validate_ids(self, ids):
+        try:
+            ids = [int(pk) for pk in ids.split(",") if pk.strip()]
+
+        except ValueError as error:
+            raise serializers.ValidationError(
+                "IDs must be a comma-separated list of integers"
+            ) from error
+
+        # IDs which cannot be stored cannot be queried
+        if any(not SONG_ID_MIN <= pk <= SONG_ID_MAX for pk in ids):
+            raise serializers.ValidationError(
+                "IDs must be between {} and {}".format(SONG_ID_MIN, SONG_ID_MAX)
+            )
+
+        # remove duplicates, keep order
+        ids = list(dict.fromkeys(ids))
+        if len(ids) > self.IDS_MAX:
+            raise serializers.ValidationError(
+                "At most {} IDs can be requested".format(self.IDS_MAX)
+            )
+
+        return ids
+
+    def validate_facets(self, facets):
+        names = [name.strip() for name in facets.split(",") if name.strip()]
+        unknown = [name for name in names if name not in FACETS]
+        if unknown:
+            raise serializers.ValidationError(
+                "Unknown facets: {}".format(", ".join(unknown))
+            )
+
+        # remove duplicates, keep order
+        return list(dict.fromkeys(names))
+
+
+class ManifestField(serializers.Field):
+    """Manifest of the files of the feeder.
+
+    The manifest is a list of directory, file name and fingerprint of each
+    file. It is checked in one pass, as it can list the whole library.
+    """
+
+    default_error_messages = {
+        "invalid": "Expected a list of [directory, filename, fingerprint] lists."
+    }
+
+    def to_internal_value(self, data):
+        if not isinstance(data, list) or not all(
+            isinstance(entry, list)
+            and len(entry) == 3
+            and all(isinstance(value, str) for value in entry)
+            for entry in data
+        ):
+            self.fail("invalid")
+
+        return [tuple(entry) for entry in data]
+
+
+class SongManifestSerializer(serializers.Serializer):
+    """Serializer for the manifest of files of the feeder."""
+
+    manifest = ManifestField()
+
+
+class SongPruneSerializer(serializers.Serializer):
+    """Serializer for the songs to delete, by IDs or by directory.
+
+    A directory selects the songs in it and in its subdirectories.
+    """
+
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1, max_value=SONG_ID_MAX),
+        required=False,
+    )
+    directory = serializers.CharField(required=False)
+
+    def validate_directory(self, directory):
+        directory = directory.rstrip("/")
+
+        # the root directory would select all the songs
+        if not directory:
+            raise serializers.ValidationError("Directory must not be the root")
+
+        return directory
+
+    def validate(self, data):
+        if ("ids" in data) == ("directory" in data):
+            raise serializers.ValidationError("Either IDs or a directory must be given")
+
+        return data
+
+
+class LibraryChangeSerializer(serializers.ModelSerializer):
+    """Change of an object of the library."""
+
+    kind = serializers.SerializerMethodField()
+    id = serializers.IntegerField(source="object_id")
+
+    class Meta:
+        model = LibraryChange
+        fields = ("seq", "kind", "id", "deleted", "date_changed")
+        read_only_fields = fields
+
+    @staticmethod
+    def get_kind(change):
+        return CHANGE_KINDS[change.kind]
+
+
+class ImportJobPayloadField(serializers.Field):
+    """Objects to create by an import job.
+
+    Only the structure of the list is checked, the objects are validated by
+    the job, see `library.jobs.process_import_job`.
+    """
+
+    default_error_messages = {
+        "invalid": "Expected a non-empty list of objects.",
+    }
+
+    def to_internal_value(self, data):
+        if (
+            not isinstance(data, list)
+            or not data
+            or not all(isinstance(item, dict) for item in data)
+        ):
+            self.fail("invalid")
+
+        return data
+
+
+class ImportJobSerializer(serializers.ModelSerializer):
+    """Import job, with its progress."""
+
+    kind = serializers.SerializerMethodField()
+    status = serializers.SerializerMethodField()
+    throughput = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = ImportJob
+        fields = (
+            "id",
+            "kind",
+            "status",
+            "total",
+            "processed",
+            "throughput",
+            "errors",
+            "date_created",
+            "date_started",
+            "date_finished",
+        )
+        read_only_fields = fields
+
+    @staticmethod
+    def get_kind(job):
+        return ImportJob.KIND_CHOICES[job.kind].lower()
+
+    @staticmethod
+    def get_status(job):
+        return ImportJob.STATUS_CHOICES[job.status].lower()
@@ -0,0 +1,493 @@
+from threading import Event
+
+from django.db.backends.signals import connection_created
+from django.db.models import Count, Exists, OuterRef, QuerySet, Subquery
+from django.db.models.functions import Coalesce
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+    pre_save,
+)
+from django.dispatch import receiver
+
+from internal.reloader import is_reloader
+from library.autocomplete import delete_prefixes, update_prefixes
+from library.changes import on_commit_once, record_changes
+from library.fuzzy import delete_trigrams, update_trigrams
+from library.lyrics import update_lyrics_tokens
+from library.models import (
+    Artist,
+    SearchEntry,
+    Song,
+    SongTag,
+    SongWorkLink,
+    Work,
+    WorkAlternativeTitle,
+    WorkType,
+)
+from library.query_language import clear_parser
+from library.search import update_song_search_documents
+from library.search_cache import bump_library_revision
+
+# kind and field of the searchable text of models
+TEXTS = {
+    Song: (SearchEntry.SONG, "title"),
+    Artist: (SearchEntry.ARTIST, "name"),
+    Work: (SearchEntry.WORK, "title"),
+    WorkAlternativeTitle: (SearchEntry.ALTERNATIVE_TITLE, "title"),
+}
+
+# links between songs and objects which songs are counted, with the name of the
+# field of the link referencing the object
+SONG_COUNT_LINKS = {
+    Artist: (Song.artists.through, "artist_id"),
+    SongTag: (Song.tags.through, "songtag_id"),
+    Work: (SongWorkLink, "work_id"),
+}
+
+
+def update_song_counts(model, object_ids):
+    """Recount the songs of objects.
+
+    The counts are computed by a single grouped query.
+
+    Args:
+        model (type): Model of the objects, artists, tags or works.
+        object_ids (iterable): IDs of the objects.
+    """
+    link, field = SONG_COUNT_LINKS[model]
+    counts = (
+        link.objects.filter(**{field: OuterRef("pk")})
+        .order_by()
+        .values(field)
+        .annotate(count=Count("song_id", distinct=True))
+        .values("count")
+    )
+    model.objects.filter(pk__in=set(object_ids)).update(
+        song_count=Coalesce(Subquery(counts), 0)
+    )
+
+    # the number of songs is given with the objects
+    record_changes(model, object_ids)
+
+
+def update_hidden_songs(song_ids):
+    """Tell if songs are hidden, i.e. have a disabled tag.
+
+    The flags are computed by a single query.
+
+    Args:
+        song_ids (iterable): IDs of the songs.
+    """
+    Song.objects.filter(pk__in=set(song_ids)).update(
+        hidden=Exists(
+            Song.tags.through.objects.filter(
+                song_id=OuterRef("pk"), songtag__disabled=True
+            )
+        )
+    )
+
+
+def get_scope(instance):
+    """Give the scope of the searchable text of an object.
+
+    Args:
+        instance (any): Object.
+
+    Returns:
+        str: Query name of the work type for works and alternative titles,
+        empty string otherwise.
+    """
+    if isinstance(instance, Work):
+        return instance.work_type.query_name
+
+    if isinstance(instance, WorkAlternativeTitle):
+        return instance.work.work_type.query_name
+
+    return ""
+
+
+def index_texts(model, instances):
+    """Index the searchable texts of objects for fuzzy search and completion.
+
+    Args:
+        model (type): Model of the objects.
+        instances (iterable): Objects to index.
+    """
+    kind, field = TEXTS[model]
+    instances = list(instances)
+    update_trigrams(
+        kind, [(instance.pk, getattr(instance, field)) for instance in instances]
+    )
+    update_prefixes(
+        kind,
+        [
+            (instance.pk, getattr(instance, field), get_scope(instance))
+            for instance in instances
+        ],
+    )
+
+
+def is_deleting_songs(origin):
+    """Tell if a deletion originates from songs.
+
+    Args:
+        origin (any): Origin of the deletion, as given by deletion signals.
+
+    Returns:
+        bool: True if the origin is a song or a query set of songs.
+    """
+    if isinstance(origin, Song):
+        return True
+
+    return isinstance(origin, QuerySet) and origin.model is Song
+
+
+def get_work_song_ids(**filters):
+    """Give the songs of works.
+
+    Args:
+        filters (dict): Filters of the song-work links.
+
+    Returns:
+        list of int: IDs of the songs.
+    """
+    return list(
+        SongWorkLink.objects.filter(**filters).values_list("song_id", flat=True)
+    )
+
+
+def revise_library():
+    """Invalidate the cached search results."""
+    bump_library_revision()
+
+    # invalidate them again once the change is visible to other connections,
+    # as results may have been cached from the previous state meanwhile
+    on_commit_once(bump_library_revision)
+
+
+def revise_parser():
+    """Invalidate the query language parser."""
+    clear_parser()
+
+    # invalidate it again once the change is visible to other connections, as
+    # the parser may have been created from the previous work types meanwhile
+    on_commit_once(clear_parser)
+
+
+@receiver(pre_save, sender=Song, dispatch_uid="handle_song_pre_save")
+def handle_song_pre_save(sender, instance, update_fields=None, **kwargs):
+    """Remember the lyrics of a song about to be modified."""
+    if instance.pk is None or (
+        update_fields is not None and "lyrics" not in update_fields
+    ):
+        return
+
+    instance._previous_lyrics = (
+        Song.objects.filter(pk=instance.pk).values_list("lyrics", flat=True).first()
+    )
+
+
+@receiver(post_save, sender=Song, dispatch_uid="handle_song_saved")
+def handle_song_saved(sender, instance, created, **kwargs):
+    """Index a saved song and record its change."""
+    update_song_search_documents([instance.pk])
+    index_texts(Song, [instance])
+
+    # the flag saved with the song may be outdated if its tags changed since it
+    # was loaded
+    if not created:
+        update_hidden_songs([instance.pk])
+
+    # index the lyrics of a created song or of a song which lyrics changed
+    if created:
+        if instance.lyrics:
+            update_lyrics_tokens([(instance.pk, instance.lyrics)])
+
+    elif hasattr(instance, "_previous_lyrics"):
+        if instance._previous_lyrics != instance.lyrics:
+            update_lyrics_tokens([(instance.pk, instance.lyrics)])
+
+        del instance._previous_lyrics
+
+    revise_library()
+    record_changes(Song, [instance.pk])
+
+
+@receiver(pre_delete, sender=Song, dispatch_uid="handle_song_pre_delete")
+def handle_song_pre_delete(sender, instance, **kwargs):
+    """Remember the artists and tags of a song about to be deleted.
+
+    Links to artists and tags are deleted without sending signals.
+    """
+    instance._deleted_artist_ids = list(instance.artists.values_list("pk", flat=True))
+    instance._deleted_tag_ids = list(instance.tags.values_list("pk", flat=True))
+
+
+@receiver(post_delete, sender=Song, dispatch_uid="handle_song_deleted")
+def handle_song_deleted(sender, instance, **kwargs):
+    """Unindex a deleted song and recount the songs of its artists and tags."""
+    delete_trigrams(SearchEntry.SONG, [instance.pk])
+    delete_prefixes(SearchEntry.SONG, [instance.pk])
+    update_song_counts(Artist, getattr(instance, "_deleted_artist_ids", []))
+    update_song_counts(SongTag, getattr(instance, "_deleted_tag_ids", []))
+    revise_library()
+    record_changes(Song, [instance.pk], deleted=True)
+
+
+@receiver(
+    m2m_changed, sender=Song.artists.through, dispatch_uid="handle_artists_changed"
+)
+@receiver(m2m_changed, sender=Song.tags.through, dispatch_uid="handle_tags_changed")
+def handle_song_relation_changed(
+    sender, instance, action, reverse, model, pk_set, **kwargs
+):
+    """Update the songs which artists or tags changed, and their objects."""
+    if reverse:
+        # the relation was changed from the artist or tag side
+        if action == "pre_clear":
+            instance._cleared_song_ids = list(
+                instance.song_set.values_list("pk", flat=True)
+            )
+            return
+
+        counted_model = type(instance)
+        object_ids = [instance.pk]
+        song_ids = (
+            getattr(instance, "_cleared_song_ids", [])
+            if action == "post_clear"
+            else pk_set
+        )
+
+    else:
+        # the relation was changed from the song side
+        _, field = SONG_COUNT_LINKS[model]
+        if action == "pre_clear":
+            instance._cleared_object_ids = list(
+                sender.objects.filter(song=instance).values_list(field, flat=True)
+            )
+            return
+
+        counted_model = model
+        object_ids = (
+            getattr(instance, "_cleared_object_ids", [])
+            if action == "post_clear"
+            else pk_set
+        )
+        song_ids = [instance.pk]
+
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+
+    song_ids = list(song_ids)
+    update_song_search_documents(song_ids)
+    update_song_counts(counted_model, object_ids)
+
+    if sender is Song.tags.through:
+        update_hidden_songs(song_ids)
+
+    revise_library()
+    record_changes(Song, song_ids)
+
+
+@receiver(pre_save, sender=SongWorkLink, dispatch_uid="handle_song_work_link_pre_save")
+def handle_song_work_link_pre_save(sender, instance, **kwargs):
+    """Remember the work of a song-work link about to be modified."""
+    if instance.pk is None:
+        return
+
+    instance._previous_work_id = (
+        SongWorkLink.objects.filter(pk=instance.pk)
+        .values_list("work_id", flat=True)
+        .first()
+    )
+
+
+@receiver(post_save, sender=SongWorkLink, dispatch_uid="handle_song_work_link_saved")
+def handle_song_work_link_saved(sender, instance, **kwargs):
+    """Update the song and the works of a saved song-work link."""
+    update_song_search_documents([instance.song_id])
+    update_song_counts(
+        Work, [instance.work_id, getattr(instance, "_previous_work_id", None)]
+    )
+    revise_library()
+    record_changes(Song, [instance.song_id])
+
+
+@receiver(
+    post_delete, sender=SongWorkLink, dispatch_uid="handle_song_work_link_deleted"
+)
+def handle_song_work_link_deleted(sender, instance, origin=None, **kwargs):
+    """Update the song and the work of a deleted song-work link."""
+    update_song_counts(Work, [instance.work_id])
+    revise_library()
+
+    # no need to update a song being deleted, its deletion is recorded on its
+    # own
+    if is_deleting_songs(origin):
+        return
+
+    update_song_search_documents([instance.song_id])
+    record_changes(Song, [instance.song_id])
+
+
+@receiver(post_save, sender=Artist, dispatch_uid="handle_artist_saved")
+@receiver(post_save, sender=SongTag, dispatch_uid="handle_song_tag_saved")
+def handle_song_relation_saved(sender, instance, created, **kwargs):
+    """Index a saved artist or tag and update the songs of a modified one."""
+    if sender is Artist:
+        index_texts(Artist, [instance])
+
+    revise_library()
+    record_changes(sender, [instance.pk])
+
+    if created:
+        return
+
+    song_ids = list(instance.song_set.values_list("pk", flat=True))
+    update_song_search_documents(song_ids)
+
+    if sender is SongTag:
+        update_hidden_songs(song_ids)
+
+    record_changes(Song, song_ids)
+
+
+@receiver(pre_delete, sender=Artist, dispatch_uid="handle_artist_pre_delete")
+@receiver(pre_delete, sender=SongTag, dispatch_uid="handle_song_tag_pre_delete")
+def handle_song_relation_pre_delete(sender, instance, **kwargs):
+    """Remember the songs of an artist or a tag about to be deleted."""
+    instance._deleted_song_ids = list(instance.song_set.values_list("pk", flat=True))
+
+
+@receiver(post_delete, sender=Artist, dispatch_uid="handle_artist_deleted")
+@receiver(post_delete, sender=SongTag, dispatch_uid="handle_song_tag_deleted")
+def handle_song_relation_deleted(sender, instance, **kwargs):
+    """Unindex a deleted artist or tag and update its former songs."""
+    if sender is Artist:
+        delete_trigrams(SearchEntry.ARTIST, [instance.pk])
+        delete_prefixes(SearchEntry.ARTIST, [instance.pk])
+
+    song_ids = getattr(instance, "_deleted_song_ids", [])
+    update_song_search_documents(song_ids)
+
+    if sender is SongTag:
+        update_hidden_songs(song_ids)
+
+    revise_library()
+    record_changes(sender, [instance.pk], deleted=True)
+    record_changes(Song, song_ids)
+
+
+@receiver(post_save, sender=Work, dispatch_uid="handle_work_saved")
+def handle_work_saved(sender, instance, created, **kwargs):
+    """Index a saved work and update the songs of a modified one."""
+    index_texts(Work, [instance])
+
+    # alternative titles have the scope of their work
+    index_texts(WorkAlternativeTitle, instance.alternative_titles.all())
+
+    revise_library()
+    record_changes(Work, [instance.pk])
+
+    if created:
+        return
+
+    song_ids = get_work_song_ids(work=instance)
+    update_song_search_documents(song_ids)
+    record_changes(Song, song_ids)
+
+
+@receiver(post_delete, sender=Work, dispatch_uid="handle_work_deleted")
+def handle_work_deleted(sender, instance, **kwargs):
+    """Unindex a deleted work."""
+    delete_trigrams(SearchEntry.WORK, [instance.pk])
+    delete_prefixes(SearchEntry.WORK, [instance.pk])
+    revise_library()
+    record_changes(Work, [instance.pk], deleted=True)
+
+
+@receiver(
+    post_save,
+    sender=WorkAlternativeTitle,
+    dispatch_uid="handle_work_alternative_title_saved",
+)
+def handle_work_alternative_title_saved(sender, instance, **kwargs):
+    """Index a saved alternative title and update its work and songs."""
+    index_texts(WorkAlternativeTitle, [instance])
+    song_ids = get_work_song_ids(work_id=instance.work_id)
+    update_song_search_documents(song_ids)
+    revise_library()
+    record_changes(WorkAlternativeTitle, [instance.pk])
+    record_changes(Work, [instance.work_id])
+    record_changes(Song, song_ids)
+
+
+@receiver(
+    post_delete,
+    sender=WorkAlternativeTitle,
+    dispatch_uid="handle_work_alternative_title_deleted",
+)
+def handle_work_alternative_title_deleted(sender, instance, **kwargs):
+    """Unindex a deleted alternative title and update its work and songs."""
+    delete_trigrams(SearchEntry.ALTERNATIVE_TITLE, [instance.pk])
+    delete_prefixes(SearchEntry.ALTERNATIVE_TITLE, [instance.pk])
+    song_ids = get_work_song_ids(work_id=instance.work_id)
+    update_song_search_documents(song_ids)
+    revise_library()
+    record_changes(WorkAlternativeTitle, [instance.pk], deleted=True)
+    record_changes(Work, [instance.work_id])
+    record_changes(Song, song_ids)
+
+
+@receiver(post_save, sender=WorkType, dispatch_uid="handle_work_type_saved")
+def handle_work_type_saved(sender, instance, created, **kwargs):
+    """Update the parser and the works and songs of a modified work type."""
+    revise_parser()
+    revise_library()
+    record_changes(WorkType, [instance.pk])
+
+    if created:
+        return
+
+    works = list(Work.objects.filter(work_type=instance))
+    index_texts(Work, works)
+    index_texts(
+        WorkAlternativeTitle,
+        WorkAlternativeTitle.objects.filter(work__work_type=instance),
+    )
+    song_ids = get_work_song_ids(work__work_type=instance)
+    update_song_search_documents(song_ids)
+    record_changes(Work, [work.pk for work in works])
+    record_changes(Song, song_ids)
+
+
+@receiver(post_delete, sender=WorkType, dispatch_uid="handle_work_type_deleted")
+def handle_work_type_deleted(sender, instance, **kwargs):
+    """Update the parser when a work type is deleted."""
+    revise_parser()
+    revise_library()
+    record_changes(WorkType, [instance.pk], deleted=True)
+
+
+connection_created_once = Event()
+
+
+@receiver(connection_created, dispatch_uid="handle_library_connection_created")
+def handle_connection_created(connection, **kwargs):
+    """Resume the import jobs as soon as the database is ready."""
+    # make sure this code is called only once
+    if connection_created_once.is_set():
+        return
+
+    connection_created_once.set()
+
+    # not called by the reloader
+    if is_reloader():
+        return
+
+    from library.jobs import resume_import_jobs_on_app_ready
+
+    resume_import_jobs_on_app_ready()
@@ -0,0 +1,175 @@
+import hashlib
+import json
+from collections import Counter
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef, Q, Subquery
+
+from library.models import ManifestEntry, Song
+from library.search_cache import get_library_revision
+
+MANIFEST_DIGEST_KEY = "library.manifest.{revision}"
+MANIFEST_DIGEST_TIMEOUT = 3600
+BATCH_SIZE = 500
+
+
+def get_manifest_digest(entries):
+    """Give the digest of a manifest.
+
+    Args:
+        entries (iterable of tuple): Directory, file name and fingerprint of
+            each file.
+
+    Returns:
+        str: Digest, which does not depend on the order of the entries.
+    """
+    return hashlib.sha1(json.dumps(sorted(entries)).encode()).hexdigest()
+
+
+def diff_manifest(entries):
+    """Compare the files of the feeder with the songs of the library.
+
+    Songs are matched to files by directory and file name. A song which
+    fingerprint differs from the one of its file has changed, which is the
+    case of songs created before fingerprints were given. A song which file
+    is missing and a file with no song are a moved song if they are the only
+    ones with the same non-empty fingerprint.
+
+    The files are staged as manifest entries in a transaction which is
+    rolled back, and are matched with the songs by the database on their
+    location index, so that only the songs and files which differ are
+    fetched.
+
+    The digest of a manifest matching the library is cached for the current
+    revision of the library, so that an unchanged manifest is detected
+    without querying the database.
+
+    Args:
+        entries (list of tuple): Directory, file name and fingerprint of each
+            file of the feeder.
+
+    Returns:
+        dict: Files of the feeder with no song under `added`, songs with no
+        file under `removed`, songs which file changed under `changed` and
+        songs which file moved under `moved`.
+    """
+    files = {
+        (directory, filename): fingerprint
+        for directory, filename, fingerprint in entries
+    }
+    diff = {"added": [], "removed": [], "changed": [], "moved": []}
+
+    key = MANIFEST_DIGEST_KEY.format(revision=get_library_revision())
+    digest = get_manifest_digest(
+        [
+            (directory, filename, fingerprint)
+            for (directory, filename), fingerprint in files.items()
+        ]
+    )
+    if cache.get(key) == digest:
+        return diff
+
+    with transaction.atomic():
+        ManifestEntry.objects.bulk_create(
+            (
+                ManifestEntry(
+                    directory=directory, filename=filename, fingerprint=fingerprint
+                )
+                for (directory, filename), fingerprint in files.items()
+            ),
+            batch_size=BATCH_SIZE,
+        )
+
+        # only the first song of a location is matched to its file
+        file_fingerprint = Subquery(
+            ManifestEntry.objects.filter(
+                directory=OuterRef("directory"), filename=OuterRef("filename")
+            ).values("fingerprint")[:1]
+        )
+        song_first = ~Exists(
+            Song.objects.filter(
+                directory=OuterRef("directory"),
+                filename=OuterRef("filename"),
+                pk__lt=OuterRef("pk"),
+            )
+        )
+        songs = Song.objects.annotate(
+            file_fingerprint=file_fingerprint, first=song_first
+        ).order_by("pk")
+
+        songs_changed = list(
+            songs.filter(file_fingerprint__isnull=False, first=True)
+            .exclude(fingerprint=F("file_fingerprint"))
+            .values_list("pk", "directory", "filename", "file_fingerprint")
+        )
+        songs_missing = list(
+            songs.filter(Q(file_fingerprint__isnull=True) | Q(first=False)).values_list(
+                "pk", "directory", "filename", "fingerprint"
+            )
+        )
+        files_added = list(
+            ManifestEntry.objects.filter(
+                ~Exists(
+                    Song.objects.filter(
+                        directory=OuterRef("directory"), filename=OuterRef("filename")
+                    )
+                )
+            )
+            .order_by("pk")
+            .values_list("directory", "filename", "fingerprint")
+        )
+
+        transaction.set_rollback(True)
+
+    for pk, directory, filename, fingerprint in songs_changed:
+        diff["changed"].append(
+            {
+                "id": pk,
+                "directory": directory,
+                "filename": filename,
+                "fingerprint": fingerprint,
+            }
+        )
+
+    # a song and a file are matched by fingerprint if no other has it
+    fingerprints_missing = Counter(fingerprint for *_, fingerprint in songs_missing)
+    fingerprints_added = Counter(fingerprint for *_, fingerprint in files_added)
+    songs_moved = {
+        fingerprint: pk
+        for pk, _, _, fingerprint in songs_missing
+        if fingerprint
+        and fingerprints_missing[fingerprint] == 1
+        and fingerprints_added[fingerprint] == 1
+    }
+
+    for pk, directory, filename, fingerprint in songs_missing:
+        if fingerprint not in songs_moved:
+            diff["removed"].append(
+                {"id": pk, "directory": directory, "filename": filename}
+            )
+
+    for directory, filename, fingerprint in files_added:
+        if fingerprint not in songs_moved:
+            diff["added"].append(
+                {
+                    "directory": directory,
+                    "filename": filename,
+                    "fingerprint": fingerprint,
+                }
+            )
+            continue
+
+        diff["moved"].append(
+            {
+                "id": songs_moved[fingerprint],
+                "directory": directory,
+                "filename": filename,
+                "fingerprint": fingerprint,
+            }
+        )
+
+    if not any(diff.values()):
+        cache.set(key, digest, MANIFEST_DIGEST_TIMEOUT)
+
+    return diff
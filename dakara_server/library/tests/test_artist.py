@@ -34,6 +34,41 @@ class ArtistListViewTestCase(LibraryAPITestCase):
         self.assertEqual(response.data["results"][0]["song_count"], 1)
         self.assertEqual(response.data["results"][1]["song_count"], 0)
 
+    def test_get_artist_list_ordering_song_count(self):
+        """Test to order artists by number of songs."""
+        # Login as simple user
+        self.authenticate(self.user)
+
+        self.song1.artists.add(self.artist2)
+        self.song2.artists.add(self.artist2)
+
+        # Get artists list
+        response = self.client.get(self.url, {"ordering": "song_count"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.check_artist_json(response.data["results"][0], self.artist2)
+        self.check_artist_json(response.data["results"][1], self.artist1)
+        self.assertEqual(response.data["results"][0]["song_count"], 2)
+        self.assertEqual(response.data["results"][1]["song_count"], 1)
+
+    def test_song_count_maintained(self):
+        """Test the number of songs follows the songs of the artist."""
+        self.song1.artists.add(self.artist1)
+        self.artist1.refresh_from_db()
+        self.assertEqual(self.artist1.song_count, 2)
+
+        self.artist1.song_set.remove(self.song2)
+        self.artist1.refresh_from_db()
+        self.assertEqual(self.artist1.song_count, 1)
+
+        self.song1.artists.clear()
+        self.artist1.refresh_from_db()
+        self.assertEqual(self.artist1.song_count, 0)
+
+        self.song2.artists.add(self.artist1)
+        self.song2.delete()
+        self.artist1.refresh_from_db()
+        self.assertEqual(self.artist1.song_count, 0)
+
     def test_get_artist_list_forbidden(self):
         """Test to verify unauthenticated user can't get artist list."""
         # Attempt to get artists list
@@ -53,6 +88,22 @@ class ArtistListViewTestCase(LibraryAPITestCase):
         # Should not return any artist
         self.artist_query_test("ork1", [])
 
+    def test_get_artist_list_with_query_normalized(self):
+        """Test artists are searched and ordered regardless of diacritics."""
+        # Login as simple user
+        self.authenticate(self.user)
+
+        artist3 = Artist.objects.create(name="Zoé")
+        artist4 = Artist.objects.create(name="Éric")
+
+        # Get artists list with query = "ERIC"
+        # Should only return artist4
+        self.artist_query_test("ERIC", [artist4])
+
+        # Get artists list
+        # Accented names are sorted along unaccented names
+        self.artist_query_test("", [self.artist1, self.artist2, artist4, artist3])
+
     def test_get_artist_list_with_query_empty(self):
         """Test to verify artist list with empty query."""
         # Login as simple user
@@ -0,0 +1,176 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+
+from library.autocomplete import get_prefix_keys
+from library.models import SearchPrefix
+from library.tests.base_test import LibraryAPITestCase
+
+UserModel = get_user_model()
+
+
+class AutocompleteViewTestCase(LibraryAPITestCase):
+    url = reverse("library-autocomplete")
+
+    def setUp(self):
+        # create a user without any rights
+        self.user = self.create_user("TestUser")
+
+        # create a manager
+        self.manager = self.create_user("TestManager", library_level=UserModel.MANAGER)
+
+        # create test data
+        self.create_test_data()
+
+    def get_suggestions(self, query, **params):
+        """Get the suggestions for a query as a list of tuples."""
+        response = self.client.get(self.url, {"query": query, **params})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        return [
+            (suggestion["kind"], suggestion["text"])
+            for suggestion in response.data["suggestions"]
+        ]
+
+    def test_get_prefix_keys(self):
+        """Test the text is indexed from each of its words."""
+        self.assertEqual(
+            get_prefix_keys("The Real Folk Blues"),
+            ["the real folk blues", "real folk blues", "folk blues", "blues"],
+        )
+
+    def test_prefixes_maintained(self):
+        """Test prefix entries follow objects."""
+        entries = SearchPrefix.objects.filter(
+            kind=SearchPrefix.WORK, object_id=self.work1.pk
+        )
+        self.assertEqual(list(entries.values_list("key", "scope")), [("work1", "wt1")])
+
+        self.wt1.query_name = "new"
+        self.wt1.save()
+        self.assertEqual(list(entries.values_list("scope", flat=True)), ["new"])
+        self.assertCountEqual(
+            SearchPrefix.objects.filter(
+                kind=SearchPrefix.ALTERNATIVE_TITLE, scope="new"
+            ).values_list("label", flat=True),
+            ["AltTitle1", "AltTitle2", "AltTitle2"],
+        )
+
+        self.work1.delete()
+        self.assertFalse(entries.exists())
+
+    def test_get_unauthenticated_failed(self):
+        """Test an unauthenticated user cannot get suggestions."""
+        response = self.client.get(self.url, {"query": "so"})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_get_texts(self):
+        """Test to complete unspecific terms."""
+        self.authenticate(self.user)
+
+        self.assertEqual(
+            self.get_suggestions("so"), [("song", "Song1"), ("song", "Song2")]
+        )
+        self.assertEqual(
+            self.get_suggestions("Al"),
+            [("work", "AltTitle1"), ("work", "AltTitle2")],
+        )
+        self.assertEqual(self.get_suggestions("so", limit=1), [("song", "Song1")])
+        self.assertEqual(self.get_suggestions("zzz"), [])
+        self.assertEqual(self.get_suggestions(""), [])
+
+        # characters of patterns are not wildcards
+        self.assertEqual(self.get_suggestions("s_ng"), [])
+        self.assertEqual(self.get_suggestions("%"), [])
+
+    def test_get_texts_prefix_index(self):
+        """Test prefixes are looked up and ordered by the prefix index."""
+        self.authenticate(self.user)
+
+        with CaptureQueriesContext(connection) as context:
+            self.get_suggestions("art")
+
+        sql = next(
+            query["sql"]
+            for query in context.captured_queries
+            if "library_searchprefix" in query["sql"]
+        )
+        with connection.cursor() as cursor:
+            cursor.execute("EXPLAIN QUERY PLAN " + sql)
+            plan = " ".join(row[-1] for row in cursor.fetchall())
+
+        self.assertIn("USING INDEX library_searchprefix_key_prefix", plan)
+        self.assertNotIn("TEMP B-TREE", plan)
+
+    def test_get_keywords(self):
+        """Test to complete keywords, including work types."""
+        self.authenticate(self.user)
+
+        self.assertEqual(
+            self.get_suggestions("ar"),
+            [("keyword", "artist:"), ("artist", "Artist1"), ("artist", "Artist2")],
+        )
+        self.assertEqual(
+            self.get_suggestions("w"),
+            [
+                ("keyword", "work:"),
+                ("keyword", "wt1:"),
+                ("keyword", "wt2:"),
+                ("work", "Work1"),
+                ("work", "Work2"),
+                ("work", "Work3"),
+            ],
+        )
+
+    def test_get_by_keyword(self):
+        """Test to complete terms of a keyword."""
+        self.authenticate(self.user)
+
+        self.assertEqual(
+            self.get_suggestions("song1 artist:art"),
+            [("artist", "Artist1"), ("artist", "Artist2")],
+        )
+        self.assertEqual(
+            self.get_suggestions('title:"so'), [("song", "Song1"), ("song", "Song2")]
+        )
+        self.assertEqual(self.get_suggestions("wt2:wor"), [("work", "Work3")])
+        self.assertEqual(self.get_suggestions("WT2:wor"), [("work", "Work3")])
+        self.assertEqual(
+            self.get_suggestions("wt1:alt"),
+            [("work", "AltTitle1"), ("work", "AltTitle2")],
+        )
+        self.assertEqual(self.get_suggestions("unknown:so"), [])
+
+    def test_get_tags(self):
+        """Test to complete tags."""
+        self.authenticate(self.user)
+
+        self.assertEqual(
+            self.get_suggestions("#t"), [("tag", "#TAG1"), ("tag", "#TAG2")]
+        )
+
+    def test_get_disabled(self):
+        """Test disabled tags and their songs are only suggested to managers."""
+        self.tag1.disabled = True
+        self.tag1.save()
+
+        self.authenticate(self.user)
+        self.assertEqual(self.get_suggestions("#t"), [("tag", "#TAG2")])
+        self.assertEqual(self.get_suggestions("so"), [("song", "Song1")])
+
+        self.authenticate(self.manager)
+        self.assertEqual(
+            self.get_suggestions("#t"), [("tag", "#TAG1"), ("tag", "#TAG2")]
+        )
+        self.assertEqual(
+            self.get_suggestions("so"), [("song", "Song1"), ("song", "Song2")]
+        )
+
+    def test_get_limit_invalid(self):
+        """Test the number of suggestions is bounded."""
+        self.authenticate(self.user)
+
+        response = self.client.get(self.url, {"query": "so", "limit": 1000})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,103 @@
+from django.test import TestCase
+
+from library.benchmark import (
+    VIEW_BENCHMARKS,
+    LegacyQueryLanguageParser,
+    benchmark_parsers,
+    benchmark_searches,
+    benchmark_synthetic_searches,
+    benchmark_views,
+    compare_reports,
+    create_synthetic_library,
+)
+from library.models import Artist, SearchLyricsToken, Song, SongTag, WorkType
+from library.query_language import QueryLanguageParser
+
+
+class BenchmarkTestCase(TestCase):
+    def test_create_synthetic_library(self):
+        """Test to create a synthetic library."""
+        create_synthetic_library(40)
+        self.assertEqual(Song.objects.count(), 40)
+        self.assertEqual(Song.objects.filter(search_document__isnull=False).count(), 40)
+        self.assertTrue(SearchLyricsToken.objects.exists())
+
+        # the data maintained by signals are computed
+        artist = Artist.objects.order_by("-song_count").first()
+        self.assertEqual(artist.song_count, artist.song_set.count())
+        self.assertGreater(artist.song_count, 0)
+
+    def test_create_synthetic_library_reproducible(self):
+        """Test the synthetic library depends only on its seed."""
+        create_synthetic_library(20, seed=1)
+        titles = list(Song.objects.order_by("pk").values_list("title", "lyrics"))
+        for model in (Song, Artist, WorkType, SongTag):
+            model.objects.all().delete()
+
+        create_synthetic_library(20, seed=1)
+        self.assertEqual(
+            list(Song.objects.order_by("pk").values_list("title", "lyrics")), titles
+        )
+
+    def test_benchmark_searches(self):
+        """Test the ways to search songs give the same songs for single terms."""
+        create_synthetic_library(40)
+
+        results = benchmark_searches("default", queries=["love", "#TAG1"], repeat=1)
+        self.assertEqual(len(results), 6)
+
+        for query in ("love", "#TAG1"):
+            with self.subTest(query=query):
+                counts = {
+                    result["count"] for result in results if result["query"] == query
+                }
+                self.assertEqual(len(counts), 1)
+
+    def test_benchmark_synthetic_searches(self):
+        """Test to compare the ways to search songs on a rolled back library."""
+        results = benchmark_synthetic_searches(40, queries=["love"], repeat=1)
+        self.assertEqual(
+            {result["search"] for result in results}, {"join", "exists", "document"}
+        )
+        self.assertEqual(len({result["count"] for result in results}), 1)
+        self.assertGreater(results[0]["count"], 0)
+
+        # the library is rolled back
+        self.assertFalse(Song.objects.exists())
+        self.assertFalse(WorkType.objects.exists())
+
+    def test_legacy_parser(self):
+        """Test the former parser gives the same result as the current one."""
+        WorkType.objects.create(name="Anime", query_name="anime")
+        query = 'love anime:angel #TAG1 artist:""star light"" summer\\ night "a b"'
+        self.assertEqual(
+            LegacyQueryLanguageParser().parse_uncached(query),
+            QueryLanguageParser().parse_uncached(query),
+        )
+
+    def test_benchmark_parsers(self):
+        """Test to compare the ways to parse queries."""
+        results = benchmark_parsers(lengths=[5, 50], repeat=1)
+        self.assertEqual(len(results), 4)
+        self.assertEqual(
+            {result["parser"] for result in results}, {"legacy", "current"}
+        )
+        self.assertLess(results[0]["characters"], results[2]["characters"])
+
+    def test_benchmark_views(self):
+        """Test to measure the views."""
+        create_synthetic_library(40)
+
+        report = benchmark_views(repeat=1)
+        self.assertEqual(report["library"]["songs"], 40)
+        self.assertEqual(len(report["results"]), len(VIEW_BENCHMARKS))
+
+        for result in report["results"]:
+            with self.subTest(view=result["view"], name=result["name"]):
+                self.assertEqual(result["status"], 200)
+                self.assertGreater(result["queries"], 0)
+
+        # a report compared to itself has no changes
+        comparison = compare_reports(report, report)
+        self.assertEqual(len(comparison), len(VIEW_BENCHMARKS))
+        self.assertEqual(comparison[0]["queries_difference"], 0)
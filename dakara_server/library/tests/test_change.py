@@ -0,0 +1,390 @@
+from unittest.mock import Mock
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+
+from internal.pagination import SincePaginationCustom
+from library.changes import CommitCallback, on_commit_once
+from library.models import LibraryChange, Song, SongWorkLink, WorkAlternativeTitle
+from library.search_cache import bump_library_revision
+from library.tests.base_test import LibraryAPITestCase
+
+UserModel = get_user_model()
+
+
+class LibraryChangeListViewTestCase(LibraryAPITestCase):
+    url = reverse("library-change-list")
+
+    def setUp(self):
+        # create a user without any rights
+        self.user = self.create_user("TestUser")
+
+        # create a manager
+        self.manager = self.create_user("TestManager", library_level=UserModel.MANAGER)
+
+        # create test data
+        self.create_test_data()
+
+        # last change before the tests
+        self.since = LibraryChange.objects.latest("seq").seq
+
+    def get_changes(self, since=None):
+        """Get the changes since the given or the last sequence number.
+
+        Returns:
+            set of tuple: Kind, ID and deletion of the changed objects.
+        """
+        response = self.client.get(
+            self.url, {"since": self.since if since is None else since}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        return {
+            (change["kind"], change["id"], change["deleted"])
+            for change in response.data["results"]
+        }
+
+    def test_get_change_list(self):
+        """Test to get all changes of the library."""
+        self.authenticate(self.user)
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.data["pagination"], {"since": self.since, "more": False}
+        )
+
+        # each object is given once
+        changes = [
+            (change["kind"], change["id"]) for change in response.data["results"]
+        ]
+        self.assertEqual(len(changes), len(set(changes)))
+        self.assertIn(("song", self.song1.pk), changes)
+        self.assertIn(("song", self.song2.pk), changes)
+        self.assertIn(("artist", self.artist1.pk), changes)
+        self.assertIn(("work", self.work1.pk), changes)
+        self.assertIn(("work_type", self.wt1.pk), changes)
+        self.assertIn(("song_tag", self.tag1.pk), changes)
+        self.assertIn(
+            ("work_alternative_title", WorkAlternativeTitle.objects.first().pk),
+            changes,
+        )
+
+        # changes are sorted
+        seqs = [change["seq"] for change in response.data["results"]]
+        self.assertEqual(seqs, sorted(seqs))
+
+    def test_get_change_list_empty(self):
+        """Test to get changes when nothing changed."""
+        self.authenticate(self.user)
+
+        response = self.client.get(self.url, {"since": self.since})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.data,
+            {"pagination": {"since": self.since, "more": False}, "results": []},
+        )
+
+    def test_get_change_list_forbidden(self):
+        """Test an unauthenticated user cannot get changes."""
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_get_change_list_invalid_since(self):
+        """Test to get changes with an invalid sequence number."""
+        self.authenticate(self.user)
+
+        for since in ("a", "-1"):
+            response = self.client.get(self.url, {"since": since})
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_get_change_list_paginated(self):
+        """Test to get changes page by page."""
+        self.authenticate(self.user)
+        page_size = SincePaginationCustom.page_size
+        SincePaginationCustom.page_size = 4
+
+        try:
+            seqs = []
+            since = 0
+            more = True
+            while more:
+                response = self.client.get(self.url, {"since": since})
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                self.assertLessEqual(len(response.data["results"]), 4)
+                seqs.extend(change["seq"] for change in response.data["results"])
+                since = response.data["pagination"]["since"]
+                more = response.data["pagination"]["more"]
+
+        finally:
+            SincePaginationCustom.page_size = page_size
+
+        self.assertEqual(
+            seqs,
+            list(LibraryChange.objects.order_by("seq").values_list("seq", flat=True)),
+        )
+        self.assertEqual(since, self.since)
+
+    def test_change_song(self):
+        """Test a modified song is changed once."""
+        self.authenticate(self.user)
+
+        self.song1.title = "Song1 modified"
+        self.song1.save()
+        self.song1.save()
+
+        self.assertEqual(self.get_changes(), {("song", self.song1.pk, False)})
+        self.assertEqual(
+            LibraryChange.objects.filter(
+                kind=LibraryChange.SONG, object_id=self.song1.pk
+            ).count(),
+            1,
+        )
+
+    def test_change_song_deleted(self):
+        """Test a deleted song is given with the objects counting it."""
+        self.authenticate(self.user)
+
+        song_pk = self.song2.pk
+        self.song2.delete()
+
+        self.assertEqual(
+            self.get_changes(),
+            {
+                ("song", song_pk, True),
+                ("artist", self.artist1.pk, False),
+                ("work", self.work1.pk, False),
+                ("song_tag", self.tag1.pk, False),
+            },
+        )
+
+    def test_change_song_recreated(self):
+        """Test a deleted object created again is not deleted anymore."""
+        self.authenticate(self.user)
+
+        pk = self.song1.pk
+        self.song1.delete()
+        Song(pk=pk, title="Song1", filename="file.mp4").save()
+
+        self.assertEqual(self.get_changes(), {("song", pk, False)})
+
+    def test_change_song_relations(self):
+        """Test songs are changed when their artists or tags change."""
+        self.authenticate(self.user)
+
+        self.song1.artists.add(self.artist2)
+        self.assertEqual(
+            self.get_changes(),
+            {("song", self.song1.pk, False), ("artist", self.artist2.pk, False)},
+        )
+
+        self.since = LibraryChange.objects.latest("seq").seq
+        self.tag1.song_set.clear()
+        self.assertEqual(
+            self.get_changes(),
+            {("song", self.song2.pk, False), ("song_tag", self.tag1.pk, False)},
+        )
+
+        self.since = LibraryChange.objects.latest("seq").seq
+        SongWorkLink(song=self.song1, work=self.work2).save()
+        self.assertEqual(
+            self.get_changes(),
+            {("song", self.song1.pk, False), ("work", self.work2.pk, False)},
+        )
+
+    def test_change_recorded_in_transaction(self):
+        """Test changes are committed or rolled back with the objects."""
+        self.authenticate(self.user)
+
+        with transaction.atomic():
+            song = Song.objects.create(title="Song3", filename="file.mp4")
+            song.artists.add(self.artist1)
+
+            # changes are written with the objects
+            self.assertTrue(
+                LibraryChange.objects.filter(
+                    kind=LibraryChange.SONG, object_id=song.pk
+                ).exists()
+            )
+
+            transaction.set_rollback(True)
+
+        self.assertEqual(self.get_changes(), set())
+
+        with transaction.atomic():
+            song = Song.objects.create(title="Song3", filename="file.mp4")
+            song.artists.add(self.artist1)
+            song.tags.add(self.tag1)
+            SongWorkLink(song=song, work=self.work1).save()
+
+        self.assertEqual(
+            self.get_changes(),
+            {
+                ("song", song.pk, False),
+                ("artist", self.artist1.pk, False),
+                ("song_tag", self.tag1.pk, False),
+                ("work", self.work1.pk, False),
+            },
+        )
+
+    def test_change_rolled_back(self):
+        """Test changes of a rolled back transaction are not recorded."""
+        self.authenticate(self.user)
+
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                self.song1.title = "Song1 modified"
+                self.song1.save()
+                raise RuntimeError
+
+        self.song2.title = "Song2 modified"
+        self.song2.save()
+
+        self.assertEqual(self.get_changes(), {("song", self.song2.pk, False)})
+
+    def test_change_artist(self):
+        """Test the songs of a modified or deleted artist are changed."""
+        self.authenticate(self.user)
+
+        self.artist1.name = "Artist1 modified"
+        self.artist1.save()
+        self.assertEqual(
+            self.get_changes(),
+            {("artist", self.artist1.pk, False), ("song", self.song2.pk, False)},
+        )
+
+        self.since = LibraryChange.objects.latest("seq").seq
+        artist_pk = self.artist1.pk
+        self.artist1.delete()
+        self.assertEqual(
+            self.get_changes(),
+            {("artist", artist_pk, True), ("song", self.song2.pk, False)},
+        )
+
+    def test_change_work_alternative_title(self):
+        """Test the work and songs of an alternative title are changed."""
+        self.authenticate(self.user)
+
+        alternative_title = WorkAlternativeTitle.objects.create(
+            title="AltTitle3", work=self.work1
+        )
+        alternative_title_pk = alternative_title.pk
+        alternative_title.delete()
+
+        self.assertEqual(
+            self.get_changes(),
+            {
+                ("work_alternative_title", alternative_title_pk, True),
+                ("work", self.work1.pk, False),
+                ("song", self.song2.pk, False),
+            },
+        )
+
+    def test_change_work_type(self):
+        """Test the works and songs of a modified work type are changed."""
+        self.authenticate(self.user)
+
+        self.wt1.name = "WorkType1 modified"
+        self.wt1.save()
+
+        self.assertEqual(
+            self.get_changes(),
+            {
+                ("work_type", self.wt1.pk, False),
+                ("work", self.work1.pk, False),
+                ("work", self.work2.pk, False),
+                ("song", self.song2.pk, False),
+            },
+        )
+
+    def test_change_songs_created_in_bulk(self):
+        """Test songs created in bulk are changed with their objects."""
+        self.authenticate(self.manager)
+
+        response = self.client.post(
+            reverse("library-song-list"),
+            [
+                {
+                    "title": "Song3",
+                    "filename": "song3",
+                    "directory": "directory",
+                    "duration": 0,
+                    "artists": [{"name": self.artist1.name}],
+                    "tags": [{"name": "TAG3"}],
+                    "works": [
+                        {
+                            "work": {
+                                "title": "Work4",
+                                "work_type": {"query_name": "wt3"},
+                            },
+                            "link_type": "OP",
+                        }
+                    ],
+                }
+            ],
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        song = Song.objects.get(title="Song3")
+        work = song.works.get()
+        self.assertEqual(
+            self.get_changes(),
+            {
+                ("song", song.pk, False),
+                ("artist", self.artist1.pk, False),
+                ("song_tag", song.tags.get().pk, False),
+                ("work", work.pk, False),
+                ("work_type", work.work_type_id, False),
+            },
+        )
+
+
+class OnCommitOnceTestCase(TestCase):
+    def test_on_commit_once(self):
+        """Test a function is registered once per transaction."""
+        function = Mock()
+        with self.captureOnCommitCallbacks() as callbacks:
+            on_commit_once(function)
+            on_commit_once(function)
+
+        self.assertEqual(len(callbacks), 1)
+        callbacks[0]()
+        function.assert_called_once_with()
+
+        # the function is registered again once run
+        with self.captureOnCommitCallbacks() as callbacks:
+            on_commit_once(function)
+
+        self.assertEqual(len(callbacks), 1)
+
+    def test_on_commit_once_rolled_back(self):
+        """Test a function is registered again if its savepoint is rolled back."""
+        function = Mock()
+        with self.captureOnCommitCallbacks() as callbacks:
+            with transaction.atomic():
+                on_commit_once(function)
+                transaction.set_rollback(True)
+
+            on_commit_once(function)
+            on_commit_once(function)
+
+        self.assertEqual(len(callbacks), 1)
+
+    def test_library_revised_once(self):
+        """Test the revision of the library is bumped once per transaction."""
+        with self.captureOnCommitCallbacks() as callbacks:
+            song = Song.objects.create(title="Song1", filename="file.mp4")
+            song.artists.create(name="Artist1")
+            song.tags.create(name="TAG1")
+
+        self.assertEqual(
+            [
+                callback.function
+                for callback in callbacks
+                if isinstance(callback, CommitCallback)
+            ],
+            [bump_library_revision],
+        )
@@ -1,7 +1,12 @@
+import json
+
 from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework import status
 
+from library.models import ManifestEntry, Song
 from library.tests.base_test import LibraryAPITestCase
 
 UserModel = get_user_model()
@@ -47,6 +52,43 @@ class SongFeederListViewTestCase(LibraryAPITestCase):
             ],
         )
 
+    def test_get_feeder_song_list_stream(self):
+        """Test to stream feeder song list as newline-delimited JSON."""
+        # Login as manager
+        self.authenticate(self.manager)
+
+        # Get songs list
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(self.url, HTTP_ACCEPT="application/x-ndjson")
+            content = b"".join(response.streaming_content).decode()
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        self.assertCountEqual(
+            [json.loads(line) for line in content.splitlines()],
+            [
+                {
+                    "id": self.song1.pk,
+                    "filename": self.song1.filename,
+                    "directory": self.song1.directory,
+                },
+                {
+                    "id": self.song2.pk,
+                    "filename": self.song2.filename,
+                    "directory": self.song2.directory,
+                },
+            ],
+        )
+
+        # songs are fetched as rows of the columns they give
+        queries = [
+            query["sql"]
+            for query in context.captured_queries
+            if "library_song" in query["sql"]
+        ]
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('"library_song"."title"', queries[0])
+
     def test_get_song_list_forbidden(self):
         """Test that normal user cannot have feeder song list."""
         # Login as simple user
@@ -105,6 +147,44 @@ class WorkFeederListViewTestCase(LibraryAPITestCase):
             ],
         )
 
+    def test_get_feeder_work_list_columns(self):
+        """Test feeder work list only fetches the columns it gives."""
+        # Login as manager
+        self.authenticate(self.manager)
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        queries = [
+            query["sql"]
+            for query in context.captured_queries
+            if "library_work" in query["sql"]
+        ]
+        self.assertEqual(len(queries), 1)
+        self.assertIn('"library_worktype"."query_name"', queries[0])
+        self.assertNotIn('"library_work"."song_count"', queries[0])
+
+    def test_get_feeder_work_list_stream(self):
+        """Test to stream feeder work list with the format in query string."""
+        # Login as manager
+        self.authenticate(self.manager)
+
+        # Get works list
+        response = self.client.get(self.url, {"format": "ndjson"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 3)
+        self.assertIn(
+            {
+                "id": self.work3.pk,
+                "title": self.work3.title,
+                "subtitle": "",
+                "work_type": {"query_name": self.wt2.query_name},
+            },
+            [json.loads(line) for line in lines],
+        )
+
     def test_get_work_list_forbidden(self):
         """Test that normal user cannot have feeder work list."""
         # Login as simple user
@@ -113,3 +193,183 @@ class WorkFeederListViewTestCase(LibraryAPITestCase):
         # Attempte to get songs list
         response = self.client.get(self.url)
         self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class SongSyncViewTestCase(LibraryAPITestCase):
+    url = reverse("library-song-sync")
+
+    def setUp(self):
+        # create a user without any rights
+        self.user = self.create_user("TestUser")
+
+        # create a manager
+        self.manager = self.create_user("TestManager", library_level=UserModel.MANAGER)
+
+        # create test data
+        self.create_test_data()
+
+        # give fingerprints to songs
+        self.song1.fingerprint = "fingerprint1"
+        self.song1.save()
+        self.song2.fingerprint = "fingerprint2"
+        self.song2.save()
+
+        self.manifest = [
+            [self.song1.directory, self.song1.filename, "fingerprint1"],
+            [self.song2.directory, self.song2.filename, "fingerprint2"],
+        ]
+
+    def test_post_sync(self):
+        """Test to get the differences between the files and the songs."""
+        # Login as manager
+        self.authenticate(self.manager)
+
+        # create songs to move and to remove
+        song3 = Song.objects.create(
+            title="Song3", filename="old.mp4", directory="dir", fingerprint="f3"
+        )
+        song4 = Song.objects.create(
+            title="Song4", filename="gone.mp4", directory="dir", fingerprint="f4"
+        )
+
+        # post the manifest
+        response = self.client.post(
+            self.url,
+            {
+                "manifest": [
+                    self.manifest[0],
+                    [self.song2.directory, self.song2.filename, "fingerprint2bis"],
+                    ["dir", "new.mp4", "f3"],
+                    ["dir", "added.mp4", "f5"],
+                ]
+            },
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertDictEqual(
+            response.data,
+            {
+                "added": [
+                    {"directory": "dir", "filename": "added.mp4", "fingerprint": "f5"}
+                ],
+                "removed": [
+                    {"id": song4.pk, "directory": "dir", "filename": "gone.mp4"}
+                ],
+                "changed": [
+                    {
+                        "id": self.song2.pk,
+                        "directory": self.song2.directory,
+                        "filename": self.song2.filename,
+                        "fingerprint": "fingerprint2bis",
+                    }
+                ],
+                "moved": [
+                    {
+                        "id": song3.pk,
+                        "directory": "dir",
+                        "filename": "new.mp4",
+                        "fingerprint": "f3",
+                    }
+                ],
+            },
+        )
+
+    def test_post_sync_ambiguous_move(self):
+        """Test files with the same fingerprint are not considered moved."""
+        # Login as manager
+        self.authenticate(self.manager)
+
+        song3 = Song.objects.create(
+            title="Song3", filename="old.mp4", directory="dir", fingerprint="f3"
+        )
+
+        # post the manifest
+        response = self.client.post(
+            self.url,
+            {
+                "manifest": [
+                    *self.manifest,
+                    ["dir", "new1.mp4", "f3"],
+                    ["dir", "new2.mp4", "f3"],
+                ]
+            },
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data["added"]), 2)
+        self.assertEqual(response.data["removed"][0]["id"], song3.pk)
+        self.assertEqual(response.data["moved"], [])
+
+    def test_post_sync_duplicate(self):
+        """Test only the first song of a location is matched to its file."""
+        # Login as manager
+        self.authenticate(self.manager)
+
+        song3 = Song.objects.create(
+            title="Song3",
+            filename=self.song1.filename,
+            directory=self.song1.directory,
+            fingerprint="fingerprint1",
+        )
+
+        # post the manifest
+        response = self.client.post(self.url, {"manifest": self.manifest})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertListEqual(
+            response.data["removed"],
+            [
+                {
+                    "id": song3.pk,
+                    "directory": self.song1.directory,
+                    "filename": self.song1.filename,
+                }
+            ],
+        )
+        self.assertListEqual(response.data["changed"], [])
+
+        # the manifest is not kept
+        self.assertFalse(ManifestEntry.objects.exists())
+
+    def test_post_sync_unchanged(self):
+        """Test an unchanged manifest is detected without fetching songs."""
+        # Login as manager
+        self.authenticate(self.manager)
+
+        empty = {"added": [], "removed": [], "changed": [], "moved": []}
+
+        response = self.client.post(self.url, {"manifest": self.manifest})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertDictEqual(response.data, empty)
+
+        # post the manifest again, in another order
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.post(
+                self.url, {"manifest": list(reversed(self.manifest))}
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertDictEqual(response.data, empty)
+        for query in context.captured_queries:
+            self.assertNotIn("library_song", query["sql"])
+
+        # the songs are fetched again when the library changes
+        self.song1.fingerprint = "fingerprint1bis"
+        self.song1.save()
+
+        response = self.client.post(self.url, {"manifest": self.manifest})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["changed"][0]["id"], self.song1.pk)
+
+    def test_post_sync_invalid(self):
+        """Test a malformed manifest is rejected."""
+        # Login as manager
+        self.authenticate(self.manager)
+
+        response = self.client.post(self.url, {"manifest": [["directory", "filename"]]})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_post_sync_forbidden(self):
+        """Test that normal user cannot post a manifest."""
+        # Login as simple user
+        self.authenticate(self.user)
+
+        response = self.client.post(self.url, {"manifest": self.manifest})
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
@@ -0,0 +1,160 @@
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+
+from library.fuzzy import FuzzySearch, get_trigrams, update_trigrams
+from library.models import Artist, SearchTrigram, WorkAlternativeTitle
+from library.tests.base_test import LibraryAPITestCase, LibraryProvider
+
+
+class TrigramTestCase(TestCase, LibraryProvider):
+    def setUp(self):
+        # create test data
+        self.create_test_data()
+
+    def test_get_trigrams(self):
+        """Test to extract trigrams as pg_trgm does."""
+        self.assertEqual(get_trigrams("Cat"), {"  c", " ca", "cat", "at "})
+        self.assertEqual(get_trigrams("a-B"), {"  a", " a ", "  b", " b "})
+        self.assertEqual(get_trigrams("!"), set())
+
+    def test_trigrams_maintained(self):
+        """Test trigrams are created, updated and deleted with objects."""
+        trigrams = SearchTrigram.objects.filter(
+            kind=SearchTrigram.ARTIST, object_id=self.artist1.pk
+        )
+        self.assertCountEqual(
+            trigrams.values_list("trigram", flat=True), get_trigrams("Artist1")
+        )
+        self.assertEqual(trigrams.first().total, len(get_trigrams("Artist1")))
+
+        self.artist1.name = "Renamed"
+        self.artist1.save()
+        self.assertCountEqual(
+            trigrams.values_list("trigram", flat=True), get_trigrams("Renamed")
+        )
+
+        self.artist1.delete()
+        self.assertFalse(trigrams.exists())
+
+        alternative_title = WorkAlternativeTitle.objects.filter(work=self.work1).first()
+        self.assertTrue(
+            SearchTrigram.objects.filter(
+                kind=SearchTrigram.ALTERNATIVE_TITLE, object_id=alternative_title.pk
+            ).exists()
+        )
+
+
+class FuzzySearchTestCase(LibraryAPITestCase):
+    def setUp(self):
+        # create a user without any rights
+        self.user = self.create_user("TestUser")
+
+        # create test data
+        self.create_test_data()
+
+        # give meaningful names
+        self.artist1.name = "Yoko Kanno"
+        self.artist1.save()
+        self.work1.title = "Cowboy Bebop"
+        self.work1.save()
+        self.song1.title = "Tank!"
+        self.song1.save()
+
+    def test_song_fuzzy(self):
+        """Test to search songs with typos."""
+        self.authenticate(self.user)
+        url = reverse("library-song-list")
+
+        # exact search finds nothing
+        response = self.client.get(url, {"query": "kowboy bebob"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["count"], 0)
+
+        # fuzzy search finds the song of the work
+        response = self.client.get(url, {"query": "kowboy bebob", "fuzzy": "1"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["count"], 1)
+        self.check_song_json(response.data["results"][0], self.song2)
+        self.assertEqual(response.data["query"]["remaining"], ["kowboy", "bebob"])
+
+        # fuzzy search on song title and artist
+        response = self.client.get(url, {"query": "tenk", "fuzzy": "1"})
+        self.assertEqual(response.data["count"], 0)
+        response = self.client.get(url, {"query": "tank", "fuzzy": "1"})
+        self.check_song_json(response.data["results"][0], self.song1)
+        response = self.client.get(url, {"query": "yoko kano", "fuzzy": "1"})
+        self.assertEqual(response.data["count"], 1)
+        self.check_song_json(response.data["results"][0], self.song2)
+
+        # other terms are still matched exactly
+        response = self.client.get(url, {"query": "kowboy bebob #TAG2", "fuzzy": "1"})
+        self.assertEqual(response.data["count"], 0)
+
+    def test_song_fuzzy_ranked(self):
+        """Test songs are ordered by similarity."""
+        self.authenticate(self.user)
+        url = reverse("library-song-list")
+
+        self.song1.title = "Cowboy"
+        self.song1.save()
+
+        response = self.client.get(url, {"query": "cowboy bebop", "fuzzy": "1"})
+        self.assertEqual(response.data["count"], 2)
+        self.check_song_json(response.data["results"][0], self.song2)
+        self.check_song_json(response.data["results"][1], self.song1)
+        self.assertGreater(
+            response.data["scores"][self.song2.id],
+            response.data["scores"][self.song1.id],
+        )
+
+    def test_artist_fuzzy(self):
+        """Test to search artists with typos."""
+        self.authenticate(self.user)
+        url = reverse("library-artist-list")
+
+        response = self.client.get(url, {"query": "yoko kano", "fuzzy": "1"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["count"], 1)
+        self.check_artist_json(response.data["results"][0], self.artist1)
+
+    def test_similarities_frequent_trigrams(self):
+        """Test to find an object among many sharing its trigrams."""
+        artist = Artist.objects.create(name="Yoko Kawai")
+        search = FuzzySearch(connection.alias)
+
+        similarities = search.get_similarities(SearchTrigram.ARTIST, "yoko kano")
+        self.assertCountEqual(similarities, [self.artist1.pk, artist.pk])
+        self.assertEqual(search.get_similarities(SearchTrigram.ARTIST, "xyz"), {})
+
+        # the searched title is hidden among titles containing all its
+        # trigrams, created before it
+        objects = [
+            (object_id, "Love Story {}".format(object_id))
+            for object_id in range(1, 1201)
+        ] + [(1201, "Love Story")]
+        update_trigrams(SearchTrigram.SONG, objects)
+
+        similarities = search.get_similarities(SearchTrigram.SONG, "love story")
+        self.assertEqual(len(similarities), search.limit)
+        self.assertEqual(next(iter(similarities.items())), (1201, 1.0))
+
+        # objects as similar are given by ID
+        self.assertListEqual(
+            list(similarities.items()),
+            sorted(similarities.items(), key=lambda item: (-item[1], item[0])),
+        )
+
+    def test_work_fuzzy(self):
+        """Test to search works with typos, including alternative titles."""
+        self.authenticate(self.user)
+        url = reverse("library-work-list")
+
+        response = self.client.get(url, {"query": "cowboy bebob", "fuzzy": "1"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["count"], 1)
+        self.check_work_json(response.data["results"][0], self.work1)
+
+        response = self.client.get(url, {"query": "alttitl2", "fuzzy": "1"})
+        self.assertEqual(response.data["count"], 2)
@@ -0,0 +1,307 @@
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+
+from library.jobs import (
+    IMPORT_JOB_LEASE,
+    IMPORT_REQUEUE_JOB_NAME,
+    WORKER_ID,
+    create_import_job,
+    process_import_job,
+    requeue_import_jobs,
+    resume_import_jobs_on_app_ready,
+    run_import_job,
+    run_requeue_import_jobs,
+)
+from library.models import ImportJob, Song, Work
+from library.search import chunks
+from library.tests.base_test import LibraryAPITestCase
+
+UserModel = get_user_model()
+
+
+def get_scheduled_job_ids(mocked_scheduler):
+    """Give the IDs of the jobs scheduled to be processed.
+
+    Args:
+        mocked_scheduler (unittest.mock.MagicMock): Mocked scheduler.
+
+    Returns:
+        list of int: IDs of the jobs.
+    """
+    return [
+        call.kwargs["args"][0]
+        for call in mocked_scheduler.add_job.call_args_list
+        if call.args == (run_import_job,)
+    ]
+
+
+@patch("library.jobs.scheduler")
+class ImportJobCreateViewTestCase(LibraryAPITestCase):
+    url_songs = reverse("library-song-import")
+    url_works = reverse("library-work-import")
+
+    def setUp(self):
+        # create a user without any rights
+        self.user = self.create_user("TestUser")
+
+        # create a manager
+        self.manager = self.create_user("TestManager", library_level=UserModel.MANAGER)
+
+    def test_post_song_import(self, mocked_scheduler):
+        """Test to create an import job for songs."""
+        # login as manager
+        self.authenticate(self.manager)
+
+        # create the job
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                self.url_songs,
+                [
+                    {"title": "Song1", "filename": "song1", "duration": 0},
+                    {"title": "Song2", "filename": "song2", "duration": 0},
+                ],
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        job = ImportJob.objects.get()
+        self.assertEqual(response.data["id"], job.pk)
+        self.assertEqual(response.data["kind"], "song")
+        self.assertEqual(response.data["status"], "queued")
+        self.assertEqual(response.data["total"], 2)
+        self.assertEqual(response.data["processed"], 0)
+        self.assertIsNone(response.data["throughput"])
+
+        # check the job is scheduled and no song is created yet
+        mocked_scheduler.add_job.assert_called_once()
+        self.assertEqual(mocked_scheduler.add_job.call_args.args, (run_import_job,))
+        self.assertEqual(mocked_scheduler.add_job.call_args.kwargs["args"], [job.pk])
+        self.assertFalse(Song.objects.exists())
+
+    def test_post_work_import(self, mocked_scheduler):
+        """Test to create an import job for works."""
+        # login as manager
+        self.authenticate(self.manager)
+
+        # create the job
+        response = self.client.post(
+            self.url_works, [{"title": "Work1", "work_type": {"query_name": "wt1"}}]
+        )
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data["kind"], "work")
+        self.assertEqual(ImportJob.objects.get().kind, ImportJob.WORK)
+
+    def test_post_import_invalid(self, mocked_scheduler):
+        """Test to create an import job with a payload which is not a list."""
+        # login as manager
+        self.authenticate(self.manager)
+
+        for payload in ([], {"title": "Song1"}, ["Song1"]):
+            response = self.client.post(self.url_songs, payload, format="json")
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        self.assertFalse(ImportJob.objects.exists())
+
+    def test_post_import_forbidden(self, mocked_scheduler):
+        """Test a user who is not a manager cannot create an import job."""
+        # login as simple user
+        self.authenticate(self.user)
+
+        response = self.client.post(
+            self.url_songs, [{"title": "Song1", "filename": "song1", "duration": 0}]
+        )
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertFalse(ImportJob.objects.exists())
+
+
+class ImportJobViewTestCase(LibraryAPITestCase):
+    def setUp(self):
+        # create a user without any rights
+        self.user = self.create_user("TestUser")
+
+        # create a manager
+        self.manager = self.create_user("TestManager", library_level=UserModel.MANAGER)
+
+        # create a job
+        self.job = create_import_job(
+            ImportJob.SONG, [{"title": "Song1", "filename": "song1", "duration": 0}]
+        )
+        process_import_job(self.job.pk)
+        self.url = reverse("library-import-job", kwargs={"pk": self.job.pk})
+
+    def test_get_import_job(self):
+        """Test to get the progress of an import job."""
+        # login as manager
+        self.authenticate(self.manager)
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["status"], "done")
+        self.assertEqual(response.data["total"], 1)
+        self.assertEqual(response.data["processed"], 1)
+        self.assertIsNone(response.data["errors"])
+        self.assertIsNotNone(response.data["date_finished"])
+        self.assertIsInstance(response.data["throughput"], float)
+
+    def test_get_import_job_forbidden(self):
+        """Test a user who is not a manager cannot get an import job."""
+        # login as simple user
+        self.authenticate(self.user)
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+@patch("library.jobs.IMPORT_BATCH_SIZE", 2)
+class ProcessImportJobTestCase(LibraryAPITestCase):
+    def setUp(self):
+        self.songs = [
+            {
+                "title": f"Song{index}",
+                "filename": f"song{index}",
+                "duration": 0,
+                "artists": [{"name": "Artist1"}],
+            }
+            for index in range(5)
+        ]
+
+    def test_process_songs(self):
+        """Test to create the songs of a job in batches."""
+        job = create_import_job(ImportJob.SONG, self.songs)
+        process_import_job(job.pk)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, ImportJob.DONE)
+        self.assertEqual(job.processed, 5)
+        self.assertEqual(job.payload, [])
+        self.assertIsNotNone(job.date_started)
+        self.assertIsNotNone(job.date_finished)
+
+        self.assertEqual(Song.objects.count(), 5)
+        self.assertEqual(Song.objects.filter(artists__name="Artist1").count(), 5)
+
+    def test_process_works(self):
+        """Test to create the works of a job."""
+        job = create_import_job(
+            ImportJob.WORK,
+            [
+                {
+                    "title": "Work1",
+                    "alternative_titles": [{"title": "AltTitle1"}],
+                    "work_type": {"query_name": "wt1"},
+                },
+                {"title": "Work2", "work_type": {"query_name": "wt1"}},
+            ],
+        )
+        process_import_job(job.pk)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, ImportJob.DONE)
+        self.assertEqual(job.processed, 2)
+        self.assertEqual(Work.objects.count(), 2)
+        self.assertEqual(Work.objects.get(title="Work1").alternative_titles.count(), 1)
+
+    def test_process_invalid(self):
+        """Test a job fails on an invalid batch and keeps previous batches."""
+        self.songs[3] = {"title": "Song3"}
+        job = create_import_job(ImportJob.SONG, self.songs)
+        process_import_job(job.pk)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, ImportJob.FAILED)
+        self.assertEqual(job.processed, 2)
+        self.assertEqual(len(job.errors), 1)
+        self.assertEqual(job.errors[0]["index"], 3)
+        self.assertIn("filename", job.errors[0]["errors"])
+        self.assertEqual(Song.objects.count(), 2)
+
+    def test_process_not_queued(self):
+        """Test a job which is not queued is not processed again."""
+        job = create_import_job(ImportJob.SONG, self.songs)
+        ImportJob.objects.filter(pk=job.pk).update(status=ImportJob.RUNNING)
+        process_import_job(job.pk)
+
+        self.assertFalse(Song.objects.exists())
+
+    def test_process_given_to_other_worker(self):
+        """Test a job given to another worker is left to it."""
+
+        def chunks_requeued(*args, **kwargs):
+            # the job is given to another worker meanwhile
+            ImportJob.objects.update(worker="other")
+            yield from chunks(*args, **kwargs)
+
+        job = create_import_job(ImportJob.SONG, self.songs)
+        with patch("library.jobs.chunks", chunks_requeued):
+            process_import_job(job.pk)
+
+        # the batch is not created and the job is not finished
+        job.refresh_from_db()
+        self.assertEqual(job.status, ImportJob.RUNNING)
+        self.assertEqual(job.worker, "other")
+        self.assertEqual(job.processed, 0)
+        self.assertIsNone(job.date_finished)
+        self.assertFalse(Song.objects.exists())
+
+    @patch("library.jobs.scheduler")
+    def test_resume(self, mocked_scheduler):
+        """Test an interrupted job is resumed after its last batch."""
+        job = create_import_job(ImportJob.SONG, self.songs)
+        ImportJob.objects.filter(pk=job.pk).update(
+            status=ImportJob.RUNNING,
+            processed=4,
+            worker="other",
+            date_heartbeat=timezone.now() - IMPORT_JOB_LEASE - timedelta(seconds=1),
+        )
+
+        resume_import_jobs_on_app_ready()
+        self.assertEqual(get_scheduled_job_ids(mocked_scheduler), [job.pk])
+        process_import_job(job.pk)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, ImportJob.DONE)
+        self.assertEqual(job.processed, 5)
+        self.assertEqual(job.worker, WORKER_ID)
+        self.assertEqual(list(Song.objects.values_list("title", flat=True)), ["Song4"])
+
+    @patch("library.jobs.scheduler")
+    def test_resume_owned(self, mocked_scheduler):
+        """Test a job running in a live worker is not resumed."""
+        job = create_import_job(ImportJob.SONG, self.songs)
+        ImportJob.objects.filter(pk=job.pk).update(
+            status=ImportJob.RUNNING,
+            processed=2,
+            worker="other",
+            date_heartbeat=timezone.now(),
+        )
+
+        resume_import_jobs_on_app_ready()
+        self.assertEqual(get_scheduled_job_ids(mocked_scheduler), [])
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, ImportJob.RUNNING)
+        self.assertEqual(job.worker, "other")
+
+        # the job is checked again periodically
+        mocked_scheduler.add_job.assert_any_call(
+            run_requeue_import_jobs,
+            "interval",
+            seconds=IMPORT_JOB_LEASE.total_seconds(),
+            id=IMPORT_REQUEUE_JOB_NAME,
+            replace_existing=True,
+        )
+
+        # the job is resumed once its worker is gone
+        with patch(
+            "library.jobs.timezone.now",
+            return_value=timezone.now() + IMPORT_JOB_LEASE + timedelta(seconds=1),
+        ):
+            requeue_import_jobs()
+
+        self.assertEqual(get_scheduled_job_ids(mocked_scheduler), [job.pk])
+        job.refresh_from_db()
+        self.assertEqual(job.status, ImportJob.QUEUED)
@@ -74,3 +74,63 @@ class TestStringification:
         tag = models.SongTag(name="Rock and roll", color_hue=180, disabled=True)
 
         assert str(tag) == "Rock and roll"
+
+
+@pytest.mark.django_db
+class TestNormalizedFields:
+    """Test the normalized copies of text fields."""
+
+    def test_save(self, library_provider):
+        """Test normalized fields are updated on save."""
+        work = models.Work.objects.create(
+            title="Ｅｖａｎｇｅｌｉｏｎ",
+            subtitle="Ōkami",
+            work_type=library_provider.wt1,
+        )
+
+        assert work.title_normalized == "evangelion"
+        assert work.subtitle_normalized == "okami"
+
+    def test_save_update_fields(self):
+        """Test normalized fields are saved along their field."""
+        artist = models.Artist.objects.create(name="Artist")
+        artist.name = "Ärtist"
+        artist.save(update_fields=["name"])
+        artist.refresh_from_db()
+
+        assert artist.name_normalized == "artist"
+
+
+@pytest.mark.django_db
+class TestLyricsPreview:
+    """Test the extract of the lyrics."""
+
+    def test_save(self):
+        """Test the extract is updated on save."""
+        song = models.Song.objects.create(
+            title="Song", filename="song.mp4", lyrics="a\nb\nc\nd\ne\nf"
+        )
+
+        assert song.lyrics_preview == "a\nb\nc\nd\ne"
+        assert song.lyrics_truncated
+
+        song.lyrics = "a\nb"
+        song.save(update_fields=["lyrics"])
+        song.refresh_from_db()
+
+        assert song.lyrics_preview == "a\nb"
+        assert not song.lyrics_truncated
+
+    def test_save_deferred(self):
+        """Test the extract is kept when the lyrics are not loaded."""
+        song = models.Song.objects.create(
+            title="Song", filename="song.mp4", lyrics="a\nb"
+        )
+
+        song = models.Song.objects.defer("lyrics").get(pk=song.pk)
+        song.title = "Song modified"
+        song.save()
+
+        assert "lyrics" in song.get_deferred_fields()
+        song.refresh_from_db()
+        assert song.lyrics_preview == "a\nb"
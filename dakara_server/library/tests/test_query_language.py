@@ -1,7 +1,17 @@
+import random
+
 from django.test import TestCase
 
+from library.benchmark import LegacyQueryLanguageParser
 from library.models import WorkType
-from library.query_language import QueryLanguageParser
+from library.query_language import (
+    QueryLanguageParser,
+    Tag,
+    Term,
+    Word,
+    clear_parser,
+    get_parser,
+)
 
 
 class QueryLanguageParserTestCase(TestCase):
@@ -117,6 +127,14 @@ class QueryLanguageParserTestCase(TestCase):
         self.assertCountEqual(res["work"]["exact"], [])
         self.assertCountEqual(res["work_type"].keys(), [])
 
+    def test_parse_lyrics(self):
+        """Test lyrics query parse."""
+        res = self.parser.parse("""lyrics:"little lamb" lyrics:""had a little"" """)
+        self.assertCountEqual(res["remaining"], [])
+        self.assertCountEqual(res["lyrics"]["contains"], ["little lamb"])
+        self.assertCountEqual(res["lyrics"]["exact"], ["had a little"])
+        self.assertCountEqual(res["title"]["contains"], [])
+
     def test_parse_work(self):
         """Test work query parse."""
         res = self.parser.parse("work:mywork")
@@ -227,7 +245,7 @@ class QueryLanguageParserTestCase(TestCase):
         """
         # Pre-assertion, keywords contains wt1 and wt2
         self.assertCountEqual(
-            self.parser.keywords, ["artist", "work", "title", "wt1", "wt2"]
+            self.parser.keywords, ["artist", "work", "title", "lyrics", "wt1", "wt2"]
         )
 
         # Request with work type 2
@@ -252,7 +270,9 @@ class QueryLanguageParserTestCase(TestCase):
         self.parser = QueryLanguageParser()
 
         # Check parser keywords, should not include wt2 anymore
-        self.assertCountEqual(self.parser.keywords, ["artist", "work", "title", "wt1"])
+        self.assertCountEqual(
+            self.parser.keywords, ["artist", "work", "title", "lyrics", "wt1"]
+        )
 
         # Now the request with wt2 should not be parsed since wt2 is not a
         # keyword anymore
@@ -266,3 +286,190 @@ class QueryLanguageParserTestCase(TestCase):
         self.assertCountEqual(res["work"]["contains"], [])
         self.assertCountEqual(res["work"]["exact"], [])
         self.assertCountEqual(res["work_type"].keys(), [])
+
+
+class QueryLanguageEquivalenceTestCase(TestCase):
+    # fragments of the random queries, made of keywords, quotes, escapes and
+    # separators in all positions
+    FRAGMENTS = [
+        "artist",
+        "work",
+        "TITLE",
+        "lyrics",
+        "wt1",
+        "wt2",
+        ":",
+        ": ",
+        '"',
+        '""',
+        "\\",
+        "\\ ",
+        " ",
+        "  ",
+        "\t",
+        "#",
+        "a",
+        "bé",
+        "ça",
+        "_",
+        "-",
+        "9",
+    ]
+
+    def setUp(self):
+        # Create work types
+        WorkType.objects.create(name="WorkType1", query_name="wt1")
+        WorkType.objects.create(name="WorkType2", query_name="wt2")
+
+        self.parser = QueryLanguageParser()
+        self.parser_legacy = LegacyQueryLanguageParser()
+
+    def parse(self, parser, query):
+        """Parse a query, giving the error instead of raising it."""
+        try:
+            return parser.parse_uncached(query)
+
+        except ValueError as error:
+            return str(error)
+
+    def test_parse_tags(self):
+        """Test to parse many tags among words."""
+        query = " ".join("#tag{0} word{0}".format(index % 50) for index in range(200))
+        res = self.parser.parse_uncached(query + " #")
+
+        self.assertEqual(
+            res["tag"], ["TAG{}".format(index % 50) for index in range(200)]
+        )
+        self.assertEqual(
+            res["remaining"], ["word{}".format(index % 50) for index in range(200)]
+        )
+
+    def test_split_remaining(self):
+        """Test to split expressions of the remaining text."""
+        self.assertEqual(
+            QueryLanguageParser.split_remaining('a\\ b "c d" e'), ["a b", "c d", "e"]
+        )
+
+    def test_equivalence_fuzz(self):
+        """Test random queries are parsed as by the former parser."""
+        generator = random.Random(0)
+        for _ in range(5000):
+            query = "".join(
+                generator.choice(self.FRAGMENTS)
+                for _ in range(generator.randint(0, 20))
+            )
+            with self.subTest(query=query):
+                self.assertEqual(
+                    self.parse(self.parser, query),
+                    self.parse(self.parser_legacy, query),
+                )
+                self.assertEqual(
+                    self.parser.split_remaining(query),
+                    self.parser_legacy.split_remaining(query),
+                )
+
+
+class QueryLanguageTokenizeTestCase(TestCase):
+    def setUp(self):
+        # Create work types
+        self.wt1 = WorkType(name="WorkType1", query_name="wt1")
+        self.wt1.save()
+
+        self.parser = QueryLanguageParser()
+
+    def test_tokenize(self):
+        """Test to give the nodes of a query with their positions."""
+        query = 'love title:dream wt1:""a b"" #tag1 "c d"'
+        self.assertListEqual(
+            self.parser.tokenize(query),
+            [
+                Word("love", 0, 4),
+                Term("title", "dream", False, 5, 16),
+                Term("wt1", "a b", True, 17, 28),
+                Tag("TAG1", 29, 34),
+                Word("c d", 36, 39),
+            ],
+        )
+
+    def test_tokenize_interrupted(self):
+        """Test words around a term are read as if it was not there."""
+        query = 'a\\ b "c title:x d" e'
+        self.assertListEqual(
+            self.parser.tokenize(query),
+            [
+                Word("a b", 0, 4),
+                Term("title", "x", False, 8, 15),
+                Word("c  d", 6, 17),
+                Word("e", 19, 20),
+            ],
+        )
+
+    def test_tokenize_empty_tag(self):
+        """Test to ignore tags without name."""
+        self.assertListEqual(self.parser.tokenize("# a"), [Word("a", 2, 3)])
+
+    def test_tokenize_empty_term(self):
+        """Test to reject keywords with an empty value."""
+        with self.assertRaisesRegex(ValueError, "Inconsistency"):
+            self.parser.tokenize('title:""  ""')
+
+
+class QueryLanguageParserRegistryTestCase(TestCase):
+    def setUp(self):
+        # start with no parser
+        clear_parser()
+
+        # Create work types
+        self.wt1 = WorkType(name="WorkType1", query_name="wt1")
+        self.wt1.save()
+
+    def tearDown(self):
+        clear_parser()
+
+    def test_get_parser_shared(self):
+        """Test the parser is created once."""
+        with self.assertNumQueries(1):
+            parser = get_parser()
+            self.assertIs(get_parser(), parser)
+
+        self.assertCountEqual(parser.keywords_work_type, ["wt1"])
+
+    def test_get_parser_invalidated(self):
+        """Test the parser is invalidated when work types change."""
+        parser = get_parser()
+
+        # create a work type
+        wt2 = WorkType(name="WorkType2", query_name="wt2")
+        wt2.save()
+        parser_created = get_parser()
+        self.assertIsNot(parser_created, parser)
+        self.assertCountEqual(parser_created.keywords_work_type, ["wt1", "wt2"])
+
+        # delete a work type
+        wt2.delete()
+        parser_deleted = get_parser()
+        self.assertIsNot(parser_deleted, parser_created)
+        self.assertCountEqual(parser_deleted.keywords_work_type, ["wt1"])
+
+    def test_parse_cached(self):
+        """Test parsed queries are cached."""
+        parser = get_parser()
+        res = parser.parse("wt1:work artist:me remain")
+        self.assertEqual(parser.parse_cached.cache_info().misses, 1)
+
+        # modifying the result does not modify the cache
+        res["remaining"].append("modified")
+
+        res_cached = parser.parse("wt1:work artist:me remain")
+        self.assertEqual(parser.parse_cached.cache_info().hits, 1)
+        self.assertEqual(res_cached["remaining"], ["remain"])
+        self.assertEqual(res_cached["work_type"]["wt1"]["contains"], ["work"])
+
+    def test_parse_cache_bounded(self):
+        """Test the cache of parsed queries is bounded."""
+        parser = QueryLanguageParser(cache_size=2)
+        parser.parse("a")
+        parser.parse("b")
+        parser.parse("c")
+
+        self.assertEqual(parser.parse_cached.cache_info().currsize, 2)
@@ -0,0 +1,255 @@
+from django.db import connection
+from django.test import TestCase, override_settings
+
+from library.models import (
+    Artist,
+    SearchLyricsToken,
+    Song,
+    SongSearchDocument,
+    SongTag,
+    SongWorkLink,
+    Work,
+    WorkAlternativeTitle,
+)
+from library.query_language import QueryLanguageParser
+from library.search import (
+    SongExistsSearch,
+    SongSearch,
+    get_song_search,
+    has_full_text_index,
+)
+from library.tests.base_test import LibraryProvider
+
+
+class SongSearchDocumentTestCase(TestCase, LibraryProvider):
+    def setUp(self):
+        # create test data
+        self.create_test_data()
+
+    def test_document_created(self):
+        """Test a document is created for each song."""
+        document = SongSearchDocument.objects.get(song=self.song2)
+        self.assertEqual(document.title, "\x1fsong2\x1f")
+        self.assertEqual(document.artists, "\x1fartist1\x1f")
+        self.assertEqual(document.tags, "\x1ftag1\x1f")
+        self.assertEqual(
+            document.details, "\x1fversion2\x1fdetail2\x1fdetail_video2\x1f"
+        )
+        self.assertCountEqual(
+            document.works.strip("\x1f").split("\x1f"),
+            ["work1", "alttitle1", "alttitle2"],
+        )
+        self.assertCountEqual(
+            document.work_types.strip("\x1f").split("\x1f"),
+            ["wt1\x1ework1", "wt1\x1ealttitle1", "wt1\x1ealttitle2"],
+        )
+
+        document = SongSearchDocument.objects.get(song=self.song1)
+        self.assertEqual(document.title, "\x1fsong1\x1f")
+        self.assertEqual(document.artists, "")
+        self.assertEqual(document.works, "")
+
+    def test_document_updated_artist(self):
+        """Test a document is updated when an artist changes."""
+        self.artist1.name = "Renamed"
+        self.artist1.save()
+        self.song1.artists.add(self.artist2)
+
+        self.assertEqual(self.song2.search_document.artists, "\x1frenamed\x1f")
+        self.song1.search_document.refresh_from_db()
+        self.assertEqual(self.song1.search_document.artists, "\x1fartist2\x1f")
+
+        self.artist1.delete()
+        self.song2.search_document.refresh_from_db()
+        self.assertEqual(self.song2.search_document.artists, "")
+
+    def test_document_updated_work(self):
+        """Test a document is updated when a work changes."""
+        WorkAlternativeTitle.objects.filter(work=self.work1).delete()
+        self.work1.title = "Renamed"
+        self.work1.save()
+
+        document = SongSearchDocument.objects.get(song=self.song2)
+        self.assertEqual(document.works, "\x1frenamed\x1f")
+        self.assertEqual(document.work_types, "\x1fwt1\x1erenamed\x1f")
+
+        self.wt1.query_name = "new"
+        self.wt1.save()
+        document.refresh_from_db()
+        self.assertEqual(document.work_types, "\x1fnew\x1erenamed\x1f")
+
+        self.work1.delete()
+        document.refresh_from_db()
+        self.assertEqual(document.works, "")
+
+    def test_document_deleted(self):
+        """Test a document is deleted with its song."""
+        self.song2.delete()
+
+        self.assertFalse(SongSearchDocument.objects.filter(song_id=self.song2.pk))
+
+
+class SongSearchTestCase(TestCase, LibraryProvider):
+    def setUp(self):
+        # create test data
+        self.create_test_data()
+
+        # create a song with works of different types
+        self.song3 = Song.objects.create(title="Song3", filename="file.mp4")
+        self.work4 = Work.objects.create(title="Other", work_type=self.wt1)
+        SongWorkLink.objects.create(
+            song=self.song3, work=self.work3, link_type=SongWorkLink.OPENING
+        )
+        SongWorkLink.objects.create(
+            song=self.song3, work=self.work4, link_type=SongWorkLink.ENDING
+        )
+        self.song3.artists.add(Artist.objects.create(name='The "Quoted"'))
+
+        self.parser = QueryLanguageParser()
+
+    def get_searches(self):
+        """Give the searches to test.
+
+        Yields:
+            tuple: Name and instance of the search.
+        """
+        yield "document", SongSearch(connection.alias)
+
+        search = SongSearch(connection.alias)
+        search.full_text_index = False
+        yield "document without index", search
+
+        yield "exists", SongExistsSearch(connection.alias)
+
+    def search(self, query, search):
+        """Search songs with the given query."""
+        return list(
+            search.filter(Song.objects.all(), self.parser.parse(query)).order_by("pk")
+        )
+
+    @override_settings(LIBRARY_SEARCH="exists")
+    def test_get_song_search(self):
+        """Test the search is selected by settings."""
+        self.assertIsInstance(get_song_search(connection.alias), SongExistsSearch)
+
+    def test_full_text_index_available(self):
+        """Test the full text index is available on SQLite."""
+        self.assertTrue(has_full_text_index(connection.alias))
+
+    def test_search(self):
+        """Test to search with and without the full text index."""
+        for name, search in self.get_searches():
+            with self.subTest(search=name):
+                self.assertEqual(
+                    self.search("ong", search),
+                    [
+                        self.song1,
+                        self.song2,
+                        self.song3,
+                    ],
+                )
+                self.assertEqual(self.search("g1", search), [self.song1])
+                self.assertEqual(self.search("artist:ARTIST", search), [self.song2])
+                self.assertEqual(self.search('artist:""artist""', search), [])
+                self.assertEqual(self.search('artist:"quoted"', search), [self.song3])
+                self.assertEqual(self.search("#tag1", search), [self.song2])
+                self.assertEqual(self.search("#tag", search), [])
+                self.assertEqual(self.search('title:""song2""', search), [self.song2])
+                self.assertEqual(self.search("etail_vid", search), [self.song2])
+
+    def test_search_normalized(self):
+        """Test to search regardless of case, width and diacritics."""
+        song4 = Song.objects.create(title="Ｃｏｍｍｅ l'Été", filename="file.mp4")
+        song4.artists.add(Artist.objects.create(name="Björk"))
+
+        for name, search in self.get_searches():
+            with self.subTest(search=name):
+                self.assertEqual(self.search("ete", search), [song4])
+                self.assertEqual(self.search("COMME", search), [song4])
+                self.assertEqual(self.search('title:""comme l\'ete""', search), [song4])
+                self.assertEqual(self.search("artist:bjork", search), [song4])
+
+    def test_search_normalized_details_tags(self):
+        """Test to search details and tags regardless of case and diacritics."""
+        song4 = Song.objects.create(
+            title="Song4", filename="file.mp4", version="Édition Spéciale"
+        )
+        song4.tags.add(SongTag.objects.create(name="ÉTÉ"))
+
+        for name, search in self.get_searches():
+            with self.subTest(search=name):
+                self.assertEqual(self.search("speciale", search), [song4])
+                self.assertEqual(self.search("#ETE", search), [song4])
+                self.assertEqual(self.search("#ete", search), [song4])
+
+    def test_search_lyrics(self):
+        """Test to search lyrics."""
+        self.song1.lyrics = "Mary had a little lamb\nIts fleece was white as snow"
+        self.song1.save()
+        self.song2.lyrics = "A little cat"
+        self.song2.save()
+
+        for name, search in self.get_searches():
+            with self.subTest(search=name):
+                self.assertEqual(
+                    self.search('lyrics:"LITTLE"', search), [self.song1, self.song2]
+                )
+                self.assertEqual(self.search('lyrics:"lamb lit"', search), [self.song1])
+                self.assertEqual(self.search("lyrics:lam", search), [self.song1])
+                self.assertEqual(self.search("lyrics:amb", search), [])
+                self.assertEqual(
+                    self.search('lyrics:""a little""', search), [self.song1, self.song2]
+                )
+                self.assertEqual(
+                    self.search('lyrics:""lamb its fleece""', search), [self.song1]
+                )
+                self.assertEqual(self.search('lyrics:""little a""', search), [])
+                self.assertEqual(self.search('lyrics:""white snow""', search), [])
+
+    def test_search_lyrics_no_words(self):
+        """Test to search lyrics with a value without words."""
+        self.song1.lyrics = "Mary had a little lamb"
+        self.song1.save()
+
+        for name, search in self.get_searches():
+            with self.subTest(search=name):
+                self.assertEqual(self.search("lyrics:...", search), [])
+                self.assertEqual(self.search('lyrics:""...""', search), [])
+
+    def test_lyrics_tokens_updated(self):
+        """Test the lyrics tokens are kept up to date."""
+        self.song1.lyrics = "Mary had a little lamb"
+        self.song1.save()
+        self.assertEqual(
+            list(
+                SearchLyricsToken.objects.filter(song=self.song1)
+                .order_by("position")
+                .values_list("token", flat=True)
+            ),
+            ["mary", "had", "a", "little", "lamb"],
+        )
+
+        song = Song.objects.get(pk=self.song1.pk)
+        song.lyrics = "Été"
+        song.save()
+        self.assertEqual(
+            list(self.song1.lyrics_tokens.values_list("token", flat=True)), ["ete"]
+        )
+
+        # saving a song without its lyrics keeps the tokens
+        song.title = "Song1 bis"
+        song.save(update_fields=["title"])
+        self.assertEqual(self.song1.lyrics_tokens.count(), 1)
+
+    def test_search_work_type(self):
+        """Test to search works of a type among works of several types."""
+        for name, search in self.get_searches():
+            with self.subTest(search=name):
+                # the song has a work of type wt1 and a work titled Work3 of
+                # type wt2, which must not be mixed up
+                self.assertEqual(self.search("wt1:work3", search), [])
+                self.assertEqual(self.search("wt2:work3", search), [self.song3])
+                self.assertEqual(self.search("wt1:ther", search), [self.song3])
+                self.assertEqual(self.search('wt1:""work3""', search), [])
+                self.assertEqual(self.search('wt2:""work3""', search), [self.song3])
+                self.assertEqual(self.search("wt1:alttitle2", search), [self.song2])
@@ -0,0 +1,154 @@
+from unittest.mock import patch
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+
+from internal.tests.base_test import UserModel
+from library.search_cache import get_library_revision, normalize_query
+from library.tests.base_test import LibraryAPITestCase
+
+
+class SearchResultCacheTestCase(LibraryAPITestCase):
+    url = reverse("library-song-list")
+
+    def setUp(self):
+        # create a user without any rights
+        self.user = self.create_user("TestUser")
+
+        # create a manager
+        self.manager = self.create_user("TestManager", library_level=UserModel.MANAGER)
+
+        # create test data
+        self.create_test_data()
+
+    def search(self, params):
+        """Search songs and give the IDs of the songs and the number of queries."""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, params)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        return [song["id"] for song in response.data["results"]], len(queries)
+
+    def test_normalize_query(self):
+        """Test the case and the order of terms do not matter."""
+        self.assertEqual(
+            normalize_query({"remaining": ["B", "a"], "artist": {"exact": ["C"]}}),
+            {"remaining": ["a", "b"], "artist": {"exact": ["c"]}},
+        )
+
+    def test_search_cached(self):
+        """Test the results of a search are reused by a similar search."""
+        self.authenticate(self.user)
+
+        ids, queries_count = self.search({"query": "song"})
+        self.assertEqual(ids, [self.song1.id, self.song2.id])
+
+        ids_cached, queries_count_cached = self.search({"query": "SONG"})
+        self.assertEqual(ids_cached, ids)
+        self.assertLess(queries_count_cached, queries_count)
+
+        # the pagination still works
+        response = self.client.get(self.url, {"query": "song"})
+        self.assertEqual(response.data["count"], 2)
+        self.assertEqual(response.data["pagination"], {"current": 1, "last": 1})
+
+    def test_search_invalidated(self):
+        """Test the results of a search are invalidated by library changes."""
+        self.authenticate(self.user)
+
+        revision = get_library_revision()
+        self.assertEqual(self.search({"query": "song1"})[0], [self.song1.id])
+
+        self.song2.title = "Song1 bis"
+        self.song2.save()
+        self.assertNotEqual(get_library_revision(), revision)
+        self.assertEqual(
+            self.search({"query": "song1"})[0], [self.song1.id, self.song2.id]
+        )
+
+        revision = get_library_revision()
+        self.song1.tags.add(self.tag2)
+        self.assertNotEqual(get_library_revision(), revision)
+
+    def test_search_visibility(self):
+        """Test users of different visibility classes do not share results."""
+        self.tag1.disabled = True
+        self.tag1.save()
+
+        self.authenticate(self.manager)
+        self.assertEqual(
+            self.search({"query": "song"})[0], [self.song1.id, self.song2.id]
+        )
+
+        self.authenticate(self.user)
+        self.assertEqual(self.search({"query": "song"})[0], [self.song1.id])
+
+    def test_search_relevance_cached(self):
+        """Test the scores of a search are cached as well."""
+        self.authenticate(self.user)
+
+        params = {"query": "song2", "ordering": "relevance"}
+        response = self.client.get(self.url, params)
+        response_cached = self.client.get(self.url, params)
+        self.assertEqual(response_cached.data["scores"], response.data["scores"])
+        self.assertEqual(response_cached.data["scores"][self.song2.id], 8)
+
+    def test_search_facets_cached(self):
+        """Test the counts of facets of a search are cached as well."""
+        self.authenticate(self.user)
+
+        params = {"query": "song", "facets": "tag"}
+        response = self.client.get(self.url, params)
+
+        with CaptureQueriesContext(connection) as queries:
+            response_cached = self.client.get(self.url, params)
+
+        self.assertEqual(response_cached.data["facets"], response.data["facets"])
+        self.assertEqual(
+            response_cached.data["facets"]["tag"],
+            [{"id": self.tag1.id, "name": "TAG1", "count": 1}],
+        )
+        self.assertFalse(
+            any("GROUP BY" in query["sql"] for query in queries.captured_queries)
+        )
+
+        # other facets are counted for the cached results
+        response = self.client.get(self.url, {"query": "song", "facets": "artist"})
+        self.assertEqual(
+            response.data["facets"]["artist"],
+            [{"id": self.artist1.id, "name": "Artist1", "count": 1}],
+        )
+
+    @patch("library.search_cache.SEARCH_RESULTS_MAX_COUNT", 1)
+    @patch("internal.pagination.PageNumberPaginationCustom.page_size", 1)
+    def test_search_cached_first_ids(self):
+        """Test only the first IDs of the results of a search are cached."""
+        self.authenticate(self.user)
+
+        ids, queries_count = self.search({"query": "song"})
+        self.assertEqual(ids, [self.song1.id])
+
+        ids_cached, queries_count_cached = self.search({"query": "song"})
+        self.assertEqual(ids_cached, ids)
+        self.assertLess(queries_count_cached, queries_count)
+
+        # the next page is obtained from the database
+        response = self.client.get(self.url, {"query": "song", "page": 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [song["id"] for song in response.data["results"]], [self.song2.id]
+        )
+        self.assertEqual(response.data["count"], 2)
+        self.assertEqual(response.data["pagination"], {"current": 2, "last": 2})
+
+        # the number of songs is cached
+        response = self.client.get(self.url, {"query": "song"})
+        self.assertEqual(response.data["count"], 2)
+        self.assertEqual(response.data["pagination"], {"current": 1, "last": 2})
+
+        # invalid pages are still rejected
+        response = self.client.get(self.url, {"query": "song", "page": 3})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
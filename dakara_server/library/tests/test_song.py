@@ -1,11 +1,27 @@
+import base64
+import json
 from datetime import timedelta
+from unittest.mock import patch
 
+from django.db import connection
+from django.db.models import CASCADE, PROTECT, ProtectedError
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework import status
 
 from internal.tests.base_test import UserModel
-from library.models import Artist, Song, SongTag, SongWorkLink, Work
+from library.deletion import delete_songs
+from library.models import (
+    Artist,
+    LibraryChange,
+    Song,
+    SongSearchDocument,
+    SongTag,
+    SongWorkLink,
+    Work,
+)
 from library.tests.base_test import LibraryAPITestCase
+from playlist.models import PlaylistEntry
 
 
 class SongListViewTestCase(LibraryAPITestCase):
@@ -36,6 +52,250 @@ class SongListViewTestCase(LibraryAPITestCase):
         self.check_song_json(response.data["results"][0], self.song1)
         self.check_song_json(response.data["results"][1], self.song2)
 
+    def get_cursor_pages(self, params, cursor=""):
+        """Walk through all the pages of songs with the keyset pagination.
+
+        Returns:
+            list of list: IDs of songs of each page.
+        """
+        pages = []
+        while cursor is not None:
+            response = self.client.get(self.url, {**params, "cursor": cursor})
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            pages.append([song["id"] for song in response.data["results"]])
+            cursor = response.data["pagination"]["next"]
+
+        return pages
+
+    def test_get_song_list_cursor(self):
+        """Test to get songs with the keyset pagination."""
+        # Login as simple user
+        self.authenticate(self.user)
+
+        # add songs with the same titles
+        for index in range(22):
+            Song.objects.create(title=f"Song{index % 3}", filename="file.mp4")
+
+        # get songs with the page number pagination
+        ids = []
+        for page in (1, 2, 3):
+            response = self.client.get(self.url, {"page": page})
+            ids.extend(song["id"] for song in response.data["results"])
+
+        # get songs with the keyset pagination
+        pages = self.get_cursor_pages({})
+        self.assertEqual([len(page) for page in pages], [10, 10, 4])
+        self.assertEqual(sum(pages, []), ids)
+
+        # count is given only if requested
+        response = self.client.get(self.url, {"cursor": ""})
+        self.assertIsNone(response.data["count"])
+        self.assertIsNone(response.data["pagination"]["previous"])
+        response = self.client.get(self.url, {"cursor": "", "count": "1"})
+        self.assertEqual(response.data["count"], 24)
+
+        # go back to the first page
+        response = self.client.get(
+            self.url, {"cursor": response.data["pagination"]["next"]}
+        )
+        self.assertEqual([song["id"] for song in response.data["results"]], ids[10:20])
+        response = self.client.get(
+            self.url, {"cursor": response.data["pagination"]["previous"]}
+        )
+        self.assertEqual([song["id"] for song in response.data["results"]], ids[:10])
+        self.assertIsNone(response.data["pagination"]["previous"])
+        self.assertIsNotNone(response.data["pagination"]["next"])
+
+    def test_get_song_list_cursor_relevance(self):
+        """Test to get songs by relevance with the keyset pagination."""
+        # Login as simple user
+        self.authenticate(self.user)
+
+        for index in range(12):
+            Song.objects.create(title=f"Song{index}", filename="file.mp4")
+
+        params = {"query": "song1", "ordering": "relevance"}
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.data["count"], 4)
+        pages = self.get_cursor_pages(params)
+        self.assertEqual(len(pages), 1)
+        self.assertEqual(pages[0], [song["id"] for song in response.data["results"]])
+
+    def test_get_song_list_cursor_invalid(self):
+        """Test to get songs with an invalid cursor."""
+        # Login as simple user
+        self.authenticate(self.user)
+
+        response = self.client.get(self.url, {"cursor": "invalid"})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_get_song_list_cursor_tampered(self):
+        """Test to get songs with a cursor which values were modified."""
+        # Login as simple user
+        self.authenticate(self.user)
+
+        for values in (
+            ["x", {"a": 1}],
+            [None, None],
+            [[1], "z"],
+            ["Song1", "z"],
+            ["Song1", 2**70],
+        ):
+            cursor = base64.urlsafe_b64encode(
+                json.dumps({"v": values, "r": False}).encode()
+            ).decode()
+            response = self.client.get(self.url, {"cursor": cursor})
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_get_song_list_num_queries(self):
+        """Test the number of queries does not depend on the number of songs."""
+        # Login as simple user
+        self.authenticate(self.user)
+
+        # add songs with related objects
+        for index in range(5):
+            song = Song.objects.create(title=f"Song{index}", filename="file.mp4")
+            song.artists.add(self.artist1, self.artist2)
+            song.tags.add(self.tag2)
+            SongWorkLink.objects.create(
+                song=song, work=self.work1, link_type=SongWorkLink.ENDING
+            )
+            SongWorkLink.objects.create(
+                song=song, work=self.work3, link_type=SongWorkLink.OPENING
+            )
+
+        # authentication, count, songs, artists, tags, links to works with
+        # works and work types, alternative titles of works
+        with self.assertNumQueries(7):
+            response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["count"], 7)
+
+    def test_get_song_list_ids(self):
+        """Test to get songs by IDs."""
+        # Login as simple user
+        self.authenticate(self.user)
+
+        # songs are given in the requested order
+        ids = "{},{}".format(self.song2.id, self.song1.id)
+        with self.assertNumQueries(6):
+            response = self.client.get(self.url, {"ids": ids})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 2)
+        self.check_song_json(response.data[0], self.song2)
+        self.check_song_json(response.data[1], self.song1)
+
+        # unknown IDs and duplicates are omitted
+        response = self.client.get(self.url, {"ids": "0,{0},{0}".format(self.song1.id)})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([song["id"] for song in response.data], [self.song1.id])
+
+    def test_get_song_list_ids_disabled_tag(self):
+        """Test songs with disabled tags are omitted from songs by IDs."""
+        # Login as simple user
+        self.authenticate(self.user)
+
+        self.tag1.disabled = True
+        self.tag1.save()
+
+        ids = "{},{}".format(self.song2.id, self.song1.id)
+        response = self.client.get(self.url, {"ids": ids})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([song["id"] for song in response.data], [self.song1.id])
+
+    def test_get_song_list_ids_invalid(self):
+        """Test to get songs by invalid IDs."""
+        # Login as simple user
+        self.authenticate(self.user)
+
+        response = self.client.get(self.url, {"ids": "1,a"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.get(
+            self.url, {"ids": ",".join(str(pk) for pk in range(1, 102))}
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        # IDs which cannot be stored in database
+        for ids in ("1180591620717411303424", "-1180591620717411303424"):
+            response = self.client.get(self.url, {"ids": ids})
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_get_song_list_facets(self):
+        """Test to count the songs of a search by facet."""
+        # Login as simple user
+        self.authenticate(self.user)
+
+        self.song1.artists.add(self.artist1, self.artist2)
+        SongWorkLink.objects.create(
+            song=self.song1, work=self.work3, link_type=SongWorkLink.ENDING
+        )
+
+        response = self.client.get(
+            self.url, {"query": "song", "facets": "work_type,tag,artist"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.data["facets"],
+            {
+                "work_type": [
+                    {
+                        "id": self.wt1.id,
+                        "name": "WorkType1",
+                        "query_name": "wt1",
+                        "count": 1,
+                    },
+                    {
+                        "id": self.wt2.id,
+                        "name": "WorkType2",
+                        "query_name": "wt2",
+                        "count": 1,
+                    },
+                ],
+                "tag": [{"id": self.tag1.id, "name": "TAG1", "count": 1}],
+                "artist": [
+                    {"id": self.artist1.id, "name": "Artist1", "count": 2},
+                    {"id": self.artist2.id, "name": "Artist2", "count": 1},
+                ],
+            },
+        )
+
+        # the counts only concern songs matching the query
+        response = self.client.get(self.url, {"query": "song1", "facets": "tag,artist"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.data["facets"],
+            {
+                "tag": [],
+                "artist": [
+                    {"id": self.artist1.id, "name": "Artist1", "count": 1},
+                    {"id": self.artist2.id, "name": "Artist2", "count": 1},
+                ],
+            },
+        )
+
+        # the counts are available without query
+        response = self.client.get(self.url, {"facets": "tag"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.data["facets"],
+            {"tag": [{"id": self.tag1.id, "name": "TAG1", "count": 1}]},
+        )
+
+        # facets are not given if not requested
+        response = self.client.get(self.url, {"query": "song"})
+        self.assertNotIn("facets", response.data)
+
+    def test_get_song_list_facets_invalid(self):
+        """Test to count songs by an unknown facet."""
+        # Login as simple user
+        self.authenticate(self.user)
+
+        response = self.client.get(self.url, {"facets": "tag,unknown"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
     def test_get_song_long_lyrics(self):
         """Test to get a song with few lyrics."""
         # Login as simple user
@@ -69,6 +329,26 @@ And everywhere that Mary went""",
             },
         )
 
+    def test_get_song_list_lyrics_deferred(self):
+        """Test the lyrics are not fetched to list songs."""
+        # Login as simple user
+        self.authenticate(self.user)
+
+        self.song1.lyrics = "Mary had a little lamb"
+        self.song1.save()
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertDictEqual(
+            response.data["results"][0]["lyrics_preview"],
+            {"text": "Mary had a little lamb"},
+        )
+        self.assertIsNone(response.data["results"][1]["lyrics_preview"])
+        for query in context.captured_queries:
+            self.assertNotIn('"library_song"."lyrics"', query["sql"])
+
     def test_get_song_list_forbidden(self):
         """Test to verify unauthenticated user can't get songs list."""
         # Attempte to get songs list
@@ -257,6 +537,107 @@ And everywhere that Mary went""",
         self.assertCountEqual(query["work_type"]["wt1"]["contains"], ["workName"])
         self.assertCountEqual(query["work_type"]["wt1"]["exact"], [])
 
+    def test_get_song_list_with_query_relevance(self):
+        """Test to verify song list ordered by relevance."""
+        # Login as simple user
+        self.authenticate(self.user)
+
+        # create songs matching the same term on different fields
+        song_title = Song.objects.create(title="Term", filename="file.mp4")
+        song_title_partial = Song.objects.create(title="Terminal", filename="file.mp4")
+        song_artist = Song.objects.create(title="A", filename="file.mp4")
+        song_artist.artists.add(Artist.objects.create(name="Term"))
+        song_work = Song.objects.create(title="B", filename="file.mp4")
+        SongWorkLink.objects.create(
+            song=song_work,
+            work=Work.objects.create(title="Term", work_type=self.wt1),
+            link_type=SongWorkLink.OPENING,
+        )
+        song_detail = Song.objects.create(title="C", filename="file.mp4", detail="Term")
+
+        # Get songs list ordered by relevance
+        response = self.client.get(self.url, {"query": "term", "ordering": "relevance"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [song["id"] for song in response.data["results"]],
+            [
+                song_title.id,
+                song_title_partial.id,
+                song_artist.id,
+                song_work.id,
+                song_detail.id,
+            ],
+        )
+        self.assertEqual(
+            response.data["scores"],
+            {
+                song_title.id: 8,
+                song_title_partial.id: 7,
+                song_artist.id: 6,
+                song_work.id: 4,
+                song_detail.id: 2,
+            },
+        )
+        self.assertEqual(response.data["query"]["remaining"], ["term"])
+
+        # Get songs list ordered by default
+        response = self.client.get(self.url, {"query": "term"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [song["id"] for song in response.data["results"]],
+            [
+                song_artist.id,
+                song_work.id,
+                song_detail.id,
+                song_title.id,
+                song_title_partial.id,
+            ],
+        )
+        self.assertNotIn("scores", response.data)
+
+    def test_get_song_list_with_query_relevance_keywords(self):
+        """Test to verify song list ordered by relevance of keyword terms."""
+        # Login as simple user
+        self.authenticate(self.user)
+
+        # create songs matching the same terms partially or exactly
+        song_partial = Song.objects.create(title="Terminal", filename="file.mp4")
+        song_partial.artists.add(Artist.objects.create(name="Terminal"))
+        SongWorkLink.objects.create(
+            song=song_partial,
+            work=Work.objects.create(title="Terminal", work_type=self.wt1),
+            link_type=SongWorkLink.OPENING,
+        )
+        song_exact = Song.objects.create(title="Term", filename="file.mp4")
+        song_exact.artists.add(Artist.objects.create(name="Term"))
+        SongWorkLink.objects.create(
+            song=song_exact,
+            work=Work.objects.create(title="Term", work_type=self.wt1),
+            link_type=SongWorkLink.OPENING,
+        )
+
+        for query, score_partial, score_exact in (
+            ("title:term", 7, 8),
+            ("artist:term", 5, 6),
+            ("work:term", 3, 4),
+            ("wt1:term", 3, 4),
+            ('artist:""term""', None, 6),
+            ("title:term artist:term wt1:term", 15, 18),
+        ):
+            with self.subTest(query=query):
+                response = self.client.get(
+                    self.url, {"query": query, "ordering": "relevance"}
+                )
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                expected = {song_exact.id: score_exact}
+                if score_partial is not None:
+                    expected[song_partial.id] = score_partial
+
+                self.assertEqual(
+                    [song["id"] for song in response.data["results"]], list(expected)
+                )
+                self.assertEqual(response.data["scores"], expected)
+
     def song_query_test(self, query, expected_songs):
         """Method to test a song request with a given query.
 
@@ -617,6 +998,142 @@ And everywhere that Mary went""",
         workNew = Work.objects.get(title="Work1", subtitle="", work_type=self.wt1)
         self.assertIsNotNone(workNew)
 
+    def test_post_song_embedded_multi(self):
+        """Test to create several songs with shared artists, tags and works."""
+        # login as manager
+        self.authenticate(self.manager)
+
+        # disable tag1
+        self.tag1.disabled = True
+        self.tag1.save()
+
+        # create new songs
+        work4 = {
+            "work": {
+                "title": "Work4",
+                "work_type": {"query_name": "wt3", "name": "WorkType3"},
+            },
+            "link_type": "OP",
+        }
+        songs = [
+            {
+                "title": "Song3",
+                "filename": "song3",
+                "directory": "directory",
+                "duration": 0,
+                "lyrics": "one\ntwo\nthree\nfour\nfive\nsix",
+                "artists": [{"name": self.artist1.name}, {"name": "Artist3"}],
+                "tags": [{"name": "TAG3", "color_hue": 134}, {"name": self.tag1.name}],
+                "works": [
+                    work4,
+                    {
+                        "work": {
+                            "title": self.work1.title,
+                            "work_type": {"query_name": self.wt1.query_name},
+                        },
+                        "link_type": "ED",
+                        "link_type_number": 2,
+                    },
+                ],
+            },
+            {
+                "title": "Song4",
+                "filename": "song4",
+                "directory": "directory",
+                "duration": 0,
+                "artists": [{"name": "Artist3"}, {"name": "Artist3"}],
+                "tags": [{"name": "TAG3", "color_hue": 256}],
+                "works": [work4],
+            },
+        ]
+        response = self.client.post(self.url, songs)
+
+        # assert the response
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(response.data), 2)
+        self.assertCountEqual(
+            [artist["name"] for artist in response.data[0]["artists"]],
+            [self.artist1.name, "Artist3"],
+        )
+        self.assertEqual(response.data[1]["works"][0]["work"]["title"], "Work4")
+
+        # assert the created objects
+        self.assertEqual(Song.objects.count(), 4)
+        self.assertEqual(Artist.objects.count(), 3)
+        self.assertEqual(SongTag.objects.count(), 3)
+        self.assertEqual(Work.objects.count(), 4)
+
+        song3 = Song.objects.get(title="Song3")
+        song4 = Song.objects.get(title="Song4")
+        artist3 = Artist.objects.get(name="Artist3")
+        tag3 = SongTag.objects.get(name="TAG3")
+        work4 = Work.objects.get(
+            title="Work4", subtitle="", work_type__query_name="wt3"
+        )
+        self.assertEqual(work4.work_type.name, "WorkType3")
+        self.assertEqual(tag3.color_hue, 134)
+        self.assertCountEqual(song3.artists.all(), [self.artist1, artist3])
+        self.assertCountEqual(song4.artists.all(), [artist3])
+        self.assertCountEqual(song3.works.all(), [work4, self.work1])
+
+        # assert the data maintained for songs
+        self.assertEqual(song3.title_normalized, "song3")
+        self.assertTrue(song3.lyrics_truncated)
+        self.assertTrue(song3.hidden)
+        self.assertFalse(song4.hidden)
+        self.assertEqual(artist3.song_count, 2)
+        self.assertEqual(Artist.objects.get(pk=self.artist1.pk).song_count, 2)
+        self.assertEqual(tag3.song_count, 2)
+        self.assertEqual(work4.song_count, 2)
+        self.assertEqual(Work.objects.get(pk=self.work1.pk).song_count, 2)
+
+        # assert the songs can be searched, including by the new work type
+        response = self.client.get(self.url, {"query": "wt3:work4 artist3"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertCountEqual(
+            [song["title"] for song in response.data["results"]], ["Song3", "Song4"]
+        )
+
+    def test_post_song_multi_num_queries(self):
+        """Test the number of queries to create songs does not depend on them."""
+        # login as manager
+        self.authenticate(self.manager)
+
+        def get_songs(start, end):
+            return [
+                {
+                    "title": "Song{}".format(index),
+                    "filename": "song{}".format(index),
+                    "duration": 0,
+                    "lyrics": "lyrics",
+                    "artists": [{"name": "Artist{}".format(index)}],
+                    "tags": [{"name": "TAG{}".format(index)}],
+                    "works": [
+                        {
+                            "work": {
+                                "title": "Work{}".format(index),
+                                "work_type": {"query_name": self.wt1.query_name},
+                            },
+                            "link_type": "OP",
+                        }
+                    ],
+                }
+                for index in range(start, end)
+            ]
+
+        with CaptureQueriesContext(connection) as context_few:
+            response = self.client.post(self.url, get_songs(10, 12))
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        with CaptureQueriesContext(connection) as context_many:
+            response = self.client.post(self.url, get_songs(20, 40))
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        self.assertEqual(Song.objects.count(), 24)
+        self.assertEqual(
+            len(context_few.captured_queries), len(context_many.captured_queries)
+        )
+
 
 class SongViewTestCase(LibraryAPITestCase):
     def setUp(self):
@@ -633,6 +1150,19 @@ class SongViewTestCase(LibraryAPITestCase):
         self.url_song1 = reverse("library-song", kwargs={"pk": self.song1.id})
         self.url_song2 = reverse("library-song", kwargs={"pk": self.song2.id})
 
+    def test_get_song_num_queries(self):
+        """Test the number of queries to get a song."""
+        # login as simple user
+        self.authenticate(self.user)
+
+        # authentication, song, artists, tags, links to works with works and
+        # work types, alternative titles of works
+        with self.assertNumQueries(6):
+            response = self.client.get(self.url_song2)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.check_song_json(response.data, self.song2)
+
     def test_put_song_simple(self):
         """Test to update a song without nested artists, tags nor works."""
         # login as manager
@@ -936,3 +1466,168 @@ class SongViewTestCase(LibraryAPITestCase):
         self.assertEqual(Work.objects.count(), 4)
         workNew = Work.objects.get(title="Work1", subtitle="", work_type=self.wt1)
         self.assertIsNotNone(workNew)
+
+
+class SongPruneViewTestCase(LibraryAPITestCase):
+    url = reverse("library-song-prune")
+
+    def setUp(self):
+        # create a user without any rights
+        self.user = self.create_user("TestUser")
+
+        # create a manager
+        self.manager = self.create_user("TestManager", library_level=UserModel.MANAGER)
+
+        # create test data
+        self.create_test_data()
+        self.song3 = Song.objects.create(
+            title="Song3", filename="file.mp4", directory="directory/subdirectory"
+        )
+        self.song3.artists.add(self.artist1)
+        self.song4 = Song.objects.create(
+            title="Song4", filename="file.mp4", directory="Directory"
+        )
+        self.song5 = Song.objects.create(
+            title="Song5", filename="file.mp4", directory="directory2"
+        )
+
+    def test_delete_ids(self):
+        """Test to delete songs by IDs."""
+        # login as manager
+        self.authenticate(self.manager)
+
+        # add the song to the playlist
+        PlaylistEntry.objects.create(song=self.song2, owner=self.manager)
+        song_pk = self.song2.pk
+
+        # delete songs
+        response = self.client.delete(
+            self.url, {"ids": [song_pk, self.song3.pk, 999]}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertDictEqual(response.data, {"deleted_count": 2})
+
+        # check songs and objects referencing them are deleted
+        self.assertFalse(Song.objects.filter(pk__in=[song_pk, self.song3.pk]))
+        self.assertFalse(PlaylistEntry.objects.exists())
+        self.assertFalse(SongWorkLink.objects.exists())
+        self.assertFalse(SongSearchDocument.objects.filter(song_id=song_pk))
+        self.assertEqual(Song.objects.count(), 3)
+
+        # check numbers of songs are updated
+        self.artist1.refresh_from_db()
+        self.assertEqual(self.artist1.song_count, 0)
+        self.tag1.refresh_from_db()
+        self.assertEqual(self.tag1.song_count, 0)
+        self.work1.refresh_from_db()
+        self.assertEqual(self.work1.song_count, 0)
+
+        # check the deletion is recorded
+        self.assertTrue(
+            LibraryChange.objects.get(
+                kind=LibraryChange.SONG, object_id=song_pk
+            ).deleted
+        )
+
+    def test_delete_directory(self):
+        """Test to delete songs in a directory and its subdirectories."""
+        # login as manager
+        self.authenticate(self.manager)
+
+        # delete songs
+        response = self.client.delete(
+            self.url, {"directory": "directory/"}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertDictEqual(response.data, {"deleted_count": 2})
+
+        # check other directories are kept
+        self.assertCountEqual(
+            Song.objects.values_list("pk", flat=True),
+            [self.song2.pk, self.song4.pk, self.song5.pk],
+        )
+
+    def test_delete_num_queries(self):
+        """Test the number of queries does not depend on the number of songs."""
+        # login as manager
+        self.authenticate(self.manager)
+
+        def count_queries(directory):
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.delete(
+                    self.url, {"directory": directory}, format="json"
+                )
+
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            return len(context)
+
+        for index in range(11):
+            song = Song.objects.create(
+                title=f"Song{index}",
+                filename="file.mp4",
+                directory="one" if index == 0 else "many",
+            )
+            song.artists.add(self.artist2)
+            song.tags.add(self.tag2)
+            SongWorkLink.objects.create(song=song, work=self.work2)
+
+        self.assertEqual(count_queries("one"), count_queries("many"))
+
+    def test_delete_not_cascading(self):
+        """Test to delete songs with a relation which does not cascade."""
+        # login as manager
+        self.authenticate(self.manager)
+
+        PlaylistEntry.objects.create(song=self.song2, owner=self.manager)
+        song_pk = self.song2.pk
+
+        # entries of the playlist protect their songs
+        relation = PlaylistEntry._meta.get_field("song").remote_field
+        with patch.object(relation, "on_delete", PROTECT):
+            with self.assertRaises(ProtectedError):
+                delete_songs(Song.objects.filter(pk__in=[song_pk, self.song3.pk]))
+
+        self.assertTrue(Song.objects.filter(pk__in=[song_pk, self.song3.pk]).exists())
+        self.assertTrue(PlaylistEntry.objects.exists())
+
+        # custom rules are applied as well
+        def cascade(*args, **kwargs):
+            CASCADE(*args, **kwargs)
+
+        with patch.object(relation, "on_delete", cascade):
+            _, deleted_counts = delete_songs(
+                Song.objects.filter(pk__in=[song_pk, self.song3.pk])
+            )
+
+        self.assertFalse(Song.objects.filter(pk__in=[song_pk, self.song3.pk]))
+        self.assertFalse(PlaylistEntry.objects.exists())
+        self.assertEqual(deleted_counts["library.Song"], 2)
+        self.artist1.refresh_from_db()
+        self.assertEqual(self.artist1.song_count, 0)
+
+    def test_delete_invalid(self):
+        """Test to delete songs with invalid IDs or directory, or with both."""
+        # login as manager
+        self.authenticate(self.manager)
+
+        for data in (
+            {},
+            {"ids": [self.song1.pk], "directory": "directory"},
+            {"ids": [0]},
+            {"ids": [2**70]},
+            {"directory": "/"},
+            {"directory": ""},
+        ):
+            response = self.client.delete(self.url, data, format="json")
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        self.assertEqual(Song.objects.count(), 5)
+
+    def test_delete_forbidden(self):
+        """Test a user who is not a manager cannot delete songs."""
+        # login as simple user
+        self.authenticate(self.user)
+
+        response = self.client.delete(self.url, {"ids": [self.song1.pk]}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(Song.objects.count(), 5)
@@ -36,6 +36,24 @@ class SongTagListViewTestCase(LibraryAPITestCase):
         self.check_tag_json(response.data["results"][0], self.tag1)
         self.check_tag_json(response.data["results"][1], self.tag2)
 
+        # Check song count
+        self.assertEqual(response.data["results"][0]["song_count"], 1)
+        self.assertEqual(response.data["results"][1]["song_count"], 0)
+
+    def test_get_tag_list_ordering_song_count(self):
+        """Test to order tags by number of songs."""
+        # Login as simple user
+        self.authenticate(self.user)
+
+        self.tag2.song_set.add(self.song1, self.song2)
+
+        # Get tags list
+        response = self.client.get(self.url, {"ordering": "song_count"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.check_tag_json(response.data["results"][0], self.tag2)
+        self.check_tag_json(response.data["results"][1], self.tag1)
+        self.assertEqual(response.data["results"][0]["song_count"], 2)
+
     def test_get_tag_list_forbidden(self):
         """Test to verify unauthenticated user can't get tag list."""
         # Attempt to get work type list
@@ -85,6 +103,40 @@ class SongTagViewTestCase(LibraryAPITestCase):
         tag = SongTag.objects.get(id=self.tag1.id)
         self.assertTrue(tag.disabled)
 
+        # the song of the tag should be hidden now
+        self.song2.refresh_from_db()
+        self.assertTrue(self.song2.hidden)
+
+    def test_song_hidden_maintained(self):
+        """Test songs with disabled tags are hidden."""
+        self.tag1.disabled = True
+        self.tag1.save()
+        self.song2.refresh_from_db()
+        self.assertTrue(self.song2.hidden)
+
+        self.song1.tags.add(self.tag1)
+        self.song1.refresh_from_db()
+        self.assertTrue(self.song1.hidden)
+
+        self.tag1.song_set.remove(self.song1)
+        self.song1.refresh_from_db()
+        self.assertFalse(self.song1.hidden)
+
+        self.tag1.song_set.clear()
+        self.song2.refresh_from_db()
+        self.assertFalse(self.song2.hidden)
+
+        # saving an outdated song keeps it hidden
+        self.song1.tags.add(self.tag1)
+        self.song1.save()
+        self.song1.refresh_from_db()
+        self.assertTrue(self.song1.hidden)
+
+        self.song2.tags.add(self.tag1, self.tag2)
+        self.tag1.delete()
+        self.song2.refresh_from_db()
+        self.assertFalse(self.song2.hidden)
+
     def test_update_song_tag_user(self):
         """Test simple user can not update tags."""
         # login as user
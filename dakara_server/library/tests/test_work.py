@@ -2,7 +2,7 @@ from django.contrib.auth import get_user_model
 from django.urls import reverse
 from rest_framework import status
 
-from library.models import Work
+from library.models import SongWorkLink, Work
 from library.tests.base_test import LibraryAPITestCase
 
 UserModel = get_user_model()
@@ -63,6 +63,44 @@ class WorkListViewTestCase(LibraryAPITestCase):
         self.assertEqual(response.data["results"][1]["song_count"], 0)
         self.assertEqual(response.data["results"][2]["song_count"], 0)
 
+    def test_get_work_list_ordering_song_count(self):
+        """Test to order works by number of songs."""
+        # Login as simple user
+        self.authenticate(self.user)
+
+        # a song linked twice to a work is counted once
+        SongWorkLink.objects.create(
+            song=self.song1, work=self.work3, link_type=SongWorkLink.OPENING
+        )
+        SongWorkLink.objects.create(
+            song=self.song2, work=self.work3, link_type=SongWorkLink.OPENING
+        )
+        SongWorkLink.objects.create(
+            song=self.song2, work=self.work3, link_type=SongWorkLink.ENDING
+        )
+
+        # Get works list
+        response = self.client.get(self.url, {"ordering": "song_count"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.check_work_json(response.data["results"][0], self.work3)
+        self.check_work_json(response.data["results"][1], self.work1)
+        self.check_work_json(response.data["results"][2], self.work2)
+        self.assertEqual(response.data["results"][0]["song_count"], 2)
+
+    def test_song_count_maintained(self):
+        """Test the number of songs follows the links of the work."""
+        link = SongWorkLink.objects.get(song=self.song2, work=self.work1)
+        link.work = self.work2
+        link.save()
+        self.work1.refresh_from_db()
+        self.work2.refresh_from_db()
+        self.assertEqual(self.work1.song_count, 0)
+        self.assertEqual(self.work2.song_count, 1)
+
+        self.song2.delete()
+        self.work2.refresh_from_db()
+        self.assertEqual(self.work2.song_count, 0)
+
     def test_get_work_list_forbidden(self):
         """Test to verify unauthenticated user can't get work list."""
         # Attempt to get works list
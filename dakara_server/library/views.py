@@ -1,12 +1,13 @@
 import logging
 
 from django.contrib.auth import get_user_model
-from django.db.models import Q
-from django.db.models.functions import Lower
+from django.db.models import Case, IntegerField, Q, Value, When
+from django.db.models.functions import Left, Lower
 from rest_framework import status
 from rest_framework.generics import (
     ListAPIView,
     ListCreateAPIView,
+    RetrieveAPIView,
     RetrieveUpdateDestroyAPIView,
 )
 from rest_framework.permissions import IsAuthenticated
@@ -14,8 +15,20 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 
 from internal import permissions as internal_permissions
+from internal.pagination import CursorPaginationCustom, SincePaginationCustom
+from internal.prefetch import PrefetchPlanMixin, apply_prefetch_plan
+from internal.projection import StreamedListMixin
 from library import models, permissions, serializers
-from library.query_language import QueryLanguageParser
+from library.autocomplete import Autocomplete
+from library.deletion import delete_songs
+from library.facets import count_facets
+from library.fuzzy import FuzzySearch
+from library.jobs import create_import_job
+from library.normalization import get_prefix_expression, normalize
+from library.query_language import QueryLanguageParser, get_parser
+from library.search import SongSearch, get_song_search
+from library.search_cache import SearchResultCache
+from library.sync import diff_manifest
 
 logger = logging.getLogger(__name__)
 
@@ -23,12 +36,17 @@ UserModel = get_user_model()
 
 
 class QueryParsedListMixin:
-    """Mixin that adds parsed query to list response."""
+    """Mixin that adds parsed query to list response.
+
+    If results are ranked, their score is added to the response as well. In
+    this case, `score_field` gives the name of the annotation of the score.
+    """
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
         self.query_parsed = None
+        self.score_field = None
 
     def list(self, request, *args, **kwargs):
         """Add the parsed query to the serialized response."""
@@ -41,6 +59,13 @@ class QueryParsedListMixin:
         if self.query_parsed is not None:
             response.data["query"] = self.query_parsed
 
+        # pass the score of each result of the page by ID
+        if self.score_field is not None:
+            response.data["scores"] = {
+                obj.pk: getattr(obj, self.score_field)
+                for obj in self.paginator.get_page_objects()
+            }
+
         return response
 
 
@@ -65,8 +90,70 @@ class MultiSerializerMixin:
         return super().get_serializer(*args, **kwargs)
 
 
-class SongListView(QueryParsedListMixin, MultiSerializerMixin, ListCreateAPIView):
-    """List of songs."""
+class FuzzySearchMixin:
+    """Mixin that enables the typo-tolerant search mode.
+
+    The mode is enabled with `fuzzy=1` in the query string.
+    """
+
+    def is_fuzzy(self):
+        """Tell if the typo-tolerant search mode is requested.
+
+        Returns:
+            bool: True if the mode is enabled.
+        """
+        return self.request.query_params.get("fuzzy", "").lower() in ("1", "true")
+
+
+class SongCountOrderingMixin:
+    """Mixin that enables to order objects by number of songs.
+
+    The ordering is enabled with `ordering=song_count` in the query string,
+    objects with the most songs come first.
+    """
+
+    def get_ordering(self, *ordering):
+        """Give the ordering of objects.
+
+        Args:
+            ordering (list): Default ordering.
+
+        Returns:
+            list: Ordering, by number of songs first if requested.
+        """
+        if self.request.query_params.get("ordering") == "song_count":
+            return ("-song_count", *ordering)
+
+        return ordering
+
+
+class SongListView(
+    PrefetchPlanMixin,
+    QueryParsedListMixin,
+    FuzzySearchMixin,
+    MultiSerializerMixin,
+    ListCreateAPIView,
+):
+    """List of songs.
+
+    In typo-tolerant search mode, the unspecific terms of the query are
+    matched by similarity and results are ordered by decreasing similarity.
+
+    With `ordering=relevance`, results are ordered by decreasing relevance to
+    the query, see `library.search.SongSearch.get_relevance`.
+
+    The IDs of the songs matching a query are cached until the library
+    changes, see `library.search_cache.SearchResultCache`.
+
+    With `facets` in the query string, the songs are counted by the facets it
+    lists, among `work_type`, `tag` and `artist`, see `library.facets`. The
+    counts are given next to the parsed query.
+
+    With `ids` in the query string, as a comma-separated list of IDs, the
+    songs with these IDs are given in the same order, without pagination.
+    Songs which do not exist or that the user cannot see are omitted. Other
+    parameters are ignored.
+    """
 
     permission_classes = [
         IsAuthenticated,
@@ -74,116 +161,185 @@ class SongListView(QueryParsedListMixin, MultiSerializerMixin, ListCreateAPIView
     ]
     serializer_class = serializers.SongSerializer
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        self.search_cache = None
+        self.facet_names = []
+        self.facets = None
+        self.ids = None
+
+    def list(self, request, *args, **kwargs):
+        """Add the counts of facets to the serialized response."""
+        response = super().list(request, *args, **kwargs)
+
+        if self.facets is not None:
+            response.data["facets"] = self.facets
+
+        return response
+
     def get_queryset(self):
         """Search and filter the songs."""
         query_set = models.Song.objects.all()
 
+        serializer = serializers.SongListQuerySerializer(data=self.request.query_params)
+        serializer.is_valid(raise_exception=True)
+        self.facet_names = serializer.validated_data["facets"]
+
         # hide all songs with disabled tags for non-managers or non-superusers
         user = self.request.user
-        if not (user.is_superuser or user.is_library_manager):
-            query_set = query_set.exclude(tags__disabled=True)
+        show_disabled = user.is_superuser or user.is_library_manager
+        if not show_disabled:
+            query_set = query_set.filter(hidden=False)
+
+        # if 'ids' is in the query string then return the requested songs in
+        # the requested order
+        self.ids = serializer.validated_data.get("ids")
+        if self.ids is not None:
+            return query_set.filter(pk__in=self.ids).order_by(
+                Case(
+                    *(
+                        When(pk=pk, then=Value(index))
+                        for index, pk in enumerate(self.ids)
+                    ),
+                    output_field=IntegerField(),
+                )
+            )
 
         # if 'query' is in the query string then perform search otherwise
         # return all songs
+        ordering = ("title_normalized",)
         if "query" not in self.request.query_params:
-            return query_set.order_by(Lower("title"))
+            return query_set.order_by(*ordering)
 
         query = self.request.query_params.get("query", None)
         if query:
             # the query can use a syntax, the query language, to specify which
             # term to search and where
             # the language manages the simple search as well the parser is
-            # provided from query_language.py
-            language_parser = QueryLanguageParser()
-            res = language_parser.parse(query)
-            query_list = []
-            query_list_many = []
-            # specific terms of the research, i.e. artists, works and titles
-            for artist in res["artist"]["contains"]:
-                query_list_many.append(Q(artists__name__icontains=artist))
+            # provided from query_language.py and is shared by all requests
+            res = get_parser().parse(query)
 
-            for artist in res["artist"]["exact"]:
-                query_list_many.append(Q(artists__name__iexact=artist))
+            # saving the parsed query to give it back to the client
+            self.query_parsed = res
 
-            for title in res["title"]["contains"]:
-                query_list.append(Q(title__icontains=title))
+            fuzzy = self.is_fuzzy() and bool(res["remaining"])
+            relevance = self.request.query_params.get("ordering") == "relevance"
+            if fuzzy:
+                self.score_field = "similarity"
+
+            elif relevance:
+                self.score_field = "relevance"
+
+            # results of the same search are shared by users of the same
+            # visibility class, they are served from the cache if possible
+            if (
+                CursorPaginationCustom.cursor_query_param
+                not in self.request.query_params
+            ):
+                self.search_cache = SearchResultCache(
+                    res, show_disabled, fuzzy=fuzzy, relevance=relevance
+                )
+                if self.search_cache.get_facets(
+                    self.facet_names
+                ) is not None and self.search_cache.has_window(self.get_page_window()):
+                    return query_set
+
+            if fuzzy:
+                # unspecific terms are matched by similarity, other terms are
+                # matched as usual
+                res = {**res, "remaining": []}
+                fuzzy_search = FuzzySearch(query_set.db)
+                query_set = fuzzy_search.rank(
+                    query_set,
+                    fuzzy_search.get_song_similarities(
+                        " ".join(self.query_parsed["remaining"])
+                    ),
+                )
+                ordering = ("-similarity", "title_normalized")
 
-            for title in res["title"]["exact"]:
-                query_list.append(Q(title__iexact=title))
+            elif relevance:
+                query_set = query_set.annotate(relevance=SongSearch.get_relevance(res))
+                ordering = ("-relevance", "title_normalized")
 
-            for work in res["work"]["contains"]:
-                query_list.append(
-                    Q(works__title__icontains=work)
-                    | Q(works__alternative_title__title__icontains=work)
-                )
+            # the parsed query is resolved against the search documents of the
+            # songs by default, which avoids to join the related tables
+            query_set = get_song_search(query_set.db).filter(query_set, res)
 
-            for work in res["work"]["exact"]:
-                query_list.append(
-                    Q(works__title__iexact=work)
-                    | Q(works__alternative_title__title__iexact=work)
-                )
+        return query_set.order_by(*ordering)
 
-            # specific terms of the research derivating from work
-            for query_name, search_keywords in res["work_type"].items():
-                for keyword in search_keywords["contains"]:
-                    query_list.append(
-                        (
-                            Q(works__title__icontains=keyword)
-                            | Q(
-                                works__alternative_title__title__icontains=keyword
-                            )  # noqa E501
-                        )
-                        & Q(works__work_type__query_name=query_name)
-                    )
+    def get_page_window(self):
+        """Give the indexes of the songs of the requested page.
 
-                for keyword in search_keywords["exact"]:
-                    query_list.append(
-                        (
-                            Q(works__title__iexact=keyword)
-                            | Q(works__alternative_title__title__iexact=keyword)
-                        )
-                        & Q(works__work_type__query_name=query_name)
-                    )
+        Returns:
+            tuple: Start and stop indexes of the songs of the page, or None if
+            the page number is not a positive integer.
+        """
+        page_size = self.paginator.get_page_size(self.request)
+        try:
+            page_number = int(
+                self.request.query_params.get(self.paginator.page_query_param, 1)
+            )
 
-                # one may want to factor the duplicated query on the work type
-                # but it is very unlikely someone will define severals animes
-                # (by instance) for a song at the same time
-                # IMHO a factorization will make the code less clear and just
-                # heavier, for no practical reason
+        except ValueError:
+            return None
 
-            # unspecific terms of the research
-            for remain in res["remaining"]:
-                query_list.append(
-                    Q(title__icontains=remain)
-                    | Q(artists__name__icontains=remain)
-                    | Q(works__title__icontains=remain)
-                    | Q(works__alternative_title__title__icontains=remain)
-                    | Q(version__icontains=remain)
-                    | Q(detail__icontains=remain)
-                    | Q(detail_video__icontains=remain)
-                )
+        if page_number < 1:
+            return None
 
-            # tags
-            for tag in res["tag"]:
-                query_list_many.append(Q(tags__name=tag))
+        return (page_number - 1) * page_size, page_number * page_size
 
-            # now, gather the query objects
-            filter_query = Q()
-            for item in query_list:
-                filter_query &= item
+    def paginate_queryset(self, queryset):
+        """Paginate the IDs of the songs of a search.
 
-            query_set = query_set.filter(filter_query)
-            # gather the query objects involving custom many to many relation
-            for item in query_list_many:
-                query_set = query_set.filter(item)
+        The first IDs of the songs matching and the counts of facets are
+        cached, then the songs of the page are obtained from their IDs. The
+        songs of pages past the cached IDs are obtained from the database.
 
-            # saving the parsed query to give it back to the client
-            self.query_parsed = res
+        Songs requested by IDs are not paginated.
+        """
+        if self.ids is not None:
+            return None
+
+        if self.search_cache is None:
+            if self.facet_names:
+                self.facets = count_facets(queryset, self.facet_names)
+
+            return super().paginate_queryset(queryset)
+
+        if self.search_cache.results is None:
+            self.search_cache.fetch(queryset, self.score_field)
 
-        return query_set.distinct().order_by(Lower("title"))
+        if self.facet_names:
+            self.facets = self.search_cache.get_facets(self.facet_names)
+            if self.facets is None:
+                self.facets = count_facets(queryset, self.facet_names)
+                self.search_cache.set_facets(self.facets)
 
+        # pages past the cached IDs are obtained from the database
+        if not self.search_cache.has_window(self.get_page_window()):
+            return super().paginate_queryset(queryset)
 
-class SongView(RetrieveUpdateDestroyAPIView):
+        results = self.search_cache.results
+        page_ids = super().paginate_queryset(self.search_cache.get_ids())
+        if page_ids is None:
+            return None
+
+        songs = apply_prefetch_plan(
+            models.Song.objects.filter(pk__in=page_ids), self.get_serializer()
+        ).in_bulk()
+        page = [songs[pk] for pk in page_ids if pk in songs]
+        if self.score_field is not None:
+            for song in page:
+                setattr(song, self.score_field, results["scores"][song.pk])
+
+        # the page gives the songs instead of their IDs
+        self.paginator.page.object_list = page
+
+        return page
+
+
+class SongView(PrefetchPlanMixin, RetrieveUpdateDestroyAPIView):
     """Edition and display of a song."""
 
     permission_classes = [
@@ -194,9 +350,12 @@ class SongView(RetrieveUpdateDestroyAPIView):
     serializer_class = serializers.SongSerializer
 
 
-class SongRetrieveListView(ListAPIView):
+class SongRetrieveListView(PrefetchPlanMixin, StreamedListMixin, ListAPIView):
     """List of all songs.
 
+    The list can be streamed as newline-delimited JSON, see
+    `internal.projection.StreamedListMixin`.
+
     For the feeder."""
 
     permission_classes = [IsAuthenticated, permissions.IsLibraryManager]
@@ -205,8 +364,174 @@ class SongRetrieveListView(ListAPIView):
     pagination_class = None
 
 
-class ArtistListView(QueryParsedListMixin, ListCreateAPIView):
-    """List of artists."""
+class SongSyncView(APIView):
+    """Differences between the files of the feeder and the songs.
+
+    The feeder posts the manifest of its files, it is given the files to add
+    as songs and the songs to remove, to update or to move, see
+    `library.sync.diff_manifest`.
+
+    For the feeder."""
+
+    permission_classes = [IsAuthenticated, permissions.IsLibraryManager]
+
+    def post(self, request, *args, **kwargs):
+        serializer = serializers.SongManifestSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        return Response(
+            diff_manifest(serializer.validated_data["manifest"]),
+            status=status.HTTP_200_OK,
+        )
+
+
+class SongPruneView(APIView):
+    """Views for songs to delete, by IDs or by directory.
+
+    Songs are deleted at once, see `library.deletion.delete_songs`.
+
+    For the feeder."""
+
+    permission_classes = [IsAuthenticated, permissions.IsLibraryManager]
+    queryset = models.Song.objects.all()
+    serializer_class = serializers.SongPruneSerializer
+
+    def delete(self, request, *args, **kwargs):
+        serializer = self.serializer_class(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        if "ids" in serializer.validated_data:
+            query_set = self.queryset.filter(pk__in=serializer.validated_data["ids"])
+
+        else:
+            # the prefix is looked up on its index, then compared exactly, as
+            # `startswith` ignores case on SQLite
+            directory = serializer.validated_data["directory"]
+            query_set = self.queryset.alias(
+                directory_indexed=get_prefix_expression("directory", self.queryset.db),
+                directory_prefix=Left("directory", len(directory) + 1),
+            ).filter(
+                Q(directory=directory)
+                | Q(
+                    directory_indexed__startswith=directory + "/",
+                    directory_prefix=directory + "/",
+                )
+            )
+
+        _, deleted_count = delete_songs(query_set)
+
+        return Response(
+            {"deleted_count": deleted_count.get("library.Song", 0)},
+            status=status.HTTP_200_OK,
+        )
+
+
+class ImportJobCreateView(APIView):
+    """Create an import job for the list of objects posted.
+
+    The job is processed in the background, its progress is given by
+    `ImportJobView`, see `library.jobs`.
+
+    For the feeder."""
+
+    permission_classes = [IsAuthenticated, permissions.IsLibraryManager]
+    kind = None
+
+    def post(self, request, *args, **kwargs):
+        payload = serializers.ImportJobPayloadField().run_validation(request.data)
+        job = create_import_job(self.kind, payload)
+
+        return Response(
+            serializers.ImportJobSerializer(job).data, status=status.HTTP_202_ACCEPTED
+        )
+
+
+class SongImportView(ImportJobCreateView):
+    """Create an import job for a list of songs.
+
+    For the feeder."""
+
+    kind = models.ImportJob.SONG
+
+
+class WorkImportView(ImportJobCreateView):
+    """Create an import job for a list of works.
+
+    For the feeder."""
+
+    kind = models.ImportJob.WORK
+
+
+class ImportJobView(RetrieveAPIView):
+    """Progress and result of an import job.
+
+    For the feeder."""
+
+    permission_classes = [IsAuthenticated, permissions.IsLibraryManager]
+    queryset = models.ImportJob.objects.defer("payload")
+    serializer_class = serializers.ImportJobSerializer
+
+
+class LibraryChangeListView(ListAPIView):
+    """List of changes of the library.
+
+    Changes are given after the sequence number of the `since` parameter, a
+    client gets the objects which changed by their IDs and removes the
+    deleted ones, then asks for the changes since the sequence number it was
+    given, see `library.models.LibraryChange`.
+    """
+
+    permission_classes = [IsAuthenticated]
+    queryset = models.LibraryChange.objects.all()
+    serializer_class = serializers.LibraryChangeSerializer
+    pagination_class = SincePaginationCustom
+
+
+class AutocompleteView(APIView):
+    """Suggestions to complete a query being typed.
+
+    The last token of the query is completed, see
+    `library.autocomplete.Autocomplete`.
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        serializer = serializers.AutocompleteQuerySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+
+        # show disabled tags and songs with disabled tags only for managers or
+        # superusers
+        user = request.user
+        autocomplete = Autocomplete(
+            show_disabled=user.is_superuser or user.is_library_manager,
+            limit=serializer.validated_data["limit"],
+        )
+
+        return Response(
+            {
+                "suggestions": [
+                    {"kind": kind, "text": text}
+                    for kind, text in autocomplete.get_suggestions(
+                        serializer.validated_data["query"]
+                    )
+                ]
+            },
+            status=status.HTTP_200_OK,
+        )
+
+
+class ArtistListView(
+    QueryParsedListMixin, FuzzySearchMixin, SongCountOrderingMixin, ListCreateAPIView
+):
+    """List of artists.
+
+    In typo-tolerant search mode, the terms of the query are matched by
+    similarity and results are ordered by decreasing similarity.
+
+    With `ordering=song_count`, results are ordered by decreasing number of
+    songs.
+    """
 
     permission_classes = [
         IsAuthenticated,
@@ -217,21 +542,33 @@ class ArtistListView(QueryParsedListMixin, ListCreateAPIView):
     def get_queryset(self):
         """Search and filter the artists."""
         query_set = models.Artist.objects.all()
+        ordering = self.get_ordering("name_normalized")
 
         # if 'query' is in the query string then perform search return results
         # of the corresponding query
         if "query" not in self.request.query_params:
-            return query_set.order_by(Lower("name"))
+            return query_set.order_by(*ordering)
 
         query = self.request.query_params.get("query", None)
         if query:
             # there is no need for query language for artists
             # it is used to split terms and for uniformity
             res = QueryLanguageParser.split_remaining(query)
+
+            if self.is_fuzzy():
+                fuzzy_search = FuzzySearch(query_set.db)
+                query_set = fuzzy_search.rank(
+                    query_set, fuzzy_search.get_artist_similarities(" ".join(res))
+                )
+                self.query_parsed = {"remaining": res}
+                self.score_field = "similarity"
+
+                return query_set.order_by("-similarity", "name_normalized")
+
             query_list = []
             # only unspecific terms are used
             for remain in res:
-                query_list.append(Q(name__icontains=remain))
+                query_list.append(Q(name_normalized__contains=normalize(remain)))
 
             # gather the query objects
             filter_query = Q()
@@ -242,7 +579,7 @@ class ArtistListView(QueryParsedListMixin, ListCreateAPIView):
             # saving the parsed query to give it back to the client
             self.query_parsed = {"remaining": res}
 
-        return query_set.order_by(Lower("name"))
+        return query_set.order_by(*ordering)
 
 
 class ArtistPruneView(APIView):
@@ -263,8 +600,22 @@ class ArtistPruneView(APIView):
         )
 
 
-class WorkListView(QueryParsedListMixin, MultiSerializerMixin, ListCreateAPIView):
-    """List of works."""
+class WorkListView(
+    PrefetchPlanMixin,
+    QueryParsedListMixin,
+    FuzzySearchMixin,
+    SongCountOrderingMixin,
+    MultiSerializerMixin,
+    ListCreateAPIView,
+):
+    """List of works.
+
+    In typo-tolerant search mode, the terms of the query are matched by
+    similarity and results are ordered by decreasing similarity.
+
+    With `ordering=song_count`, results are ordered by decreasing number of
+    songs.
+    """
 
     permission_classes = [
         IsAuthenticated,
@@ -275,6 +626,7 @@ class WorkListView(QueryParsedListMixin, MultiSerializerMixin, ListCreateAPIView
     def get_queryset(self):
         """Search and filter the works."""
         query_set = models.Work.objects.all()
+        ordering = self.get_ordering("title_normalized", "subtitle_normalized")
 
         # if 'type' is in the query string
         # then filter work type
@@ -286,20 +638,34 @@ class WorkListView(QueryParsedListMixin, MultiSerializerMixin, ListCreateAPIView
         # if 'query' is in the query string then perform search return results
         # of the corresponding query and type filter
         if "query" not in self.request.query_params:
-            return query_set.order_by(Lower("title"), Lower("subtitle"))
+            return query_set.order_by(*ordering)
 
         query = self.request.query_params.get("query", None)
         if query:
             # there is no need for query language for works it is used to split
             # terms and for uniformity
             res = QueryLanguageParser.split_remaining(query)
+
+            if self.is_fuzzy():
+                fuzzy_search = FuzzySearch(query_set.db)
+                query_set = fuzzy_search.rank(
+                    query_set, fuzzy_search.get_work_similarities(" ".join(res))
+                )
+                self.query_parsed = {"remaining": res}
+                self.score_field = "similarity"
+
+                return query_set.order_by(
+                    "-similarity", "title_normalized", "subtitle_normalized"
+                )
+
             query_list = []
             # only unspecific terms are used
             for remain in res:
+                remain = normalize(remain)
                 query_list.append(
-                    Q(title__icontains=remain)
-                    | Q(subtitle__icontains=remain)
-                    | Q(alternative_title__title__icontains=remain)
+                    Q(title_normalized__contains=remain)
+                    | Q(subtitle_normalized__contains=remain)
+                    | Q(alternative_title__title_normalized__contains=remain)
                 )
 
             # gather the query objects
@@ -311,10 +677,10 @@ class WorkListView(QueryParsedListMixin, MultiSerializerMixin, ListCreateAPIView
             # saving the parsed query to give it back to the client
             self.query_parsed = {"remaining": res}
 
-        return query_set.distinct().order_by(Lower("title"), Lower("subtitle"))
+        return query_set.distinct().order_by(*ordering)
 
 
-class WorkView(RetrieveUpdateDestroyAPIView):
+class WorkView(PrefetchPlanMixin, RetrieveUpdateDestroyAPIView):
     """Edition and display of a song."""
 
     permission_classes = [
@@ -325,9 +691,12 @@ class WorkView(RetrieveUpdateDestroyAPIView):
     serializer_class = serializers.WorkSerializer
 
 
-class WorkRetrieveListView(ListAPIView):
+class WorkRetrieveListView(StreamedListMixin, ListAPIView):
     """List of all works.
 
+    The list can be streamed as newline-delimited JSON, see
+    `internal.projection.StreamedListMixin`.
+
     For the feeder."""
 
     permission_classes = [IsAuthenticated, permissions.IsLibraryManager]
@@ -376,16 +745,23 @@ class WorkTypeView(RetrieveUpdateDestroyAPIView):
     serializer_class = serializers.WorkTypeSerializer
 
 
-class SongTagListView(ListCreateAPIView):
-    """List of song tags."""
+class SongTagListView(SongCountOrderingMixin, ListCreateAPIView):
+    """List of song tags.
+
+    With `ordering=song_count`, results are ordered by decreasing number of
+    songs.
+    """
 
     permission_classes = [
         IsAuthenticated,
         permissions.IsLibraryManager | internal_permissions.IsReadOnly,
     ]
-    queryset = models.SongTag.objects.all().order_by(Lower("name"))
     serializer_class = serializers.SongTagSerializer
 
+    def get_queryset(self):
+        """Order the song tags."""
+        return models.SongTag.objects.order_by(*self.get_ordering(Lower("name")))
+
 
 class SongTagView(RetrieveUpdateDestroyAPIView):
     """Update a song tag."""
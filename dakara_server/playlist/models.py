@@ -16,9 +16,26 @@ tz = timezone.get_default_timezone()
 class PlaylistManager(OrderedModelManager):
     """Manager of playlist objects."""
 
+    @staticmethod
+    def with_song(playlist):
+        """Fetch the song of playlist entries.
+
+        The lyrics of the song, that are not sent to the player, are not
+        fetched.
+
+        Args:
+            playlist (django.db.models.QuerySet): Playlist entries.
+
+        Returns:
+            django.db.models.QuerySet: Playlist entries with their song.
+        """
+        return playlist.select_related("song").defer("song__lyrics")
+
     def get_playing(self):
         """Get the current playlist entry."""
-        playlist = self.filter(was_played=False, date_play__isnull=False)
+        playlist = self.with_song(
+            self.filter(was_played=False, date_play__isnull=False)
+        )
 
         if not playlist:
             return None
@@ -67,6 +84,7 @@ class PlaylistManager(OrderedModelManager):
 
             playlist = self.get_queuing().exclude(pk=entry_id)
 
+        playlist = self.with_song(playlist)
         if not playlist:
             return None
 
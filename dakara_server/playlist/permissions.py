@@ -1,5 +1,4 @@
 from django.contrib.auth import get_user_model
-from django.core.exceptions import ObjectDoesNotExist
 from rest_framework import permissions
 
 from internal.permissions import BasePermissionCustom
@@ -79,9 +78,4 @@ class IsSongEnabled(BasePermissionCustom):
             return True
 
         # check the song has no disabled tags
-        try:
-            song = Song.objects.get(pk=song_id)
-            return not any([t.disabled for t in song.tags.all()])
-
-        except ObjectDoesNotExist:
-            return True
+        return not Song.objects.filter(pk=song_id, hidden=True).exists()
@@ -3,6 +3,7 @@ from datetime import datetime
 from django.utils import timezone
 from rest_framework import serializers
 
+from internal.projection import ValuesListSerializer
 from library.models import Song
 from library.serializers import (
     SecondsDurationField,
@@ -88,6 +89,7 @@ class PlaylistEntryForDigestSerializer(serializers.ModelSerializer):
             "was_played",
             "owner",
         )
+        list_serializer_class = ValuesListSerializer
 
 
 class PlaylistEntriesWithDateEndSerializer(serializers.Serializer):
@@ -277,6 +279,7 @@ class PlayerErrorForDigestSerializer(serializers.ModelSerializer):
             "date_created",
         )
         read_only_fields = ("id", "playlist_entry", "error_message", "date_created")
+        list_serializer_class = ValuesListSerializer
 
 
 class PlayerCommandSerializer(serializers.Serializer):
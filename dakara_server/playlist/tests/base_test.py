@@ -4,7 +4,15 @@ from django.core.cache import cache
 from django.utils.dateparse import parse_datetime
 
 from internal.tests.base_test import BaseAPITestCase, BaseProvider, UserModel, tz
-from library.models import Song, SongTag
+from library.models import (
+    Artist,
+    Song,
+    SongTag,
+    SongWorkLink,
+    Work,
+    WorkAlternativeTitle,
+    WorkType,
+)
 from playlist.models import Karaoke, Player, PlayerToken, PlaylistEntry
 
 
@@ -67,6 +75,21 @@ class PlaylistProvider(BaseProvider):
         )
         self.pe4.save()
 
+    def add_related_objects(self):
+        """Add artists, tags and works to the songs."""
+        artist = Artist.objects.create(name="Artist1")
+        tag = SongTag.objects.create(name="TAG2")
+        work_type = WorkType.objects.create(name="WorkType1", query_name="wt1")
+        work = Work.objects.create(title="Work1", work_type=work_type)
+        WorkAlternativeTitle.objects.create(title="AltTitle1", work=work)
+
+        for song in (self.song1, self.song2):
+            song.artists.add(artist)
+            song.tags.add(tag)
+            SongWorkLink.objects.create(
+                song=song, work=work, link_type=SongWorkLink.OPENING
+            )
+
     def set_karaoke(
         self, ongoing=None, can_add_to_playlist=None, player_play_next_song=None
     ):
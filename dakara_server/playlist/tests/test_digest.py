@@ -1,3 +1,5 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from freezegun import freeze_time
 from rest_framework import status
@@ -227,3 +229,32 @@ class DigestViewTestCase(PlaylistAPITestCase):
         self.assertFalse(pe4["use_instrumental"])
         self.assertTrue(pe4["was_played"])
         self.assertIsNotNone(pe4["date_play"])
+
+    def test_get_entries_columns(self):
+        """Get the digest fetching only the columns of entries it gives."""
+        self.authenticate(self.user)
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.data["playlist_entries"][0]["owner"],
+            {"id": self.pe1.owner.id, "username": self.pe1.owner.username},
+        )
+        self.assertEqual(
+            response.data["playlist_entries"][0]["song"]["title"],
+            self.pe1.song.title,
+        )
+
+        # the entries are fetched with their song and owner in one query,
+        # without the lyrics of songs and the passwords of owners
+        queries = [
+            query["sql"]
+            for query in context.captured_queries
+            if query["sql"].startswith('SELECT "playlist_playlistentry"')
+            and "users_dakarauser" in query["sql"]
+        ]
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('"library_song"."lyrics"', queries[0])
+        self.assertNotIn("password", queries[0])
@@ -257,6 +257,13 @@ class TestPlaylistEntry:
         # othe entries)
         assert models.PlaylistEntry.objects.get_next(playlist_provider.pe2.id) is None
 
+    def test_get_next_song(self, playlist_provider):
+        """Test the next entry is given with its song, without its lyrics."""
+        playlist_entry = models.PlaylistEntry.objects.get_next()
+
+        assert playlist_entry.song == playlist_provider.pe1.song
+        assert playlist_entry.song.get_deferred_fields() == {"lyrics"}
+
     def test_set_playing(self, playlist_provider):
         """Test to set a playlist entry playing."""
         # pre assert no entry is playing
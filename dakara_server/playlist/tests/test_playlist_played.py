@@ -26,6 +26,36 @@ class PlaylistPlayedListViewTestCase(PlaylistAPITestCase):
         self.check_playlist_played_entry_json(response.data["results"][0], self.pe4)
         self.check_playlist_played_entry_json(response.data["results"][1], self.pe3)
 
+    def test_get_playlist_played_list_num_queries(self):
+        """Test the number of queries does not depend on the number of entries."""
+        # Login as simple user
+        self.authenticate(self.user)
+
+        # add entries with songs having related objects
+        self.add_related_objects()
+
+        # authentication, count, entries with songs and owners, artists, tags,
+        # links to works with works and work types, alternative titles of works
+        with self.assertNumQueries(7):
+            response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["count"], 2)
+
+    def test_get_playlist_played_list_cursor(self):
+        """Test to get played entries with the keyset pagination."""
+        # Login as simple user
+        self.authenticate(self.user)
+
+        response = self.client.get(self.url, {"cursor": ""})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data["results"]), 2)
+        self.assertIsNone(response.data["pagination"]["next"])
+
+        # Playlist entries are in the same order as with pages
+        self.check_playlist_played_entry_json(response.data["results"][0], self.pe4)
+        self.check_playlist_played_entry_json(response.data["results"][1], self.pe3)
+
     def test_get_playlist_played_list_forbidden(self):
         """Test to verify playlist entries played list forbidden when not logged in."""
         # Get playlist entries list
@@ -38,6 +38,26 @@ class PlaylistQueuingListViewTestCase(PlaylistAPITestCase):
         self.assertIsNone(pe1["date_play"])
         self.assertIsNone(pe2["date_play"])
 
+    def test_get_playlist_queuing_list_num_queries(self):
+        """Test the number of queries does not depend on the number of entries."""
+        # Login as simple user
+        self.authenticate(self.user)
+
+        # add entries with songs having related objects
+        self.add_related_objects()
+
+        # authentication, count, entries with songs and owners, artists, tags,
+        # links to works with works and work types, alternative titles of works
+        with self.assertNumQueries(7) as context:
+            response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["count"], 2)
+
+        # owners are fetched with their public data only
+        self.assertIn('"users_dakarauser"."username"', context[2]["sql"])
+        self.assertNotIn('"users_dakarauser"."password"', context[2]["sql"])
+
     def test_get_playlist_queuing_list_forbidden(self):
         """Test to verify playlist entries queuing list forbidden when not logged in."""
         # Get playlist entries list
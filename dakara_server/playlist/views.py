@@ -18,6 +18,7 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 
 from internal import permissions as internal_permissions
+from internal.prefetch import PrefetchPlanMixin
 from library import permissions as library_permissions
 from playlist import authentications, models, permissions, serializers
 from playlist.consumers import send_to_channel
@@ -60,7 +61,7 @@ class PlaylistQueuingView(drf_generics.DestroyAPIView):
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class PlaylistQueuingListView(drf_generics.ListCreateAPIView):
+class PlaylistQueuingListView(PrefetchPlanMixin, drf_generics.ListCreateAPIView):
     """List of entries or creation of a new entry in the playlist."""
 
     serializer_class = serializers.PlaylistEntrySerializer
@@ -155,7 +156,7 @@ class PlaylistQueuingListView(drf_generics.ListCreateAPIView):
             )
 
 
-class PlaylistPlayedListView(drf_generics.ListAPIView):
+class PlaylistPlayedListView(PrefetchPlanMixin, drf_generics.ListAPIView):
     """List of played entries."""
 
     serializer_class = serializers.PlaylistEntrySerializer
@@ -456,7 +457,7 @@ class PlayerStatusView(drf_generics.RetrieveUpdateAPIView):
         return player
 
 
-class PlayerErrorView(drf_generics.ListCreateAPIView):
+class PlayerErrorView(PrefetchPlanMixin, drf_generics.ListCreateAPIView):
     """View of the player errors."""
 
     authentication_classes = [
@@ -27,6 +27,7 @@ class UserForPublicSerializer(serializers.ModelSerializer):
         model = UserModel
         fields = ("id", "username")
         read_only_fields = ("username",)
+        only = ()
 
 
 class UserSerializer(serializers.ModelSerializer):